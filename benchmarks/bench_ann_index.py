@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from utils.vector_index import build_index, normalize, INDEX_TYPES
+
+
+def synthetic_corpus(num_vectors, dimension, seed=0):
+    # Clustered vectors behave more like sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    num_clusters = max(10, num_vectors // 1000)
+    centers = rng.standard_normal((num_clusters, dimension)).astype('float32')
+    assignment = rng.integers(0, num_clusters, num_vectors)
+    vectors = np.empty((num_vectors, dimension), dtype='float32')
+    for start in range(0, num_vectors, 100000):
+        end = min(start + 100000, num_vectors)
+        noise = rng.standard_normal((end - start, dimension)).astype('float32') * 0.6
+        vectors[start:end] = centers[assignment[start:end]] + noise
+    return normalize(vectors), centers
+
+
+def synthetic_queries(centers, num_queries, dimension, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(centers), num_queries)
+    noise = rng.standard_normal((num_queries, dimension)).astype('float32') * 0.6
+    return normalize(centers[picks] + noise)
+
+
+def recall_at_k(truth, found, k):
+    hits = 0
+    for t, f in zip(truth, found):
+        hits += len(set(t[:k]) & set(f[:k]))
+    return hits / (len(truth) * k)
+
+
+def bench_size(num_vectors, dimension, num_queries, k, index_types):
+    corpus, centers = synthetic_corpus(num_vectors, dimension)
+    queries = synthetic_queries(centers, num_queries, dimension)
+
+    results = []
+    truth = None
+    for index_type in index_types:
+        started = time.perf_counter()
+        index = build_index(corpus, index_type)
+        build_s = time.perf_counter() - started
+
+        latencies = []
+        found = []
+        for q in queries:
+            t0 = time.perf_counter()
+            _, ids = index.search(q.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found.append(ids[0].tolist())
+
+        if index_type == "flat":
+            truth = found
+
+        latencies.sort()
+        results.append({
+            "vectors": num_vectors,
+            "index_type": index_type,
+            "build_s": round(build_s, 2),
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+            f"recall@{k}": round(recall_at_k(truth, found, k), 4) if truth else None,
+        })
+        del index
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare flat, IVF and HNSW FAISS indexes on synthetic embeddings")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    # Flat runs first so its results serve as exact ground truth for recall
+    index_types = ["flat"] + [t for t in INDEX_TYPES if t != "flat"]
+
+    print("=" * 50)
+    print("Prat.AI ANN Index Benchmark")
+    print("=" * 50)
+    print(f"{'vectors':>9} {'index':>6} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>10}")
+
+    all_results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for r in bench_size(size, args.dimension, args.queries, args.k, index_types):
+            all_results.append(r)
+            print(f"{r['vectors']:>9} {r['index_type']:>6} {r['build_s']:>8} {r['p50_ms']:>8} "
+                  f"{r['p95_ms']:>8} {str(r[f'recall@{args.k}']):>10}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
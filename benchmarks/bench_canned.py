@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from utils.canned import CannedAnswers, Rewriter, load_rules
+
+VOCAB = ("who what where when why how is are the a of for about tell me you your prat ai model data search "
+         "answer index chat bot creator founder ceo company product price plan help support account login "
+         "error install update weather time news india software hybrid retrieval gemini local").split()
+
+
+def synthetic_rules(num_keywords, keywords_per_answer=10, seed=0):
+    # The shipped rules plus synthetic answers, each with several 2-4 word keyword phrases
+    rng = random.Random(seed)
+    rules = load_rules()
+    answers = list(rules["answers"])
+    seen = {k.lower() for a in answers for k in a["keywords"]}
+    while sum(len(a["keywords"]) for a in answers) < num_keywords:
+        keywords = []
+        while len(keywords) < keywords_per_answer:
+            phrase = " ".join(rng.choice(VOCAB) for _ in range(rng.randint(2, 4))) + " " + str(rng.randint(0, 10 ** 6))
+            if phrase not in seen:
+                seen.add(phrase)
+                keywords.append(phrase)
+        answers.append({"name": f"rule{len(answers)}", "text": f"Answer {len(answers)}", "keywords": keywords})
+    return {"answers": answers, "rewrites": rules["rewrites"]}
+
+
+def synthetic_messages(rules, count, hit_rate=0.2, seed=1):
+    rng = random.Random(seed)
+    keywords = [k for a in rules["answers"] for k in a["keywords"]]
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(VOCAB) for _ in range(rng.randint(5, 40))]
+        if rng.random() < hit_rate:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        messages.append(" ".join(words).capitalize() + "?")
+    return messages
+
+
+def naive_match(rules, message):
+    # What GeminiClient did: lowercase, then `in` per keyword per answer, first answer wins
+    lowered = message.lower()
+    for answer in rules["answers"]:
+        if any(keyword in lowered for keyword in answer["keywords"]):
+            return answer["name"]
+    return None
+
+
+def alternation_match(pattern, owner, message):
+    # One regex with a plain "|" between keywords; the engine tries every keyword at every position
+    best = None
+    for m in pattern.finditer(message.lower()):
+        best = owner[m.group(1)] if best is None else min(best, owner[m.group(1)])
+    return best
+
+
+def per_message_us(fn, messages):
+    started = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - started) * 1e6 / len(messages)
+
+
+def bench_matching(sizes, num_messages):
+    results = []
+    print(f"{'keywords':>9} {'compile ms':>11} {'naive us':>9} {'alternation us':>15} {'trie us':>8} {'speedup':>8} {'agreement':>10}")
+    for size in sizes:
+        rules = synthetic_rules(size)
+        messages = synthetic_messages(rules, num_messages)
+
+        started = time.perf_counter()
+        canned = CannedAnswers(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        owner = {}
+        for i, answer in enumerate(rules["answers"]):
+            for keyword in answer["keywords"]:
+                owner.setdefault(keyword.lower(), i)
+        alternation = re.compile("(?=(" + "|".join(re.escape(k) for k in sorted(owner, key=len, reverse=True)) + "))")
+
+        naive_us = per_message_us(lambda m: naive_match(rules, m), messages)
+        alternation_us = per_message_us(lambda m: alternation_match(alternation, owner, m), messages)
+        trie_us = per_message_us(canned.match, messages)
+
+        agree = sum(1 for m in messages
+                    if naive_match(rules, m) == ((canned.match(m) or {}).get("name"))) / len(messages)
+        results.append({"keywords": size, "compile_ms": round(compile_ms, 1), "naive_us": round(naive_us, 2),
+                        "alternation_us": round(alternation_us, 2), "trie_us": round(trie_us, 2),
+                        "speedup_vs_naive": round(naive_us / trie_us, 1), "agreement": round(agree, 4)})
+        r = results[-1]
+        print(f"{size:>9} {r['compile_ms']:>11} {r['naive_us']:>9} {r['alternation_us']:>15} {r['trie_us']:>8} "
+              f"{r['speedup_vs_naive']:>7}x {r['agreement']:>10.2%}")
+    return results
+
+
+def bench_rewriting(sizes, num_texts):
+    rng = random.Random(2)
+    results = []
+    print(f"\n{'rewrites':>9} {'chained replace us':>19} {'one pass us':>12} {'identical':>10}")
+    for size in sizes:
+        mapping = dict(load_rules()["rewrites"])
+        while len(mapping) < size:
+            mapping[f"Brand{len(mapping)}X"] = f"Name{len(mapping)}"
+        keys = list(mapping)
+        # Gemini-sized answers with a few rewrite targets in each
+        texts = [" ".join(rng.choice(VOCAB) if rng.random() > 0.02 else rng.choice(keys) for _ in range(200))
+                 for _ in range(num_texts)]
+        rewriter = Rewriter(mapping)
+
+        def chained(text):
+            for key, value in mapping.items():
+                text = text.replace(key, value)
+            return text
+
+        chained_us = per_message_us(chained, texts)
+        one_pass_us = per_message_us(rewriter.rewrite, texts)
+        identical = all(chained(t) == rewriter.rewrite(t) for t in texts)
+        results.append({"rewrites": size, "chained_us": round(chained_us, 2), "one_pass_us": round(one_pass_us, 2),
+                        "identical": identical})
+        print(f"{size:>9} {chained_us:>19.2f} {one_pass_us:>12.2f} {str(identical):>10}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare keyword canned-answer matching and output rewriting as the rule count grows")
+    parser.add_argument("--sizes", default="16,1000,5000,20000", help="Total keywords across all canned answers")
+    parser.add_argument("--rewrite-sizes", default="3,100,1000")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Canned Answer Matching Benchmark")
+    print("=" * 50)
+    matching = bench_matching([int(x) for x in args.sizes.split(",")], args.messages)
+    rewriting = bench_rewriting([int(x) for x in args.rewrite_sizes.split(",")], max(100, args.messages // 10))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"matching": matching, "rewriting": rewriting}, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from fake_gemini import FakeGeminiConfig, start_fake_gemini
+from utils.gemini_rest import GeminiRestModel
+from utils.resilience import CircuitBreaker, ResilientCaller
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def run_policy(model, policy, requests, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await policy.call(lambda: model.generate_content_async(f"Question {i}"))
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stats = policy.stats()
+    return {
+        "success_rate": round(1 - errors / requests, 4),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "attempts_per_call": round(stats["attempts"] / requests, 2),
+        "hedges": stats["hedges"],
+        "short_circuited": stats["short_circuited"],
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+def policies(args):
+    # breaker failures=0 never opens the circuit
+    return {
+        "no_retries": lambda: ResilientCaller("gemini", max_retries=0, breaker=CircuitBreaker(failures=0)),
+        "retries": lambda: ResilientCaller("gemini", max_retries=args.retries, breaker=CircuitBreaker(failures=0)),
+        "retries_hedged": lambda: ResilientCaller("gemini", max_retries=args.retries, hedge_ms=args.hedge_ms,
+                                                  breaker=CircuitBreaker(failures=0)),
+        "retries_breaker": lambda: ResilientCaller("gemini", max_retries=args.retries),
+    }
+
+
+async def scenario(name, config, args):
+    fake = start_fake_gemini(0, config)
+    model = GeminiRestModel("fake-key", "gemini-2.5-flash", f"http://127.0.0.1:{fake.server_address[1]}")
+    results = {}
+    try:
+        print(f"\n{name}")
+        print(f"{'policy':>16} {'success':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'attempts':>9} {'hedges':>7} {'failed fast':>12}")
+        for policy_name, make in policies(args).items():
+            r = await run_policy(model, make(), args.requests, args.concurrency)
+            results[policy_name] = r
+            print(f"{policy_name:>16} {r['success_rate']:>8.1%} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+                  f"{r['attempts_per_call']:>9} {r['hedges']:>7} {r['short_circuited']:>12}")
+    finally:
+        await model.aclose()
+        fake.shutdown()
+    return results
+
+
+async def run(args):
+    scenarios = {
+        "flaky": FakeGeminiConfig(args.first_token_ms, 0.0, 1, error_rate=args.error_rate, jitter_ms=args.jitter_ms),
+        "tail_latency": FakeGeminiConfig(args.first_token_ms, 0.0, 1, jitter_ms=args.jitter_ms,
+                                         stall_rate=args.stall_rate, stall_ms=args.stall_ms),
+        "outage": FakeGeminiConfig(args.first_token_ms, 0.0, 1, error_rate=1.0),
+    }
+    return {name: await scenario(f"{name}: {config.__dict__}", config, args) for name, config in scenarios.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Gemini call policies (retries, hedging, circuit breaker) against a fake Gemini")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--first-token-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Injected 503 rate for the flaky scenario")
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="Requests that stall in the tail latency scenario")
+    parser.add_argument("--stall-ms", type=float, default=3000.0)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--hedge-ms", type=float, default=400.0)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Gemini Resilience Benchmark")
+    print("=" * 50)
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
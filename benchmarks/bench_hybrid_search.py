@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from utils.embeddings import EmbeddingStore
+from utils.lexical_index import tokenize
+
+
+def keyword_queries(store, per_chunk, words, seed=0):
+    # Queries built from a chunk's rarest terms (names, product words), labelled with that chunk: the
+    # exact-match questions pure vector search tends to rank below paraphrase-like neighbours
+    rng = random.Random(seed)
+    lexical = store.lexical
+    queries = []
+    for chunk_id, chunk in store.documents.items():
+        terms = sorted(set(tokenize(chunk['content'])),
+                       key=lambda t: -float(lexical.idf[lexical.term_ids[t]]))[:words * 3]
+        for _ in range(per_chunk):
+            if len(terms) >= words:
+                queries.append((" ".join(rng.sample(terms, words)), chunk_id))
+    return queries
+
+
+def file_queries(store, path):
+    # JSON lines of {"query": ..., "filename": ...}; any chunk of that file counts as relevant
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                ids = {i for i, chunk in store.documents.items() if chunk.get('filename') == record["filename"]}
+                queries.append((record["query"], ids))
+    return queries
+
+
+def relevant(hit, truth):
+    return hit['id'] in truth if isinstance(truth, set) else hit['id'] == truth
+
+
+def evaluate(name, search, queries, k):
+    found, latencies = 0, []
+    for query, truth in queries:
+        started = time.perf_counter()
+        hits = search(query)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        found += any(relevant(hit, truth) for hit in hits[:k])
+    latencies.sort()
+    result = {"recall": round(found / len(queries), 4), "p50_us": round(latencies[len(latencies) // 2], 1),
+              "p95_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1)}
+    print(f"{name:>14} {result['recall']:>9.1%} {result['p50_us']:>9} {result['p95_us']:>9}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall and latency of vector-only, hybrid (BM25 + vector, "
+                                                 "reciprocal-rank fusion) and lexical fast-path retrieval")
+    parser.add_argument("--kb-dir", help="Knowledge base to index (default: data/knowledge_base)")
+    parser.add_argument("--queries", help="JSON lines of {\"query\", \"filename\"} (default: keyword queries per chunk)")
+    parser.add_argument("--per-chunk", type=int, default=5, help="Generated queries per chunk")
+    parser.add_argument("--words", type=int, default=2, help="Terms per generated query")
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Hybrid Search Benchmark")
+    print("=" * 50)
+    store = EmbeddingStore()
+    print(f"[INFO] Indexed {store.build_index(args.kb_dir)['chunks']} chunks")
+    print(f"[INFO] BM25 index: {store.lexical.stats()}")
+    queries = file_queries(store, args.queries) if args.queries else keyword_queries(store, args.per_chunk, args.words)
+    if not queries:
+        print("[ERROR] No queries")
+        return
+    k = args.top_k
+    print(f"[INFO] {len(queries)} queries, recall@{k}")
+
+    # Query embeddings are computed per query inside the timed call, as on the request path
+    results = {"queries": len(queries), "top_k": k}
+    print(f"\n{'retrieval':>14} {'recall':>9} {'p50 us':>9} {'p95 us':>9}")
+    results["dense"] = evaluate("vector only", lambda q: store.search_with_scores(store.encode_queries([q])[0], k), queries, k)
+    results["hybrid"] = evaluate("hybrid (RRF)", lambda q: store.search_hybrid(q, store.encode_queries([q])[0], k), queries, k)
+    results["lexical"] = evaluate("BM25 only", lambda q: [{"id": i} for i, _, _ in store.lexical.search(q, k)], queries, k)
+
+    # Fast path: how often it fires, how often it is right when it does, and what it saves
+    taken, correct, latencies = 0, 0, []
+    for query, truth in queries:
+        started = time.perf_counter()
+        hits = store.lexical_fast_path(query, k)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        if hits:
+            taken += 1
+            correct += relevant(hits[0], truth)
+    latencies.sort()
+    results["fast_path"] = {"taken": round(taken / len(queries), 4), "precision": round(correct / taken, 4) if taken else None,
+                            "p50_us": round(latencies[len(latencies) // 2], 1)}
+    print(f"\nlexical fast path: taken for {results['fast_path']['taken']:.1%} of queries, "
+          f"top chunk relevant {results['fast_path']['precision']}, {results['fast_path']['p50_us']} us "
+          f"(vs {results['hybrid']['p50_us']} us with the encoder)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import utils.database as database
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * pct) - 1)]
+
+
+def inline_log(db_path, row):
+    # What log_conversation used to do on every chat request
+    conn = sqlite3.connect(db_path)
+    conn.execute(database.INSERT_CONVERSATION, row)
+    conn.commit()
+    conn.close()
+
+
+def measure(log_fn, rows):
+    latencies = []
+    for row in rows:
+        started = time.perf_counter()
+        log_fn(row)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "max_ms": round(max(latencies), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request-path latency of inline vs queued conversation logging")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    rows = [("hello", "Hi there!", "greeting", 0.9, "neutral", "ml_local", "2024-01-01 00:00:00")] * args.rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+
+        inline = measure(lambda row: inline_log(database.DB_PATH, row), rows)
+
+        logger = database.ConversationLogger(db_path=database.DB_PATH).start()
+        queued = measure(logger.log, rows)
+        started = time.perf_counter()
+        logger.stop()
+        drain_s = time.perf_counter() - started
+
+        results = {"rows": args.rows, "inline": inline, "queued": queued,
+                   "queued_drain_s": round(drain_s, 3), "writer": logger.stats()}
+
+    print("=" * 50)
+    print("Prat.AI Conversation Logging Latency")
+    print("=" * 50)
+    for mode in ("inline", "queued"):
+        r = results[mode]
+        print(f"{mode:>7}: p50={r['p50_ms']} ms  p99={r['p99_ms']} ms  max={r['max_ms']} ms")
+    print(f"Writer: {results['writer']['written']} rows in {results['writer']['batches']} batches, "
+          f"drained in {results['queued_drain_s']} s after the last enqueue")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("EMBED_CACHE", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import faiss
+import numpy as np
+
+from utils.embeddings import EmbeddingStore
+from utils.vector_index import build_index
+
+WORDS = ("hybrid retrieval intent sentiment knowledge embedding index vector chunk answer "
+         "classifier gemini context latency cache worker memory").split()
+
+
+class NoEncoder:
+    # Loading artifacts never encodes text; keeps SentenceTransformer weights out of the measurement
+    def encode(self, texts):
+        raise RuntimeError("encoder not loaded in this benchmark")
+
+
+def memory_mb():
+    # RSS counts shared pages in full for every process; PSS splits them between the processes mapping them
+    usage = {"rss": None, "pss": None}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    usage[key.lower()] = int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+        usage["rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return usage
+
+
+def make_corpus(num_chunks, dimension, chunk_chars, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num_chunks, dimension), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    documents = {}
+    for i in range(num_chunks):
+        words = rng.choice(WORDS, size=chunk_chars // 8)
+        documents[i] = {"filename": f"doc_{i // 50}.txt", "chunk_id": i % 50, "start": 0,
+                        "end": chunk_chars, "content": " ".join(words)[:chunk_chars]}
+    return vectors, documents
+
+
+def write_artifacts(root, vectors, documents):
+    index = build_index(vectors, "flat", ids=list(documents))
+
+    # What EmbeddingStore.save wrote before: the FAISS index plus one pickle of every chunk
+    legacy_dir = os.path.join(root, "legacy")
+    os.makedirs(legacy_dir)
+    faiss.write_index(index, os.path.join(legacy_dir, "faiss_index.bin"))
+    with open(os.path.join(legacy_dir, "documents.pkl"), "wb") as f:
+        pickle.dump(documents, f)
+
+    mapped_dir = os.path.join(root, "mapped")
+    store = EmbeddingStore(encoder=NoEncoder())
+    store.index = index
+    store.documents = documents
+    store.dimension = vectors.shape[1]
+    store.next_id = len(documents)
+    store.save(mapped_dir)
+    return legacy_dir, mapped_dir
+
+
+def worker(save_dir, mmap, queries, results, release):
+    before = memory_mb()
+    started = time.perf_counter()
+    store = EmbeddingStore(encoder=NoEncoder())
+    store.load(save_dir, mmap=mmap)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    # Serve some traffic so the pages a worker actually touches are resident
+    for query in queries:
+        store.search_with_scores(query, top_k=2)
+    after = memory_mb()
+    results.put({
+        "load_ms": load_ms,
+        "rss_mb": after["rss"] - before["rss"] if after["rss"] is not None else None,
+        "pss_mb": after["pss"] - before["pss"] if after["pss"] is not None else None,
+    })
+    # Stay alive until every worker has measured, so shared pages are shared at measurement time
+    release.wait()
+
+
+def run_mode(save_dir, mmap, workers, queries):
+    ctx = multiprocessing.get_context("spawn")
+    results, release = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(save_dir, mmap, queries, results, release)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    samples = [results.get() for _ in procs]
+    release.set()
+    for proc in procs:
+        proc.join()
+
+    def mean(key):
+        values = [s[key] for s in samples if s[key] is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    pss = [s["pss_mb"] for s in samples if s["pss_mb"] is not None]
+    return {
+        "load_ms": mean("load_ms"),
+        "rss_per_worker_mb": mean("rss_mb"),
+        "pss_per_worker_mb": mean("pss_mb"),
+        "pss_total_mb": round(sum(pss), 1) if pss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory and load time of pickled vs memory-mapped embedding artifacts")
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--chunk-chars", type=int, default=800)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    vectors, documents = make_corpus(args.chunks, args.dimension, args.chunk_chars)
+    queries = vectors[:args.queries]
+
+    print("=" * 50)
+    print("Prat.AI Model Artifact Memory Benchmark")
+    print("=" * 50)
+    print(f"{args.chunks} chunks x {args.dimension} dims, {args.workers} worker processes")
+
+    results = {"chunks": args.chunks, "dimension": args.dimension, "workers": args.workers, "modes": {}}
+    with tempfile.TemporaryDirectory() as root:
+        legacy_dir, mapped_dir = write_artifacts(root, vectors, documents)
+        del vectors, documents
+        for mode, save_dir, mmap in (("pickle", legacy_dir, False), ("mapped_no_mmap", mapped_dir, False),
+                                     ("mapped_mmap", mapped_dir, True)):
+            r = run_mode(save_dir, mmap, args.workers, queries)
+            results["modes"][mode] = r
+            print(f"{mode:>15}: load={r['load_ms']} ms  RSS/worker={r['rss_per_worker_mb']} MB  "
+                  f"PSS/worker={r['pss_per_worker_mb']} MB  PSS total={r['pss_total_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
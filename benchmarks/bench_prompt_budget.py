@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from utils.embeddings import EmbeddingStore
+from utils.persona import PRATCHAT_PERSONA
+from utils.prompt_builder import PromptBuilder, estimate_tokens, PROMPT_CANDIDATES
+
+QUESTIONS = [
+    "What is Prat.AI?",
+    "How does the hybrid routing work?",
+    "What models does Prat.AI use for intent and sentiment?",
+    "How does retrieval augmented generation work here?",
+    "Who is Pratyush Srivastava?",
+    "What is PratWare?",
+    "Why combine local machine learning with an LLM?",
+    "Which parts of Prat.AI run locally?",
+    "How is the knowledge base searched?",
+    "What are the strengths of this assistant?",
+]
+
+
+def previous_prompt(question, hits):
+    # What GeminiClient sent before: the persona inline plus the top two chunks, whatever their size
+    context = "\n\n".join(hit["content"] for hit in hits[:2])
+    prompt = f"{PRATCHAT_PERSONA}\n\n"
+    if context:
+        prompt += f"Context from knowledge base:\n{context}\n\n"
+    return prompt + f"User: {question}\nPrat.AI:"
+
+
+def budgeted_prompt(builder, question, hits):
+    context, _ = builder.build(hits)
+    prompt = f"Context from knowledge base:\n{context}\n\n" if context else ""
+    return prompt + f"User: {question}\nPrat.AI:"
+
+
+def summarize(values):
+    values = sorted(values)
+    return {"mean": round(sum(values) / len(values), 1), "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1]}
+
+
+def run(store, questions, budgets, candidates, min_similarity):
+    persona = estimate_tokens(PRATCHAT_PERSONA)
+    hits = {q: store.search_with_scores(store.encode_queries([q])[0], candidates) for q in questions}
+    before = [estimate_tokens(previous_prompt(q, hits[q])) for q in questions]
+    results = {"persona_tokens": persona, "previous": summarize(before), "budgets": {}}
+    print(f"Persona: ~{persona} tokens, sent as system_instruction (or cached) in the budgeted layout")
+    print(f"\n{'layout':>22} {'mean tok':>9} {'p95 tok':>8} {'max tok':>8} {'saved':>7} {'build us':>9}")
+    print(f"{'previous (top-2)':>22} {results['previous']['mean']:>9} {results['previous']['p95']:>8} "
+          f"{results['previous']['max']:>8} {'':>7} {'':>9}")
+    for budget in budgets:
+        builder = PromptBuilder(budget=budget, min_similarity=min_similarity)
+        started = time.perf_counter()
+        prompts = [budgeted_prompt(builder, q, hits[q]) for q in questions]
+        build_us = (time.perf_counter() - started) * 1e6 / len(questions)
+        # Input tokens per request, persona included; an explicit cache bills the persona at a reduced rate
+        after = [persona + estimate_tokens(p) for p in prompts]
+        r = {**summarize(after), "build_us": round(build_us, 1),
+             "saved": round(1 - sum(after) / sum(before), 4)}
+        results["budgets"][str(budget)] = r
+        print(f"{'budget ' + str(budget):>22} {r['mean']:>9} {r['p95']:>8} {r['max']:>8} {r['saved']:>7.1%} {r['build_us']:>9}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt sizes of the previous top-2 context with the token-budgeted context builder")
+    parser.add_argument("--kb-dir", help="Knowledge base to index (default: data/knowledge_base)")
+    parser.add_argument("--questions", help="Text file with one question per line (default: built-in list)")
+    parser.add_argument("--budgets", default="200,400,800", help="Context budgets in estimated tokens")
+    parser.add_argument("--candidates", type=int, default=PROMPT_CANDIDATES)
+    parser.add_argument("--min-similarity", type=float, default=0.2)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    print("=" * 50)
+    print("Prat.AI Prompt Budget Benchmark")
+    print("=" * 50)
+    store = EmbeddingStore()
+    print(f"[INFO] Indexed {store.build_index(args.kb_dir)['chunks']} chunks")
+    results = run(store, questions, [int(x) for x in args.budgets.split(",")], args.candidates, args.min_similarity)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from bench_ann_index import synthetic_corpus, synthetic_queries, recall_at_k
+from utils.encoder import load_encoder, BACKENDS
+from utils.vector_index import build_index, choose_quantization, rerank, FloatVectors, QUANTIZATIONS
+
+QUESTIONS = [
+    "What is Prat.AI?",
+    "How does the hybrid routing work?",
+    "Who created this assistant?",
+    "Which models run locally?",
+    "How is the knowledge base searched?",
+    "Why combine machine learning with an LLM?",
+]
+
+
+def search(index, queries, k, float_vectors=None, factor=4):
+    latencies, found = [], []
+    for q in queries:
+        q = q.reshape(1, -1)
+        started = time.perf_counter()
+        if float_vectors is not None:
+            _, candidates = index.search(q, k * factor)
+            _, ids = rerank(q, candidates, float_vectors, k)
+        else:
+            _, ids = index.search(q, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids[0].tolist())
+    return latencies, found
+
+
+def bench_index(num_vectors, dimension, num_queries, k, index_types, factor):
+    corpus, centers = synthetic_corpus(num_vectors, dimension)
+    queries = synthetic_queries(centers, num_queries, dimension)
+    ids = np.arange(num_vectors)
+    float_vectors = FloatVectors.build(ids, corpus)
+    # Exact search gives the ground truth every configuration is measured against
+    _, truth = search(build_index(corpus, "flat", ids=ids, quantize="none"), queries, k)
+
+    results = []
+    for index_type in index_types:
+        baseline = None
+        for quantize in QUANTIZATIONS:
+            effective = choose_quantization(num_vectors, quantize)
+            if effective != quantize:
+                print(f"[WARN] {num_vectors} vectors are too few to train PQ; skipping")
+                continue
+            started = time.perf_counter()
+            index = build_index(corpus, index_type, ids=ids, quantize=quantize)
+            build_s = time.perf_counter() - started
+            index_bytes = len(faiss.serialize_index(index))
+            for reranked in ((False, True) if quantize != "none" else (False,)):
+                latencies, found = search(index, queries, k, float_vectors if reranked else None, factor)
+                latencies.sort()
+                r = {
+                    "vectors": num_vectors,
+                    "index_type": index_type,
+                    "quantization": quantize + ("+rerank" if reranked else ""),
+                    "build_s": round(build_s, 2),
+                    "index_mb": round(index_bytes / 1e6, 2),
+                    # Float copies are memory-mapped at serving time; only re-ranked rows are paged in
+                    "float_copy_mb": round(float_vectors.vectors.nbytes / 1e6, 2) if reranked else 0.0,
+                    "p50_ms": round(statistics.median(latencies), 3),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+                    f"recall@{k}": round(recall_at_k(truth, found, k), 4),
+                }
+                if baseline is None:
+                    baseline = r
+                r["memory_saved"] = round(1 - r["index_mb"] / baseline["index_mb"], 4)
+                r["recall_delta"] = round(r[f"recall@{k}"] - baseline[f"recall@{k}"], 4)
+                results.append(r)
+                print(f"{r['vectors']:>9} {r['index_type']:>6} {r['quantization']:>11} {r['index_mb']:>9} "
+                      f"{r['memory_saved']:>7.1%} {r['p50_ms']:>8} {r['p95_ms']:>8} {r[f'recall@{k}']:>9} "
+                      f"{r['recall_delta']:>+7.4f}")
+            del index
+    return results
+
+
+def bench_encoders(model_name, backends, threads, texts, k, kb_dir=None):
+    # Query latency, model size and agreement with the float32 encoder for each runtime
+    from utils.embeddings import EmbeddingStore
+
+    results, reference, reference_hits = [], None, None
+    for backend in backends:
+        try:
+            started = time.perf_counter()
+            model = load_encoder(model_name, backend, threads)
+            load_s = time.perf_counter() - started
+        except Exception as e:
+            print(f"[WARN] {backend} encoder unavailable: {e}")
+            continue
+        model.encode(texts[:2])
+        single = []
+        for text in texts:
+            started = time.perf_counter()
+            model.encode([text])
+            single.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        vectors = model.encode(texts, normalize_embeddings=True)
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        store = EmbeddingStore(model_name=model_name, encoder=model, quantize="none")
+        store.cache = None
+        store.build_index(kb_dir)
+        hits = [[hit["id"] for hit in store.search_with_scores(v, k)] for v in vectors]
+
+        r = {"backend": backend, "threads": threads, "load_s": round(load_s, 2),
+             "model_mb": round(model_bytes(model) / 1e6, 1) if backend != "onnx" else None,
+             "query_p50_ms": round(statistics.median(single), 2),
+             f"batch{len(texts)}_ms": round(batch_ms, 1)}
+        if reference is None:
+            reference, reference_hits = vectors, hits
+        r["cosine_vs_float"] = round(float(np.mean(np.sum(reference * vectors, axis=1))), 5)
+        r[f"recall@{k}_vs_float"] = round(recall_at_k(reference_hits, hits, k), 4)
+        results.append(r)
+        print(f"{backend:>7} {str(r['model_mb']):>9} {r['query_p50_ms']:>9} {r[f'batch{len(texts)}_ms']:>9} "
+              f"{r['cosine_vs_float']:>9} {r[f'recall@{k}_vs_float']:>9}")
+    return results
+
+
+def model_bytes(model):
+    # Parameters plus packed int8 weights (dynamic quantization moves Linear weights out of parameters())
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    for module in model.modules():
+        packed = getattr(module, "_packed_params", None)
+        if packed is not None and hasattr(packed, "_weight_bias"):
+            weight, bias = packed._weight_bias()
+            total += weight.numel() * weight.element_size() + (bias.numel() * bias.element_size() if bias is not None else 0)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory, latency and recall of SQ8/PQ FAISS indexes (with and without float "
+                                                 "re-ranking) and of int8/ONNX query encoders against the float32 baseline")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-types", default="flat,hnsw,ivf")
+    parser.add_argument("--rerank-factor", type=int, default=4, help="Candidates per result fetched for re-ranking")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Encoder runtimes to compare; the first is the baseline")
+    parser.add_argument("--threads", type=int, default=1, help="Encoder intra-op threads")
+    parser.add_argument("--skip-encoders", action="store_true")
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Quantization Benchmark")
+    print("=" * 50)
+    print(f"{'vectors':>9} {'index':>6} {'codes':>11} {'index MB':>9} {'saved':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'recall@' + str(args.k):>9} {'delta':>7}")
+    results = {"indexes": []}
+    for size in [int(s) for s in args.sizes.split(",")]:
+        results["indexes"] += bench_index(size, args.dimension, args.queries, args.k,
+                                          args.index_types.split(","), args.rerank_factor)
+
+    if not args.skip_encoders:
+        print(f"\n{'encoder':>7} {'model MB':>9} {'query ms':>9} {'batch ms':>9} {'cosine':>9} {'recall@2':>9}")
+        texts = [f"{q} ({i})" for i in range(6) for q in QUESTIONS]
+        results["encoders"] = bench_encoders(args.model, args.backends.split(","), args.threads, texts, 2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
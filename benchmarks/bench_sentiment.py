@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from utils.sentiment import analyze_sentiment, analyze_sentiment_batch, get_lexicon
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Negation, intensifier, exclamation and emoticon cases the sample data rarely covers
+EDGE_CASES = [
+    "This is not good", "This is not bad at all", "I am really happy with the answer",
+    "That was really not helpful", "The response was extremely slow and terribly wrong",
+    "Never a good experience", "no problems so far, great work!!!", "awesome :)", "meh :(",
+    "I don't like it", "It isn't bad", "The bot is very very good", "Nice (!)",
+    "What a wonderful, beautiful day", "worst chatbot ever", "ok", "hmm...",
+]
+
+
+def sample_corpus():
+    texts = list(EDGE_CASES)
+    with open(os.path.join(ROOT, "data", "intents.json"), encoding="utf-8") as f:
+        for intent in json.load(f)["intents"]:
+            texts.extend(intent.get("patterns", []))
+            texts.extend(intent.get("responses", []))
+
+    kb_dir = os.path.join(ROOT, "data", "knowledge_base")
+    for name in sorted(os.listdir(kb_dir)) if os.path.isdir(kb_dir) else []:
+        with open(os.path.join(kb_dir, name), encoding="utf-8", errors="ignore") as f:
+            texts.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", f.read()) if len(s.strip()) > 3)
+
+    # Real user messages, when a local conversation log exists
+    db_path = os.path.join(ROOT, "pratchat.db")
+    if os.path.exists(db_path):
+        try:
+            with sqlite3.connect(db_path) as conn:
+                texts.extend(row[0] for row in conn.execute("SELECT DISTINCT user_message FROM conversations LIMIT 5000"))
+        except sqlite3.Error:
+            pass
+    return texts
+
+
+def throughput(fn, texts, min_seconds):
+    calls, started = 0, time.perf_counter()
+    while True:
+        fn(texts)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return round(calls * len(texts) / elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy against TextBlob and messages/sec of the sentiment engines")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Minimum time per throughput measurement")
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    texts = sample_corpus()
+
+    print("=" * 50)
+    print("Prat.AI Sentiment Engine Benchmark")
+    print("=" * 50)
+
+    started = time.perf_counter()
+    get_lexicon()
+    compile_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Lexicon: {len(get_lexicon().table)} entries compiled in {compile_ms} ms")
+
+    # Agreement with TextBlob, which the lexicon engine replaces
+    reference = [analyze_sentiment(t, engine="textblob") for t in texts]
+    fast = analyze_sentiment_batch(texts, engine="lexicon")
+    agree = sum(r["sentiment"] == f["sentiment"] for r, f in zip(reference, fast))
+    exact = sum(r["polarity"] == f["polarity"] for r, f in zip(reference, fast))
+    mismatches = [(t, r, f) for t, r, f in zip(texts, reference, fast) if r["sentiment"] != f["sentiment"]]
+    print(f"{len(texts)} sample texts: label agreement {agree / len(texts):.2%}, "
+          f"polarity identical {exact / len(texts):.2%}")
+    for text, r, f in mismatches[:10]:
+        print(f"  [WARN] {text[:60]!r}: textblob={r['sentiment']} ({r['polarity']}) lexicon={f['sentiment']} ({f['polarity']})")
+
+    results = {"texts": len(texts), "compile_ms": compile_ms, "label_agreement": round(agree / len(texts), 4),
+               "polarity_identical": round(exact / len(texts), 4), "messages_per_sec": {}}
+    print(f"{'engine':>18} {'msg/s':>12} {'speedup':>8}")
+    runs = (
+        ("textblob", lambda batch: [analyze_sentiment(t, engine="textblob") for t in batch]),
+        ("lexicon", lambda batch: [analyze_sentiment(t, engine="lexicon") for t in batch]),
+        ("lexicon_batch", lambda batch: analyze_sentiment_batch(batch, engine="lexicon")),
+    )
+    for name, fn in runs:
+        rate = throughput(fn, texts, args.seconds)
+        results["messages_per_sec"][name] = rate
+        speedup = rate / results["messages_per_sec"]["textblob"]
+        print(f"{name:>18} {rate:>12} {speedup:>7.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import utils.database as database
+from utils.prompt_builder import prompt_builder
+from utils.sessions import SessionStore, new_session_id
+
+WORDS = ("prat ai hybrid model intent sentiment retrieval knowledge base gemini answer question local fast "
+         "explain how does what the a of and to in is for with vector index search chunk cache").split()
+
+
+def text(rng, chars):
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)[:chars]
+
+
+def conversation(rng, turns, question_chars, reply_chars):
+    return [(text(rng, question_chars), text(rng, reply_chars)) for _ in range(turns)]
+
+
+def measure(build):
+    # Bytes allocated by build() and still held by what it returns
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, after - before
+
+
+def session_turns(pool, i):
+    # Fresh strings per session, as each would arrive in its own request
+    return [(q + " " + str(i), r + " " + str(i)) for q, r in pool[i % len(pool)]]
+
+
+def naive(ids, pool):
+    # Full history per session as a list of message dicts, what a client resending history implies
+    sessions = {}
+    for i, session_id in enumerate(ids):
+        history = sessions.setdefault(session_id, [])
+        for user_message, reply in session_turns(pool, i):
+            history.append({"role": "user", "content": user_message})
+            history.append({"role": "assistant", "content": reply})
+    return sessions
+
+
+def bounded(ids, pool):
+    store = SessionStore(max_active=len(ids), spill=False)
+    for i, session_id in enumerate(ids):
+        for user_message, reply in session_turns(pool, i):
+            store.append(session_id, user_message, reply)
+    return store
+
+
+def time_per_op(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return round((time.perf_counter() - started) * 1e6 / len(items), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per active chat session for full message histories and the bounded session store, "
+                                                 "plus append/history latency and SQLite spill throughput")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session")
+    parser.add_argument("--question-chars", type=int, default=80)
+    parser.add_argument("--reply-chars", type=int, default=800)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Session Store Benchmark")
+    print("=" * 50)
+    rng = random.Random(0)
+    # A pool of distinct conversations reused across sessions keeps generation time down
+    pool = [conversation(rng, args.turns, args.question_chars, args.reply_chars) for _ in range(200)]
+    ids = [new_session_id() for _ in range(args.sessions)]
+
+    results = {"sessions": args.sessions, "turns": args.turns, "question_chars": args.question_chars,
+               "reply_chars": args.reply_chars}
+    held, naive_bytes = measure(lambda: naive(ids, pool))
+    del held
+    store, store_bytes = measure(lambda: bounded(ids, pool))
+    results["full_history_mb"] = round(naive_bytes / 1e6, 1)
+    results["session_store_mb"] = round(store_bytes / 1e6, 1)
+    results["bytes_per_session"] = {"full_history": naive_bytes // args.sessions, "session_store": store_bytes // args.sessions}
+    print(f"{'layout':>16} {'MB':>9} {'bytes/session':>14}")
+    print(f"{'full history':>16} {results['full_history_mb']:>9} {results['bytes_per_session']['full_history']:>14}")
+    print(f"{'session store':>16} {results['session_store_mb']:>9} {results['bytes_per_session']['session_store']:>14}")
+
+    sample = rng.sample(ids, min(10000, len(ids)))
+    results["append_us"] = time_per_op(lambda i: store.append(i, "one more question", "one more answer " * 20), sample)
+    results["history_us"] = time_per_op(lambda i: prompt_builder.history(store.get(i).summary, store.get(i).turns()), sample)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "sessions.db")
+        database.init_db()
+        store.spill = True
+        store.db_path = database.DB_PATH
+        store._spilling.update(store.sessions)
+        store.sessions.clear()
+        started = time.perf_counter()
+        spilled = store.sweep()
+        spill_s = time.perf_counter() - started
+        results["spill_sessions_per_sec"] = round(spilled / spill_s, 1)
+        results["restore_us"] = time_per_op(store.restore, sample[:1000])
+        results["db_mb"] = round(os.path.getsize(database.DB_PATH) / 1e6, 1)
+
+    print(f"\nappend {results['append_us']} us, history render {results['history_us']} us, "
+          f"restore from SQLite {results['restore_us']} us")
+    print(f"spill {results['spill_sessions_per_sec']} sessions/s, {results['db_mb']} MB on disk")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
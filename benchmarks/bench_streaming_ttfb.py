@@ -0,0 +1,129 @@
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_gemini import FakeGeminiConfig, start_fake_gemini
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+MESSAGES = [
+    "Explain how retrieval augmented generation works",
+    "What are the limitations of hybrid chatbots?",
+    "Describe the architecture of this assistant in detail",
+]
+
+
+def wait_for_server(base_url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/", timeout=2).read()
+            return True
+        except Exception:
+            time.sleep(0.5)
+    return False
+
+
+def timed_request(base_url, path, message, streaming):
+    url = urllib.parse.urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=120)
+    body = json.dumps({"message": message})
+    started = time.perf_counter()
+    conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+
+    first_content = None
+    if streaming:
+        # TTFB for the stream is the first model token, not the metadata event
+        event = None
+        for raw in resp:
+            line = raw.decode("utf-8").strip()
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event == "token" and first_content is None:
+                first_content = time.perf_counter() - started
+    else:
+        resp.read(1)
+        first_content = time.perf_counter() - started
+        resp.read()
+    total = time.perf_counter() - started
+    conn.close()
+    return first_content, total
+
+
+def summarize(samples):
+    samples = sorted(s for s in samples if s is not None)
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None}
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 1),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time-to-first-byte of /api/chat and /api/chat/stream")
+    parser.add_argument("--url", help="Use an already running server (started with GEMINI_API_ENDPOINT pointing at a fake)")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    server_proc = None
+    base_url = args.url
+    if base_url is None:
+        fake = start_fake_gemini(0, FakeGeminiConfig(args.first_token_ms, args.token_ms, args.tokens))
+        env = dict(os.environ,
+                   GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "fake-key"),
+                   GEMINI_API_ENDPOINT=f"http://127.0.0.1:{fake.server_address[1]}",
+                   RESPONSE_CACHE="0")
+        server_proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=SERVER_DIR, env=env
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        if not wait_for_server(base_url):
+            print("[ERROR] Server did not start")
+            return
+
+        print("=" * 50)
+        print("Prat.AI Streaming TTFB Benchmark")
+        print("=" * 50)
+
+        results = {}
+        for mode, path, streaming in (("non_streaming", "/api/chat", False), ("streaming", "/api/chat/stream", True)):
+            ttfb, total = [], []
+            for i in range(args.requests):
+                first, whole = timed_request(base_url, path, MESSAGES[i % len(MESSAGES)], streaming)
+                ttfb.append(first)
+                total.append(whole)
+            results[mode] = {"ttfb": summarize(ttfb), "total": summarize(total)}
+            print(f"{mode:>14}: TTFB p50={results[mode]['ttfb']['p50_ms']} ms  p95={results[mode]['ttfb']['p95_ms']} ms  "
+                  f"total p50={results[mode]['total']['p50_ms']} ms")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"[OK] Results written to {args.output}")
+    finally:
+        if server_proc is not None:
+            server_proc.terminate()
+            server_proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_gemini import FakeGeminiConfig, start_fake_gemini
+from load_test_chat import run_level
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_levels():
+    levels, n = [], 1
+    while n < available_cores():
+        levels.append(n)
+        n *= 2
+    return ",".join(str(x) for x in levels + [available_cores()])
+
+
+def wait_ready(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/ready", timeout=2) as resp:
+                if resp.status == 200:
+                    return True
+        except Exception:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests/sec of serve.py as the number of worker processes grows")
+    parser.add_argument("--workers", default=default_levels(), help="Comma separated worker counts")
+    parser.add_argument("--port", type=int, default=8013)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests-per-client", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    # A fast fake Gemini keeps the run CPU-bound on intent, sentiment and embedding work
+    fake = start_fake_gemini(0, FakeGeminiConfig(first_token_ms=args.first_token_ms, token_ms=1.0, tokens=20))
+    env = dict(os.environ,
+               GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "fake-key"),
+               GEMINI_API_ENDPOINT=f"http://127.0.0.1:{fake.server_address[1]}",
+               RESPONSE_CACHE="0", EMBED_CACHE="0")
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print("=" * 50)
+    print("Prat.AI Worker Scaling Benchmark")
+    print("=" * 50)
+    print(f"{available_cores()} cores available, {args.concurrency} concurrent clients")
+    print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'speedup':>8}")
+
+    results = []
+    for workers in [int(x) for x in args.workers.split(",")]:
+        proc = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1",
+             "--port", str(args.port), "--log-level", "warning"],
+            cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(base_url, args.timeout):
+                print(f"[ERROR] serve.py with {workers} workers did not become ready")
+                continue
+            # Warm every worker (first-request allocations, batchers) before measuring
+            run_level(base_url + "/api/chat", workers * 2, 2, args.timeout)
+            r = run_level(base_url + "/api/chat", args.concurrency, args.requests_per_client, args.timeout)
+            r["workers"] = workers
+            r["speedup"] = round(r["throughput_rps"] / results[0]["throughput_rps"], 2) if results else 1.0
+            results.append(r)
+            print(f"{workers:>8} {r['throughput_rps']:>8} {str(r['p50_ms']):>9} {str(r['p95_ms']):>9} "
+                  f"{r['errors']:>7} {r['speedup']:>7}x")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    fake.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"cores": available_cores(), "results": results}, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
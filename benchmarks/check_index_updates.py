@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from bench_ann_index import synthetic_corpus
+from utils.vector_index import (build_index, remove_vectors, read_index, writable_copy, choose_quantization,
+                                FloatVectors, rerank, INDEX_TYPES, QUANTIZATIONS)
+
+
+def top1(index, queries, float_vectors=None, factor=4):
+    # Quantized candidates are re-ranked with the float copies, as EmbeddingStore.search_batch does
+    if float_vectors is None:
+        _, ids = index.search(queries, 1)
+    else:
+        _, candidates = index.search(queries, factor)
+        _, ids = rerank(queries, candidates, float_vectors, 1)
+    return ids[:, 0]
+
+
+def check(index_type, quantize, num_vectors, dimension, tolerance):
+    # Three "files" of chunks; the middle one is edited the way EmbeddingStore.update_index does it
+    # (remove its chunk ids, add the new chunks under fresh ids), then every untouched chunk is
+    # searched for before and after the edit, and again after a save/load round trip
+    corpus, _ = synthetic_corpus(num_vectors, dimension)
+    edited, _ = synthetic_corpus(num_vectors // 3, dimension, seed=2)
+    files = np.array_split(np.arange(num_vectors), 3)
+    kept = np.concatenate([files[0], files[2]])
+    new_ids = np.arange(num_vectors, num_vectors + len(edited))
+
+    # Quantized stores keep full-precision copies next to the index
+    original, float_vectors = None, None
+    if quantize != "none":
+        original = FloatVectors.build(np.arange(num_vectors), corpus)
+        float_vectors = original.replace(files[1], new_ids, edited)
+
+    index = build_index(corpus, index_type, ids=np.arange(num_vectors), quantize=quantize)
+    before = top1(index, corpus[kept], original)
+
+    index = remove_vectors(index, files[1], float_vectors)
+    index.add_with_ids(edited, new_ids)
+    after = top1(index, corpus[kept], float_vectors)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.bin")
+        faiss.write_index(index, path)
+        loaded = read_index(path, mmap=True)
+        reloaded = top1(loaded, corpus[kept], float_vectors)
+        # Edits after a restart go through a private copy of the mapped index
+        copy = remove_vectors(writable_copy(loaded), new_ids[:10])
+        resurrected = int(np.isin(top1(copy, edited[:10], float_vectors), new_ids[:10]).sum())
+        del loaded
+
+    problems = []
+    for name, found in (("update", after), ("save/load", reloaded)):
+        stale = int(np.isin(found, files[1]).sum() + (found < 0).sum())
+        # Chunks that found themselves before the edit and no longer do
+        regressed = float(np.mean((before == kept) & (found != kept)))
+        if stale or regressed > tolerance:
+            problems.append(f"{name}: {stale} stale or missing ids, {regressed:.1%} of chunks no longer found")
+    if resurrected:
+        problems.append(f"save/load: {resurrected} removed ids still returned")
+    edited_found = float(np.mean(top1(index, edited, float_vectors) == new_ids))
+    if edited_found < 1 - tolerance:
+        problems.append(f"only {edited_found:.1%} of the edited chunks found")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that incremental knowledge base updates keep every index type's "
+                                                 "chunk ids in step with its vectors")
+    parser.add_argument("--vectors", type=int, default=12000, help="Enough to train PQ codes")
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--index-types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--quantizations", default=",".join(QUANTIZATIONS))
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Share of chunks approximate indexes may stop finding after an update")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Incremental Index Check")
+    print("=" * 50)
+    failed = 0
+    for index_type in args.index_types.split(","):
+        for quantize in args.quantizations.split(","):
+            if choose_quantization(args.vectors, quantize) != quantize:
+                print(f"[WARN] {args.vectors} vectors are too few to train PQ; skipping {index_type}/{quantize}")
+                continue
+            problems = check(index_type, quantize, args.vectors, args.dimension,
+                             0.0 if (index_type, quantize) == ("flat", "none") else args.tolerance)
+            for problem in problems:
+                print(f"[ERROR] {index_type}/{quantize}: {problem}")
+            if not problems:
+                print(f"[OK] {index_type}/{quantize}")
+            failed += bool(problems)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
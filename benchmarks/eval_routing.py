@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from utils import artifacts
+from utils.routing import DEFAULT_CONFIG, ResponseRouter, load_config
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+WORD_RE = re.compile(r"[a-z0-9]+")
+GEMINI_TYPES = ("llm_gemini", "llm_gemini_partial")
+
+
+def load_conversations(db_path, limit):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT user_message, bot_response, response_type FROM conversations ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+
+def token_f1(candidate, reference):
+    # Unigram overlap with the answer Gemini actually gave; a rough proxy for answer quality
+    cand, ref = Counter(WORD_RE.findall(candidate.lower())), Counter(WORD_RE.findall(reference.lower()))
+    common = sum((cand & ref).values())
+    if not common:
+        return 0.0
+    precision, recall = common / sum(cand.values()), common / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def route(router, message, intent_result, hits):
+    if router.is_local(intent_result):
+        return "ml_local", intent_result['responses'][0]
+    extractive = router.extractive(intent_result['intent'], message, hits)
+    if extractive:
+        return "kb_extractive", extractive
+    return "llm_gemini", None
+
+
+def evaluate(router, rows, intents, hits, gemini_ms):
+    tiers, by_intent, f1_scores, samples = Counter(), {}, {"ml_local": [], "kb_extractive": []}, []
+    started = time.perf_counter()
+    decisions = [route(router, row[0], intent, doc_hits) for row, intent, doc_hits in zip(rows, intents, hits)]
+    local_ms = (time.perf_counter() - started) * 1000 / max(1, len(rows))
+
+    for (message, logged, logged_type), intent, (tier, answer) in zip(rows, intents, decisions):
+        tiers[tier] += 1
+        counts = by_intent.setdefault(intent['intent'], Counter())
+        counts[tier] += 1
+        if tier != "llm_gemini" and logged_type in GEMINI_TYPES:
+            f1_scores[tier].append(token_f1(answer, logged))
+            if len(samples) < 5:
+                samples.append({"message": message, "tier": tier, "answer": answer, "gemini": logged})
+
+    gemini_calls = tiers["llm_gemini"]
+    avoided = len(rows) - gemini_calls
+    return {
+        "tiers": dict(tiers),
+        "gemini_calls": gemini_calls,
+        "by_intent": {intent: dict(counts) for intent, counts in sorted(by_intent.items())},
+        "answered_locally": avoided,
+        "routing_ms_per_message": round(local_ms, 3),
+        "latency_saved_s": round(avoided * (gemini_ms - local_ms) / 1000, 1),
+        "f1_vs_gemini": {tier: round(statistics.mean(v), 3) if v else None for tier, v in f1_scores.items()},
+        "compared_with_gemini": {tier: len(v) for tier, v in f1_scores.items()},
+        "samples": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged conversations through the tiered router and report Gemini avoidance")
+    parser.add_argument("--db", default=os.path.join(ROOT, "pratchat.db"))
+    parser.add_argument("--limit", type=int, default=10000, help="Most recent conversations to replay")
+    parser.add_argument("--config", default=None, help="Routing config to evaluate (default: data/routing.json)")
+    parser.add_argument("--gemini-ms", type=float, default=1500.0, help="Gemini latency per call to count as saved (use your measured p50)")
+    parser.add_argument("--sweep", default="0.4,0.5,0.6,0.7,0.8", help="Default extractive similarity thresholds to compare")
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    rows = load_conversations(args.db, args.limit)
+    if not rows:
+        print(f"[ERROR] No conversations in {args.db}")
+        return
+
+    print("=" * 50)
+    print("Prat.AI Routing Evaluation")
+    print("=" * 50)
+
+    classifier = artifacts.load_intent_classifier()
+    store = artifacts.load_embedding_store()
+    messages = [row[0] for row in rows]
+    intents = classifier.predict_batch(messages)
+    hits = store.search_batch(store.encode_queries(messages), 2)
+    logged_gemini = sum(1 for row in rows if row[2] in GEMINI_TYPES)
+    print(f"{len(rows)} logged conversations, {logged_gemini} answered by Gemini at the time")
+
+    config = load_config(args.config) if args.config else load_config()
+    baseline = evaluate(ResponseRouter(DEFAULT_CONFIG), rows, intents, hits, args.gemini_ms)
+    tiered = evaluate(ResponseRouter(config), rows, intents, hits, args.gemini_ms)
+    avoidance = 1 - tiered["gemini_calls"] / baseline["gemini_calls"] if baseline["gemini_calls"] else 0.0
+
+    print(f"\nGemini calls: {baseline['gemini_calls']} with the old greeting/goodbye/thanks rule, "
+          f"{tiered['gemini_calls']} with the tiered router ({avoidance:.1%} avoided)")
+    print(f"Tiers: {tiered['tiers']}")
+    print(f"Latency saved: ~{tiered['latency_saved_s'] - baseline['latency_saved_s']:.1f} s "
+          f"at {args.gemini_ms:.0f} ms per Gemini call ({tiered['routing_ms_per_message']} ms per local answer)")
+    print(f"Token F1 against the logged Gemini answer: {tiered['f1_vs_gemini']} (n={tiered['compared_with_gemini']})")
+    for sample in tiered["samples"]:
+        print(f"  [{sample['tier']}] {sample['message'][:60]!r}\n      local:  {sample['answer'][:100]!r}\n"
+              f"      gemini: {sample['gemini'][:100]!r}")
+
+    # Same per-intent settings, different default extractive threshold
+    print(f"\n{'threshold':>10} {'gemini':>8} {'avoided':>8} {'extractive':>11} {'extractive F1':>14}")
+    sweep = []
+    for threshold in [float(x) for x in args.sweep.split(",")]:
+        swept = {**config, "default": {**config.get("default", {}), "extractive_similarity": threshold}}
+        r = evaluate(ResponseRouter(swept), rows, intents, hits, args.gemini_ms)
+        r_avoid = 1 - r["gemini_calls"] / baseline["gemini_calls"] if baseline["gemini_calls"] else 0.0
+        sweep.append({"threshold": threshold, "gemini_calls": r["gemini_calls"], "avoidance": round(r_avoid, 4),
+                      "extractive": r["tiers"].get("kb_extractive", 0), "extractive_f1": r["f1_vs_gemini"]["kb_extractive"]})
+        print(f"{threshold:>10} {r['gemini_calls']:>8} {r_avoid:>8.1%} {r['tiers'].get('kb_extractive', 0):>11} "
+              f"{str(r['f1_vs_gemini']['kb_extractive']):>14}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"conversations": len(rows), "baseline": baseline, "tiered": tiered,
+                       "avoidance": round(avoidance, 4), "sweep": sweep}, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
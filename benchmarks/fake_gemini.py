@@ -0,0 +1,168 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Gemini REST API (generateContent / streamGenerateContent?alt=sse).
+# Point the server at it with GEMINI_API_ENDPOINT=http://127.0.0.1:<port>.
+
+WORDS = ("Prat.AI combines local intent and sentiment models with retrieval augmented "
+         "generation so that simple questions stay fast while complex ones get rich answers").split()
+
+
+class FakeGeminiConfig:
+    def __init__(self, first_token_ms=300.0, token_ms=20.0, tokens=60, error_rate=0.0, jitter_ms=0.0,
+                 stall_rate=0.0, stall_ms=5000.0):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.jitter_ms = jitter_ms
+        # Fraction of requests that sit for stall_ms before answering, to simulate tail latency
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+
+
+def _candidate(text, finished=False, usage=None):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    payload = {"candidates": [candidate]}
+    if usage:
+        payload["usageMetadata"] = usage
+    return payload
+
+
+def _tokens(text):
+    # Same four-characters-per-token estimate the server budgets with
+    return (len(text) + 3) // 4
+
+
+def _parts_text(content):
+    return "".join(part.get("text", "") for part in (content or {}).get("parts", []))
+
+
+def make_handler(config):
+    # cachedContents name -> cached token count
+    caches = {}
+    caches_lock = threading.Lock()
+
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _sleep(self, ms):
+            jitter = random.uniform(0, config.jitter_ms) if config.jitter_ms else 0.0
+            time.sleep((ms + jitter) / 1000.0)
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up (timeout or a hedged request that lost the race)
+                pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path.split("?")[0].endswith("/cachedContents"):
+                with caches_lock:
+                    name = f"cachedContents/fake{len(caches)}"
+                    caches[name] = _tokens(_parts_text(body.get("systemInstruction")))
+                self._send_json(200, {"name": name, "model": body.get("model"), "ttl": body.get("ttl")})
+                return
+
+            if random.random() < config.error_rate:
+                self._sleep(config.first_token_ms / 4)
+                self._send_json(503, {"error": {"code": 503, "message": "injected failure", "status": "UNAVAILABLE"}})
+                return
+
+            if random.random() < config.stall_rate:
+                self._sleep(config.stall_ms)
+
+            words = [WORDS[i % len(WORDS)] for i in range(config.tokens)]
+            # Token counts as Gemini reports them: promptTokenCount includes the cached part
+            cached = caches.get(body.get("cachedContent"), 0)
+            prompt_tokens = cached + _tokens(_parts_text(body.get("systemInstruction"))) + sum(
+                _tokens(_parts_text(content)) for content in body.get("contents", []))
+            usage = {"promptTokenCount": prompt_tokens, "cachedContentTokenCount": cached,
+                     "candidatesTokenCount": len(words), "totalTokenCount": prompt_tokens + len(words)}
+
+            if ":streamGenerateContent" in self.path:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._sleep(config.first_token_ms)
+                for i, word in enumerate(words):
+                    if i:
+                        self._sleep(config.token_ms)
+                    last = i == len(words) - 1
+                    event = f"data: {json.dumps(_candidate(word + ' ', last, usage if last else None))}\r\n\r\n".encode("utf-8")
+                    self.wfile.write(f"{len(event):X}\r\n".encode("ascii") + event + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+                return
+
+            if ":generateContent" in self.path:
+                # Non-streaming calls return only after the whole completion would have been generated
+                self._sleep(config.first_token_ms + config.token_ms * max(0, len(words) - 1))
+                self._send_json(200, _candidate(" ".join(words), True, usage))
+                return
+
+            self._send_json(404, {"error": {"code": 404, "message": f"unknown path {self.path}"}})
+
+        def do_PATCH(self):
+            # TTL updates of a cached context
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            name = self.path.split("/v1beta/", 1)[-1].split("?")[0]
+            if name not in caches:
+                self._send_json(404, {"error": {"code": 404, "message": f"unknown cache {name}"}})
+                return
+            self._send_json(200, {"name": name, "ttl": body.get("ttl")})
+
+    return FakeGeminiHandler
+
+
+def start_fake_gemini(port=0, config=None):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config or FakeGeminiConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Gemini REST server with configurable latency and errors")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-ms", type=float, default=5000.0)
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(args.first_token_ms, args.token_ms, args.tokens, args.error_rate, args.jitter_ms,
+                              args.stall_rate, args.stall_ms)
+    server = start_fake_gemini(args.port, config)
+    print(f"[OK] Fake Gemini listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+MESSAGES = [
+    "What is Prat.AI?",
+    "How does retrieval augmented generation work?",
+    "Explain the hybrid routing in this project",
+    "What can you help me with?",
+    "Tell me about the knowledge base",
+]
+
+
+def send_chat(url, message, timeout):
+    body = json.dumps({"message": message}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def run_level(url, concurrency, requests_per_client, timeout):
+    total = concurrency * requests_per_client
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(total)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda m: send_chat(url, m, timeout), messages))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[1] for r in results if r[0] == 200)
+    errors = sum(1 for r in results if r[0] != 200)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /api/chat throughput at increasing client concurrency")
+    parser.add_argument("--url", default="http://localhost:8000/api/chat")
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--requests-per-client", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI /api/chat Load Test")
+    print("=" * 50)
+    print(f"{'clients':>8} {'reqs':>6} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    results = []
+    for level in [int(x) for x in args.levels.split(",")]:
+        r = run_level(args.url, level, args.requests_per_client, args.timeout)
+        results.append(r)
+        print(f"{r['concurrency']:>8} {r['requests']:>6} {r['errors']:>7} {r['throughput_rps']:>8} "
+              f"{str(r['p50_ms']):>9} {str(r['p95_ms']):>9} {str(r['p99_ms']):>9}")
+
+    if len(results) > 1 and results[0]["throughput_rps"]:
+        scaling = results[-1]["throughput_rps"] / results[0]["throughput_rps"]
+        print(f"\nThroughput scaling {results[0]['concurrency']} -> {results[-1]['concurrency']} clients: {scaling:.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from bench_ann_index import synthetic_corpus, synthetic_queries
+
+MESSAGES = [
+    "hello there",
+    "What is Prat.AI?",
+    "How does retrieval augmented generation work?",
+    "Thanks a lot, that was really helpful!",
+    "I don't think this answer is good at all",
+    "Explain the hybrid routing in this project",
+    "Can you tell me a joke?",
+    "What is the weather like today?",
+    "Who created you and why?",
+    "Describe the architecture of this assistant in detail, including the embedding store and FAISS index",
+]
+
+
+def time_calls(fn, inputs, min_calls, rounds=3):
+    # Per-call latency over min_calls calls, cycling through inputs, after one warm-up pass. The calls are
+    # split into rounds and the median round is reported, which keeps one noisy stretch out of the numbers.
+    for item in inputs:
+        fn(item)
+    per_round = max(1, min_calls // rounds)
+    measured = []
+    for _ in range(rounds):
+        latencies = []
+        started = time.perf_counter()
+        for i in range(per_round):
+            item = inputs[i % len(inputs)]
+            t0 = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        measured.append({
+            "calls": len(latencies),
+            "p50_us": round(latencies[len(latencies) // 2] * 1e6, 2),
+            "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6, 2),
+            "ops_per_sec": round(len(latencies) / elapsed, 1),
+        })
+    measured.sort(key=lambda r: r["p50_us"])
+    return {**measured[len(measured) // 2], "rounds": rounds}
+
+
+def bench_predict(calls):
+    from utils.ml_model import IntentClassifier
+    # Trained from data/intents.json rather than loaded, so results do not depend on local artifacts
+    classifier = IntentClassifier()
+    classifier.train()
+    batch = MESSAGES * 10
+    return {
+        "single": time_calls(classifier.predict, MESSAGES, calls),
+        "batch_100": time_calls(lambda _: classifier.predict_batch(batch), [None], max(30, calls // 100)),
+    }
+
+
+def bench_sentiment(calls):
+    from utils.sentiment import analyze_sentiment
+    results = {}
+    for engine in ("lexicon", "textblob"):
+        try:
+            results[engine] = time_calls(lambda text: analyze_sentiment(text, engine=engine), MESSAGES,
+                                         calls if engine == "lexicon" else max(100, calls // 10))
+        except ImportError as e:
+            print(f"[WARN] Sentiment engine {engine} skipped: {e}")
+    return results
+
+
+def bench_search(sizes, calls, dimension=384, top_k=2):
+    from utils.embeddings import EmbeddingStore
+    from utils.vector_index import build_index, index_type_of
+    results = {}
+    for size in sizes:
+        corpus, centers = synthetic_corpus(size, dimension)
+        queries = synthetic_queries(centers, 200, dimension)
+        # A store around a synthetic index; search never touches the encoder
+        store = EmbeddingStore(encoder=object())
+        store.cache = None
+        store.index = build_index(corpus, "auto")
+        store.documents = {i: {"content": f"chunk {i}", "filename": "synthetic.txt"} for i in range(size)}
+        results[str(size)] = {
+            "index_type": index_type_of(store.index),
+            **time_calls(lambda q: store.search_with_scores(q, top_k), list(queries), calls),
+        }
+        print(f"  search @ {size:>8}: {results[str(size)]}")
+    return results
+
+
+def bench_log(calls):
+    import utils.database as database
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        logger = database.ConversationLogger(db_path=database.DB_PATH, queue_size=calls * 2).start()
+        serving_logger = database.conversation_logger
+        database.conversation_logger = logger
+        try:
+            enqueue = time_calls(lambda text: database.log_conversation(text, "Hi there!", "greeting", 0.9, "neutral", "ml_local"),
+                                 MESSAGES, calls)
+            started = time.perf_counter()
+            logger.stop()
+            drain_s = time.perf_counter() - started
+        finally:
+            database.conversation_logger = serving_logger
+        stats = logger.stats()
+    return {"enqueue": enqueue, "rows_written": stats["written"], "batches": stats["batches"],
+            "drain_s": round(drain_s, 3)}
+
+
+def run(calls=2000, sizes=(1000, 10000, 100000)):
+    results = {}
+    print("Intent prediction...")
+    results["predict"] = bench_predict(calls)
+    print("Sentiment...")
+    results["sentiment"] = bench_sentiment(calls)
+    print("Vector search...")
+    results["search"] = bench_search(sizes, calls)
+    print("Conversation logging...")
+    results["log_conversation"] = bench_log(calls)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for intent prediction, sentiment, vector search and conversation logging")
+    parser.add_argument("--calls", type=int, default=2000, help="Timed calls per benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Corpus sizes (chunks) for the search benchmark")
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Microbenchmarks")
+    print("=" * 50)
+    results = run(args.calls, [int(x) for x in args.sizes.split(",")])
+    for name in ("predict", "sentiment", "log_conversation"):
+        for case, r in results[name].items():
+            if isinstance(r, dict):
+                print(f"{name + ' ' + case:>26}: p50={r['p50_us']} us  p99={r['p99_us']} us  {r['ops_per_sec']} ops/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
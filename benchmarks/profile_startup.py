@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+
+def poll(url, deadline, want_status=200):
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resp:
+                if resp.status == want_status:
+                    return json.loads(resp.read() or b"null")
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def profile_once(port, timeout, env):
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    try:
+        if poll(base_url + "/health", deadline) is None:
+            return None
+        listening_s = time.perf_counter() - started
+        snapshot = poll(base_url + "/ready", deadline)
+        if snapshot is None:
+            return None
+        ready_s = time.perf_counter() - started
+        # Let optional components (Gemini client) finish so their timings show up too
+        while snapshot.get("warmup_ms") is None and time.time() < deadline:
+            time.sleep(0.05)
+            snapshot = poll(base_url + "/health", deadline) or snapshot
+        return {
+            "listening_ms": round(listening_s * 1000, 1),
+            "ready_ms": round(ready_s * 1000, 1),
+            "import_ms": snapshot["import_ms"],
+            "warmup_ms": snapshot["warmup_ms"],
+            "components": {name: c["load_ms"] if c["rebuild_ms"] is None else c["rebuild_ms"]
+                           for name, c in snapshot["components"].items()},
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile server startup: time to open the port, time to /ready, per-component load time")
+    parser.add_argument("--port", type=int, default=8012)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+
+    print("=" * 50)
+    print("Prat.AI Startup Profile")
+    print("=" * 50)
+
+    runs = []
+    for i in range(args.runs):
+        result = profile_once(args.port, args.timeout, env)
+        if result is None:
+            print(f"[ERROR] Run {i + 1}: server did not become ready within {args.timeout} s")
+            continue
+        runs.append(result)
+        components = "  ".join(f"{name}={ms} ms" for name, ms in result["components"].items())
+        print(f"Run {i + 1}: listening={result['listening_ms']} ms  ready={result['ready_ms']} ms  "
+              f"imports={result['import_ms']} ms  warm-up={result['warmup_ms']} ms")
+        print(f"       {components}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs}, f, indent=2)
+        print(f"[OK] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import microbench
+from fake_gemini import FakeGeminiConfig, start_fake_gemini
+from load_test_chat import run_level
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SERVER_DIR = os.path.join(ROOT, 'server')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Metric name suffixes and which direction is better
+LOWER_IS_BETTER = ("_us", "_ms", "_s")
+HIGHER_IS_BETTER = ("ops_per_sec", "throughput_rps")
+# Tail percentiles swing run to run on shared machines; compared only with --include-tails
+TAIL_METRICS = ("p95_us", "p99_us", "p95_ms", "p99_ms")
+
+
+def git_revision():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, text=True).strip())
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def environment():
+    sha, dirty = git_revision()
+    return {
+        "commit": sha,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def wait_until_ready(base_url, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/ready", timeout=2) as resp:
+                if resp.status == 200:
+                    return True
+        except Exception:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run_load(args):
+    # Starts a fake Gemini and a uvicorn server pointed at it, unless --url names a running server
+    fake = server_proc = None
+    base_url = args.url
+    if base_url is None:
+        fake = start_fake_gemini(0, FakeGeminiConfig(args.first_token_ms, args.token_ms, args.tokens))
+        env = dict(os.environ,
+                   GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "fake-key"),
+                   GEMINI_API_ENDPOINT=f"http://127.0.0.1:{fake.server_address[1]}",
+                   RESPONSE_CACHE="1" if args.response_cache else "0")
+        server_proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        if not wait_until_ready(base_url):
+            print("[ERROR] Server did not become ready")
+            return None
+        results = {}
+        print(f"{'clients':>8} {'reqs':>6} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for level in [int(x) for x in args.levels.split(",")]:
+            r = run_level(base_url + "/api/chat", level, args.requests_per_client, 120.0)
+            results[f"c{level}"] = r
+            print(f"{level:>8} {r['requests']:>6} {r['errors']:>7} {r['throughput_rps']:>8} "
+                  f"{str(r['p50_ms']):>9} {str(r['p95_ms']):>9} {str(r['p99_ms']):>9}")
+        return {"fake_gemini": {"first_token_ms": args.first_token_ms, "token_ms": args.token_ms, "tokens": args.tokens},
+                "levels": results}
+    finally:
+        if server_proc is not None:
+            server_proc.terminate()
+            server_proc.wait(timeout=30)
+        if fake is not None:
+            fake.shutdown()
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current, threshold, include_tails=False):
+    # Returns (rows, regressions); a row is (metric, baseline, current, relative change, regressed)
+    base, cur = flatten(baseline["results"]), flatten(current["results"])
+    rows, regressions = [], 0
+    for name in sorted(base.keys() & cur.keys()):
+        metric = name.rsplit(".", 1)[-1]
+        if metric in TAIL_METRICS and not include_tails:
+            continue
+        if metric.endswith(HIGHER_IS_BETTER):
+            worse = -1
+        elif metric.endswith(LOWER_IS_BETTER):
+            worse = 1
+        else:
+            continue
+        if not base[name]:
+            continue
+        change = (cur[name] - base[name]) / base[name]
+        regressed = change * worse > threshold
+        regressions += regressed
+        rows.append((name, base[name], cur[name], change, regressed))
+    return rows, regressions
+
+
+def print_comparison(baseline, current, threshold, include_tails=False):
+    rows, regressions = compare(baseline, current, threshold, include_tails)
+    print(f"\nAgainst {baseline['environment']['commit']} (regression = more than {threshold:.0%} worse):")
+    print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, base, cur, change, regressed in rows:
+        print(f"{name:<48} {base:>12} {cur:>12} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    print(f"\n{regressions} regression(s) in {len(rows)} compared metrics")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the microbenchmarks and an /api/chat load test against a fake Gemini, "
+                                                 "store the results as JSON and compare them with an earlier run")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression")
+    parser.add_argument("--include-tails", action="store_true", help="Also flag p95/p99 regressions")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--calls", type=int, default=2000, help="Timed calls per microbenchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Corpus sizes for the search microbenchmark")
+    parser.add_argument("--url", help="Load-test an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8012)
+    parser.add_argument("--levels", default="1,4,16", help="Client concurrency levels for the load test")
+    parser.add_argument("--requests-per-client", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Fake Gemini latency before the first token")
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--response-cache", action="store_true", help="Leave the semantic response cache on (off by default so repeated messages reach Gemini)")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Prat.AI Benchmark Suite")
+    print("=" * 50)
+    report = {"environment": environment(), "results": {}}
+    print(f"Commit {report['environment']['commit']}{' (dirty)' if report['environment']['dirty'] else ''}, "
+          f"{report['environment']['cpus']} CPUs, Python {report['environment']['python']}")
+
+    if not args.skip_micro:
+        print("\n--- Microbenchmarks ---")
+        report["results"]["micro"] = microbench.run(args.calls, [int(x) for x in args.sizes.split(",")])
+    if not args.skip_load:
+        print("\n--- /api/chat load test ---")
+        load = run_load(args)
+        if load is not None:
+            report["results"]["load"] = load
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[OK] Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if print_comparison(baseline, report, args.threshold, args.include_tails):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
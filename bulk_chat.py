@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), 'server', '.env'))
+
+parser = argparse.ArgumentParser(description="Classify, score and (optionally) answer a JSONL file of messages in bulk")
+parser.add_argument("input", help="JSONL file with one {\"message\": ..., \"id\": ...} per line, or - for stdin")
+parser.add_argument("--output", "-o", help="JSONL results file (default: stdout)")
+parser.add_argument("--checkpoint", help="Progress file for resuming (default: <output>.checkpoint)")
+parser.add_argument("--gemini", action="store_true", help="Also generate Gemini responses for non-local intents")
+parser.add_argument("--chunk-size", type=int, default=None, help="Messages per vectorized batch")
+parser.add_argument("--gemini-concurrency", type=int, default=None, help="Gemini calls in flight at once")
+parser.add_argument("--top-k", type=int, default=2, help="Knowledge base chunks retrieved per message")
+args = parser.parse_args()
+
+# Results may be written to stdout; everything the server modules print goes to stderr instead
+RESULTS_STDOUT = sys.stdout
+sys.stdout = sys.stderr
+
+from routes.chat import _apply_branding
+from utils.bulk import BulkProcessor, BULK_CHUNK_SIZE, BULK_GEMINI_CONCURRENCY
+from utils.startup import model_registry
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("next_line", 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+async def file_lines(f):
+    for line in f:
+        yield line
+
+
+async def main():
+    checkpoint = args.checkpoint or (f"{args.output}.checkpoint" if args.output else None)
+    start = read_checkpoint(checkpoint) if checkpoint else 0
+
+    print("=" * 50)
+    print("Prat.AI Bulk Chat")
+    print("=" * 50)
+
+    components = ("intent_classifier", "embedding_store", "sentiment") + (("gemini_client",) if args.gemini else ())
+    await model_registry.warm_up(components)
+    while model_registry.settling(components):
+        await asyncio.sleep(0.2)
+    if not model_registry.is_ready("intent_classifier"):
+        print("[ERROR] Intent classifier failed to load")
+        return 1
+    gemini_client = model_registry.get("gemini_client") if args.gemini else None
+    if args.gemini and gemini_client is None:
+        print("[ERROR] --gemini given but Gemini is not configured (GEMINI_API_KEY)")
+        return 1
+
+    processor = BulkProcessor(
+        model_registry.get("intent_classifier"),
+        model_registry.get("embedding_store") if model_registry.is_ready("embedding_store") else None,
+        gemini_client,
+        finish=_apply_branding,
+        chunk_size=args.chunk_size or BULK_CHUNK_SIZE,
+        gemini_concurrency=args.gemini_concurrency or BULK_GEMINI_CONCURRENCY,
+        top_k=args.top_k
+    )
+    if start:
+        print(f"[INFO] Resuming from line {start} ({checkpoint})")
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    # Results before the checkpoint are already in the output file; append after them
+    out = open(args.output, "a" if start else "w", encoding="utf-8") if args.output else RESULTS_STDOUT
+    last_report = time.perf_counter()
+    try:
+        async for results in processor.run(file_lines(source), start):
+            out.write("".join(json.dumps(result) + "\n" for result in results))
+            out.flush()
+            stats = processor.stats.to_dict()
+            if checkpoint:
+                # Written only after the chunk is flushed, so a crash repeats at most one chunk
+                write_checkpoint(checkpoint, {"input": args.input, "output": args.output, **stats})
+            if time.perf_counter() - last_report >= 5:
+                last_report = time.perf_counter()
+                print(f"   {stats['processed']} messages, {stats['messages_per_sec']} msg/s")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not RESULTS_STDOUT:
+            out.close()
+
+    summary = processor.stats.to_dict()
+    print(f"[OK] {summary['processed']} messages ({summary['errors']} invalid) in {summary['elapsed_s']} s: "
+          f"{summary['messages_per_sec']} msg/s")
+    print(f"     Stage totals (ms): {summary['stage_ms']}")
+    if args.gemini:
+        print(f"     Gemini calls: {summary['gemini_calls']} ({summary['gemini_errors']} failed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
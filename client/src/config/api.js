@@ -1,17 +1,19 @@
 const API_BASE_URL = "http://localhost:8000/api";
 
-export const sendMessage = async (message) => {
+export const sendMessage = async (message, sessionId = null) => {
   try {
     const response = await fetch(`${API_BASE_URL}/chat`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({ message }),
+      body: JSON.stringify({ message, session_id: sessionId }),
     });
 
     if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
+      const error = new Error(`HTTP error! status: ${response.status}`);
+      error.status = response.status;
+      throw error;
     }
 
     const data = await response.json();
@@ -22,6 +24,22 @@ export const sendMessage = async (message) => {
   }
 };
 
+export const createSession = async () => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/sessions`, {
+      method: "POST",
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.session_id;
+  } catch (error) {
+    console.error("Session API Error:", error);
+    throw error;
+  }
+};
+
 export const getStats = async () => {
   try {
     const response = await fetch(`${API_BASE_URL}/stats`);
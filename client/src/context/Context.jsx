@@ -1,5 +1,5 @@
 import React, { createContext, useState } from 'react';
-import { sendMessage } from '../config/api';
+import { sendMessage, createSession } from '../config/api';
 
 export const Context = createContext();
 
@@ -12,6 +12,8 @@ const ContextProvider = (props) => {
     const [resultData, setResultData] = useState("");
     const [errorMsg, setErrorMsg] = useState("");
     const [showAbout, setShowAbout] = useState(false);
+    // One server-side conversation per chat; the server issues its id on the first message
+    const [sessionId, setSessionId] = useState(null);
 
     const onSent = async (prompt) => {
         setErrorMsg("");
@@ -29,7 +31,17 @@ const ContextProvider = (props) => {
         setRecentPrompt(prompt);
 
         try {
-            const response = await sendMessage(prompt);
+            let id = sessionId || await createSession();
+            let response;
+            try {
+                response = await sendMessage(prompt, id);
+            } catch (error) {
+                if (error.status !== 404) throw error;
+                // The server no longer knows the session (expired); carry on in a new one
+                id = await createSession();
+                response = await sendMessage(prompt, id);
+            }
+            setSessionId(id);
             let formattedResponse = response.response;
 
             formattedResponse = formattedResponse.replace(/\*\*(.*?)\*\*/g, '<b>$1</b>');
@@ -54,6 +66,7 @@ const ContextProvider = (props) => {
     }
 
     const newChat = () => {
+        setSessionId(null);
         setLoading(false);
         setShowResult(false);
         setRecentPrompt("");
@@ -1,33 +1,61 @@
+import argparse
 import sys
 import os
+import time
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
 
+parser = argparse.ArgumentParser(description="Retrain the intent classifier and refresh knowledge base embeddings")
+parser.add_argument("--full", action="store_true", help="Re-embed every knowledge base file instead of only changed ones")
+parser.add_argument("--watch", action="store_true", help="Keep running and apply knowledge base changes as files appear")
+args = parser.parse_args()
+
 print("=" * 50)
 print("Retraining ML Model with Prat.AI branding")
 print("=" * 50)
 
 try:
-    from utils.ml_model import IntentClassifier
+    from utils.intent_training import retrain
     from utils.embeddings import EmbeddingStore
+    from utils.kb_watcher import KnowledgeBaseWatcher
+    from utils import artifacts
     
     print("\n1. Retraining Intent Classifier...")
-    classifier = IntentClassifier()
-    classifier.train()
-    classifier.save()
-    print("   [OK] Intent classifier retrained and saved")
+    classifier, result = retrain()
+    print(f"   [OK] Intent classifier retrained on {result['samples']} patterns ({result['intents']} intents) "
+          f"and published as version {classifier.version}")
     
     print("\n2. Rebuilding Embeddings...")
     embedder = EmbeddingStore()
-    embedder.build_index()
-    embedder.save()
-    print("   [OK] Embeddings rebuilt and saved")
+    if args.full:
+        result = embedder.build_index()
+    else:
+        try:
+            embedder.load(artifacts.current_dir("embeddings"))
+        except Exception:
+            print("   [INFO] No saved embeddings, building from scratch...")
+        result = embedder.update_index()
+    if result.get("status") == "unchanged" and artifacts.current_version("embeddings"):
+        print(f"   [OK] Embeddings unchanged: {result}")
+    else:
+        version = artifacts.publish("embeddings", embedder.save)
+        print(f"   [OK] Embeddings published as version {version}: {result}")
+    
+    if args.watch:
+        print("\n3. Watching data/knowledge_base for changes (Ctrl+C to stop)...")
+        watcher = KnowledgeBaseWatcher(embedder)
+        try:
+            while True:
+                time.sleep(watcher.interval)
+                watcher.poll()
+        except KeyboardInterrupt:
+            print("   [OK] Stopped watching")
     
     print("\n" + "=" * 50)
     print("Retraining complete! All models now use Prat.AI")
     print("=" * 50)
-    print("\nPlease restart your server for changes to take effect:")
-    print("  cd server")
-    print("  python main.py")
+    print("\nTo serve the new versions without a restart, call:")
+    print("  curl -X POST http://localhost:8000/api/models/intent/reload")
+    print("  curl -X POST http://localhost:8000/api/models/embeddings/reload")
     
 except Exception as e:
     print(f"\n[ERROR] Retraining failed: {e}")
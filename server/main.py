@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import sys
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
+IMPORT_STARTED = time.perf_counter()
 BASE_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(BASE_DIR))
 
@@ -13,11 +18,79 @@ load_dotenv(BASE_DIR / ".env")
 print(f"[INFO] Loaded .env file, GEMINI_API_KEY present: {bool(os.getenv('GEMINI_API_KEY'))}")
 
 from routes.chat import router as chat_router
-from routes.train import router as train_router
+from routes.train import router as train_router, SWAPPERS, serving_version
 from routes.stats import router as stats_router
-from utils.database import init_db
+from routes.bulk import router as bulk_router
+from utils.database import init_db, conversation_logger
+from utils.workers import worker_pool
+from utils.kb_watcher import KnowledgeBaseWatcher, KB_WATCH
+from utils.response_cache import response_cache
+from utils.startup import model_registry
+from utils.jobs import job_manager
+from utils.artifacts import VersionFollower, MODEL_RELOAD_INTERVAL
+from utils.metrics import metrics_registry
+from utils.sessions import session_store
 
-app = FastAPI(title="Prat.AI API", version="1.0.0")
+# "1" holds uvicorn's startup until every model is loaded; by default the port opens immediately
+# and /ready reports 503 until warm-up is done
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "0") == "1"
+
+kb_watcher = None
+version_follower = None
+
+def _start_kb_watcher():
+    global kb_watcher
+    embedding_store = model_registry.get("embedding_store")
+    if embedding_store is None:
+        print("[WARN] Knowledge base watcher not started: embedding store is not loaded yet")
+        return
+    try:
+        on_update = (lambda result: response_cache.invalidate()) if response_cache is not None else None
+        kb_watcher = KnowledgeBaseWatcher(embedding_store, on_update=on_update).start()
+        print("[OK] Watching knowledge base for changes")
+    except Exception as e:
+        print(f"[ERROR] Knowledge base watcher failed to start: {e}")
+
+def _retarget_kb_watcher(store, previous):
+    # Keep applying knowledge base edits to whichever store is serving after a hot swap
+    if kb_watcher is not None:
+        kb_watcher.store = store
+
+model_registry.on_swap("embedding_store", _retarget_kb_watcher)
+
+async def _warm_up():
+    global version_follower
+    await model_registry.warm_up()
+    if KB_WATCH:
+        _start_kb_watcher()
+    if MODEL_RELOAD_INTERVAL > 0:
+        version_follower = VersionFollower(serving_version, lambda kind: SWAPPERS[kind]()).start()
+
+@asynccontextmanager
+async def lifespan(app):
+    print(f"[OK] Worker pool ready: {worker_pool.stats()}")
+    # Tables exist before anything is served, canned replies included; the writer starts only then
+    init_db()
+    conversation_logger.start()
+    # Classifier, embedding store, sentiment analyzer and Gemini client load concurrently on their own threads
+    warmup_task = asyncio.create_task(_warm_up())
+    if WARMUP_BLOCKING:
+        await warmup_task
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    if kb_watcher:
+        kb_watcher.stop()
+    if version_follower:
+        version_follower.stop()
+    job_manager.shutdown()
+    # Flush queued conversation rows and spill live sessions before the process exits
+    conversation_logger.stop()
+    session_store.stop()
+    worker_pool.shutdown()
+
+app = FastAPI(title="Prat.AI API", version="1.0.0", lifespan=lifespan)
+model_registry.import_ms = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,22 +100,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    try:
-        init_db()
-        print("[OK] Database initialized")
-    except Exception as e:
-        print(f"[ERROR] Database init error: {e}")
-
 app.include_router(chat_router, prefix="/api")
 app.include_router(train_router, prefix="/api")
 app.include_router(stats_router, prefix="/api")
+app.include_router(bulk_router, prefix="/api")
 
 @app.get("/")
 async def root():
     return {"message": "Prat.AI API - Hybrid ML + LLM System", "version": "1.0.0"}
 
+@app.get("/health")
+async def health():
+    # Liveness: the process is up; per-component status and load timings for debugging slow starts
+    return {"status": "ok", **model_registry.snapshot()}
+
+@app.get("/ready")
+async def ready():
+    # Readiness: 503 until the intent classifier and embedding store are serving
+    snapshot = model_registry.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503,
+                        content={"status": "ready" if snapshot["ready"] else "warming_up", **snapshot})
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format; with several workers (serve.py) each scrape sees the process that answered
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import json
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from routes.chat import _apply_branding, _warming_up_detail
+from utils.bulk import BulkProcessor, BULK_CHUNK_SIZE, BULK_GEMINI_CONCURRENCY
+from utils.startup import model_registry
+
+router = APIRouter()
+
+async def _body_lines(body):
+    for line in body.decode("utf-8", errors="replace").split("\n"):
+        yield line
+
+async def _stream_results(processor, lines, start):
+    try:
+        async for results in processor.run(lines, start):
+            yield "".join(json.dumps(result) + "\n" for result in results)
+    except Exception as e:
+        print(f"Bulk error: {e}")
+        yield json.dumps({"error": str(e), **processor.stats.to_dict()}) + "\n"
+        return
+    summary = processor.stats.to_dict()
+    print(f"[OK] Bulk run: {summary['processed']} messages at {summary['messages_per_sec']} msg/s")
+    yield json.dumps({"summary": summary}) + "\n"
+
+@router.post("/bulk")
+async def bulk(request: Request, gemini: bool = False, start: int = 0, chunk_size: int = BULK_CHUNK_SIZE,
+               gemini_concurrency: int = BULK_GEMINI_CONCURRENCY, top_k: int = 2):
+    # Body: JSONL, one {"message": ..., "id": ...} per line. Response: JSONL, one result per input line
+    # in order, then a {"summary": ...} line. Pass start=<summary.next_line> to resume a cut-off run.
+    if not model_registry.is_ready("intent_classifier"):
+        raise HTTPException(status_code=503, detail=_warming_up_detail())
+    # Read up front: StreamingResponse consumes receive() to watch for disconnects, so the body
+    # cannot be streamed in while results stream out. Use bulk_chat.py for dumps too big for memory.
+    body = await request.body()
+    gemini_client = model_registry.get("gemini_client") if gemini else None
+    if gemini and gemini_client is None:
+        raise HTTPException(status_code=503, detail="Gemini is not configured; retry with gemini=false")
+
+    processor = BulkProcessor(
+        model_registry.get("intent_classifier"),
+        model_registry.get("embedding_store") if model_registry.is_ready("embedding_store") else None,
+        gemini_client,
+        finish=_apply_branding,
+        chunk_size=chunk_size,
+        gemini_concurrency=gemini_concurrency,
+        top_k=top_k
+    )
+    return StreamingResponse(_stream_results(processor, _body_lines(body), start),
+                             media_type="application/x-ndjson")
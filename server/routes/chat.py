@@ -1,57 +1,67 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import json
 import random
 import os
 import sys
+import time
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
-from utils.ml_model import IntentClassifier
-from utils.sentiment import analyze_sentiment
+from utils.intent_training import retrain as retrain_intent_classifier
+from utils.sentiment import analyze_sentiment, analyze_sentiment_batch
 from utils.embeddings import EmbeddingStore
 from utils.gemini_client import GeminiClient
-from utils.database import log_conversation
+from utils.database import log_conversation, conversation_logger
+from utils.workers import worker_pool, QueueFullError
+from utils.batching import MicroBatcher
+from utils.response_cache import response_cache
+from utils.startup import model_registry
+from utils.routing import response_router
+from utils.canned import canned_answers
+from utils.prompt_builder import prompt_builder, PROMPT_CANDIDATES
+from utils.sessions import session_store, valid_session_id
+from utils.metrics import metrics_registry, stage, timed, observe_stage, start_trace, RESPONSES, REQUEST_ERRORS, REQUEST_SECONDS, RETRIEVALS
+from utils import artifacts
 
 router = APIRouter()
 
-intent_classifier = IntentClassifier()
-embedding_store = EmbeddingStore()
-gemini_client = None
+def _train_intent_classifier():
+    # Same plain retrain as /api/train and retrain_model.py without extra data
+    return retrain_intent_classifier()[0]
 
-try:
-    intent_classifier.load()
-    print("[OK] Intent classifier loaded")
-except Exception as e:
-    print(f"[WARN] Loading failed, training new model: {e}")
-    try:
-        intent_classifier.train()
-        intent_classifier.save()
-        print("[OK] Intent classifier trained and saved")
-    except Exception as train_error:
-        print(f"[ERROR] Training failed: {train_error}")
-
-try:
-    embedding_store.load()
-    print("[OK] Embedding store loaded")
-except Exception as e:
-    print(f"[WARN] Loading failed, building index: {e}")
-    try:
-        embedding_store.build_index()
-        embedding_store.save()
-        print("[OK] Embedding store built and saved")
-    except Exception as build_error:
-        print(f"[ERROR] Building failed: {build_error}")
-
-try:
-    gemini_client = GeminiClient()
-    print("[OK] Gemini client initialized")
-except Exception as e:
-    print(f"[ERROR] Gemini client initialization failed: {e}")
+def _build_embedding_store():
+    store = EmbeddingStore()
+    store.build_index()
+    store.version = artifacts.publish("embeddings", store.save)
+    return store
+
+def _warm_sentiment():
+    analyze_sentiment("Prat.AI is warming up")
+    return analyze_sentiment
+
+# Nothing is loaded at import time; main.py warms these up concurrently once the app starts.
+# A missing or broken artifact is retrained/rebuilt in the background instead of blocking boot.
+model_registry.register("intent_classifier", artifacts.load_intent_classifier, rebuild=_train_intent_classifier)
+model_registry.register("embedding_store", artifacts.load_embedding_store, rebuild=_build_embedding_store)
+model_registry.register("sentiment", _warm_sentiment)
+model_registry.register("gemini_client", GeminiClient, required=False)
+
+# Concurrent requests share one vectorizer/predict_proba call and one SentenceTransformer forward pass
+intent_batcher = MicroBatcher("intent", lambda texts: model_registry.get("intent_classifier").predict_batch(texts))
+embedding_batcher = MicroBatcher("embedding", lambda queries: list(model_registry.get("embedding_store").encode_queries(queries)))
+# Lexicon scoring takes microseconds per message; batching saves a worker pool hop per request
+sentiment_batcher = MicroBatcher("sentiment", analyze_sentiment_batch)
 
 class ChatRequest(BaseModel):
     message: str
+    # Optional conversation id from POST /api/sessions; turns sharing one see each other
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -59,68 +69,441 @@ class ChatResponse(BaseModel):
     confidence: float
     sentiment: str
     response_type: str
-
-CONFIDENCE_THRESHOLD = 0.85
+    session_id: Optional[str] = None
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, response: Response, x_trace: Optional[str] = Header(None)):
+    # "X-Trace: 1" (or CHAT_TRACE=1) returns per-stage timings in a Server-Timing header
+    trace = start_trace(x_trace == "1")
+    _check_session_id(request.session_id, "chat")
+    if request.session_id is not None and await _find_session(request.session_id) is None:
+        REQUEST_ERRORS.inc("chat", "404")
+        raise HTTPException(status_code=404, detail=UNKNOWN_SESSION)
+    # Canned answers need no model, so they are served while the classifier is still warming up
+    with stage("canned"):
+        canned = canned_answers.match(request.message)
+    if canned is None and not model_registry.is_ready("intent_classifier"):
+        REQUEST_ERRORS.inc("chat", "503")
+        raise HTTPException(status_code=503, detail=_warming_up_detail())
     try:
-        user_message = request.message
-        
-        intent_result = intent_classifier.predict(user_message)
+        async with worker_pool.slot():
+            result = await _run_chat(request.message, canned, request.session_id)
+    except QueueFullError as e:
+        REQUEST_ERRORS.inc("chat", "503")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Chat error: {e}")
+        REQUEST_ERRORS.inc("chat", "500")
+        raise HTTPException(status_code=500, detail=str(e))
+    if trace is not None:
+        response.headers["Server-Timing"] = trace.server_timing()
+        if trace.prompt_tokens:
+            response.headers["X-Prompt-Tokens"] = ", ".join(f"{part}={n}" for part, n in trace.prompt_tokens.items())
+    return result
+
+@router.get("/inference/stats")
+async def inference_stats():
+    embedding_store = model_registry.get("embedding_store")
+    gemini_client = model_registry.get("gemini_client")
+    return {
+        "status": "success",
+        "data": {
+            "workers": worker_pool.stats(),
+            "batchers": {
+                intent_batcher.name: intent_batcher.stats(),
+                embedding_batcher.name: embedding_batcher.stats(),
+                sentiment_batcher.name: sentiment_batcher.stats(),
+            },
+            "embedding_cache": embedding_store.cache.stats() if embedding_store and embedding_store.cache else None,
+            "response_cache": response_cache.stats() if response_cache is not None else None,
+            "conversation_log": conversation_logger.stats(),
+            "gemini": gemini_client.policy.stats() if gemini_client is not None else None,
+            "sessions": session_store.stats(),
+            "lexical_index": embedding_store.lexical.stats() if embedding_store and embedding_store.lexical else None,
+        },
+    }
+
+@router.post("/sessions")
+async def create_session():
+    # Chat requests only accept session ids issued here
+    return {"session_id": await worker_pool.run(session_store.create)}
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not valid_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    found = await worker_pool.run(session_store.forget, session_id)
+    return {"status": "success" if found else "not_found", "session_id": session_id}
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+@metrics_registry.collector
+def _component_metrics():
+    # Gauges and counters the components already keep, read at scrape time for GET /metrics
+    pool = worker_pool.stats()
+    yield "pratchat_chat_slots_active", "gauge", "Chat requests holding a processing slot", [({}, pool["active"])]
+    yield "pratchat_chat_slots_waiting", "gauge", "Chat requests queued for a processing slot", [({}, pool["waiting"])]
+    yield "pratchat_chat_rejected_total", "counter", "Chat requests rejected because the queue was full", [({}, pool["rejected"])]
+
+    batchers = [(b.name, b.stats()) for b in (intent_batcher, embedding_batcher, sentiment_batcher)]
+    yield "pratchat_batcher_pending", "gauge", "Items waiting for the next micro-batch", \
+        [({"batcher": name}, stats["pending"]) for name, stats in batchers]
+    yield "pratchat_batcher_batches_total", "counter", "Micro-batches run", \
+        [({"batcher": name}, stats["batches"]) for name, stats in batchers]
+    yield "pratchat_batcher_items_total", "counter", "Items processed in micro-batches", \
+        [({"batcher": name}, stats["items"]) for name, stats in batchers]
+
+    embedding_store = model_registry.get("embedding_store")
+    if embedding_store and embedding_store.cache:
+        cache = embedding_store.cache.stats()
+        yield "pratchat_embedding_cache_entries", "gauge", "Embeddings in the in-memory cache tier", [({}, cache["memory_entries"])]
+        yield "pratchat_embedding_cache_bytes", "gauge", "Bytes used by the in-memory cache tier", [({}, cache["memory_bytes"])]
+        yield "pratchat_embedding_cache_hits_total", "counter", "Embedding cache hits by tier", \
+            [({"tier": "memory"}, cache["memory_hits"]), ({"tier": "disk"}, cache["disk_hits"])]
+        yield "pratchat_embedding_cache_misses_total", "counter", "Embedding cache misses", [({}, cache["misses"])]
+        yield "pratchat_embedding_cache_evictions_total", "counter", "Embedding cache evictions", [({}, cache["evictions"])]
+    if embedding_store and embedding_store.lexical:
+        lexical = embedding_store.lexical.stats()
+        yield "pratchat_lexical_index_terms", "gauge", "Distinct terms in the BM25 index", [({}, lexical["terms"])]
+        yield "pratchat_lexical_index_bytes", "gauge", "Bytes of BM25 postings arrays", [({}, lexical["bytes"])]
+
+    if response_cache is not None:
+        cache = response_cache.stats()
+        yield "pratchat_response_cache_entries", "gauge", "Gemini answers in the semantic response cache", [({}, cache["entries"])]
+        yield "pratchat_response_cache_hits_total", "counter", "Semantic response cache hits", [({}, cache["hits"])]
+        yield "pratchat_response_cache_misses_total", "counter", "Semantic response cache misses", [({}, cache["misses"])]
+        yield "pratchat_response_cache_evictions_total", "counter", "Semantic response cache evictions", [({}, cache["evictions"])]
+
+    log = conversation_logger.stats()
+    yield "pratchat_log_queue_depth", "gauge", "Conversation rows waiting for the SQLite writer", [({}, log["queue_depth"])]
+    yield "pratchat_log_queue_capacity", "gauge", "Conversation log queue size limit", [({}, log["queue_capacity"])]
+    yield "pratchat_log_rows_total", "counter", "Conversation rows by outcome", \
+        [({"outcome": "written"}, log["written"]), ({"outcome": "dropped"}, log["dropped"])]
+    yield "pratchat_log_write_errors_total", "counter", "Failed conversation log batch writes", [({}, log["errors"])]
+
+    gemini_client = model_registry.get("gemini_client")
+    if gemini_client is not None:
+        gemini = gemini_client.policy.stats()
+        yield "pratchat_gemini_in_flight", "gauge", "Gemini calls in flight", [({}, gemini["in_flight"])]
+        yield "pratchat_gemini_circuit_state", "gauge", "Gemini circuit breaker: 0 closed, 1 half open, 2 open", \
+            [({}, BREAKER_STATES[gemini["breaker"]["state"]])]
+        yield "pratchat_gemini_events_total", "counter", "Gemini calls, attempts, retries, timeouts, short circuits and hedges", \
+            [({"event": event}, gemini[event]) for event in
+             ("calls", "succeeded", "failed", "attempts", "retries", "timeouts", "short_circuited", "hedges", "hedge_wins")]
+
+    sessions = session_store.stats()
+    yield "pratchat_sessions_active", "gauge", "Chat sessions held in memory", [({}, sessions["active"])]
+    yield "pratchat_sessions_total", "counter", "Chat session lifecycle events", \
+        [({"event": event}, sessions[event]) for event in ("created", "restored", "evicted", "expired", "spilled")]
+
+    yield "pratchat_component_ready", "gauge", "1 when a model component is loaded and serving", \
+        [({"component": name}, int(model_registry.is_ready(name))) for name in model_registry.components]
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, x_trace: Optional[str] = Header(None)):
+    # Server-sent events: "meta" (intent/sentiment) right away, "token" per chunk, then "done" with the
+    # ChatResponse (plus a "trace" list of stage spans when traced)
+    return StreamingResponse(
+        _stream_chat(request.message, x_trace == "1", request.session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _warming_up_detail():
+    status = model_registry.components["intent_classifier"].status
+    return f"Prat.AI is warming up (intent classifier {status}); retry shortly"
+
+def _apply_branding(response):
+    # Replace any PratChat references with Prat.AI (the "rewrites" in data/canned.json), in one pass
+    return canned_answers.rewriter.rewrite(response)
+
+def _is_local_intent(intent_result):
+    # Per-intent confidence thresholds from data/routing.json
+    return response_router.is_local(intent_result)
+
+def _fallback_response(intent_result):
+    # Fallback to ML response if available
+    if intent_result['responses']:
+        return random.choice(intent_result['responses']), "ml_fallback"
+    return "I'm having trouble connecting to my knowledge base. Please try again.", "error"
+
+def _no_gemini_response(intent_result):
+    if intent_result['responses']:
+        return random.choice(intent_result['responses']), "ml_local"
+    return "I need Gemini API to answer complex questions. Please configure GEMINI_API_KEY in server/.env", "fallback"
+
+def _canned_analysis(canned, user_message):
+    # A keyword match stands in for the classifier; sentiment is still scored (microseconds with the lexicon)
+    with stage("sentiment"):
         sentiment_result = analyze_sentiment(user_message)
+    return {"intent": canned["intent"], "confidence": 1.0, "responses": []}, sentiment_result
+
+async def _analyze(user_message):
+    # CPU-bound stages run on the worker pool so the event loop stays free for other requests
+    return await asyncio.gather(timed("intent", intent_batcher.submit(user_message)),
+                                timed("sentiment", sentiment_batcher.submit(user_message)))
+
+async def _retrieve(user_message, intent, use_cache=True):
+    if not model_registry.is_ready("embedding_store"):
+        # Index still loading or rebuilding: answer without retrieved context
+        return None, None, []
+    embedding_store = model_registry.get("embedding_store")
+    # A clear keyword match needs no vector search; if its BM25 score also clears the lexical extractive
+    # threshold the encoder is skipped too (extractive answers are never cached, so the cache lookup has
+    # nothing to add)
+    with stage("lexical"):
+        lexical_hits = embedding_store.lexical_fast_path(user_message, top_k=PROMPT_CANDIDATES)
+    if lexical_hits and response_router.lexical_extractive(intent, user_message, lexical_hits):
+        RETRIEVALS.inc("lexical_extractive")
+        return None, None, lexical_hits
+    with stage("embedding"):
+        query_embedding = await embedding_batcher.submit(user_message)
+    # Near-duplicate questions reuse an earlier Gemini answer via the same query embedding
+    with stage("cache_lookup"):
+        cached = response_cache.lookup(query_embedding) if response_cache is not None and use_cache else None
+    if cached:
+        return query_embedding, cached, []
+    # From here on the hits are scored by cosine like vector search results
+    if lexical_hits:
+        lexical_hits = embedding_store.with_cosine(lexical_hits, query_embedding)
+    if lexical_hits:
+        RETRIEVALS.inc("lexical")
+        return query_embedding, None, lexical_hits
+    with stage("search"):
+        hits = await worker_pool.run(embedding_store.search_hybrid, user_message, query_embedding, top_k=PROMPT_CANDIDATES)
+    RETRIEVALS.inc("hybrid" if embedding_store.lexical is not None else "dense")
+    return query_embedding, None, hits
+
+def _context(hits):
+    # Best chunks first, deduplicated and trimmed to the prompt's context budget
+    with stage("prompt"):
+        return prompt_builder.build(hits)[0]
+
+INVALID_SESSION = "Invalid session_id; start a session with POST /api/sessions"
+UNKNOWN_SESSION = "Unknown or expired session_id; start a session with POST /api/sessions"
+
+def _check_session_id(session_id, endpoint):
+    if session_id is not None and not valid_session_id(session_id):
+        REQUEST_ERRORS.inc(endpoint, "400")
+        raise HTTPException(status_code=400, detail=INVALID_SESSION)
+
+async def _find_session(session_id):
+    # None for an id the server never issued, or one it has forgotten (expired without spilling)
+    with stage("session"):
+        return session_store.get(session_id) or await worker_pool.run(session_store.restore, session_id)
+
+async def _history(session_id):
+    # Earlier turns of the session, trimmed to the prompt's history budget ("" for a new or no session)
+    if session_id is None:
+        return ""
+    session = await _find_session(session_id)
+    if session is None:
+        return ""
+    return prompt_builder.history(session.summary, session.turns())
+
+async def _remember(session_id, user_message, response):
+    if session_id is None:
+        return
+    if session_store.shared:
+        # A SQLite read-modify-write rather than a dict update
+        await worker_pool.run(session_store.append, session_id, user_message, response)
+    else:
+        session_store.append(session_id, user_message, response)
+
+def _cache_response(query_embedding, user_message, response, intent, history=""):
+    # Answers to follow-ups depend on the conversation, so they are neither cached nor served from cache
+    if response_cache is not None and query_embedding is not None and not history:
+        response_cache.put(query_embedding, user_message, response, {"intent": intent})
+
+def _extractive(intent, user_message, query_embedding, cached, hits):
+    if cached:
+        return None
+    with stage("extractive"):
+        if query_embedding is None:
+            # Only lexical fast-path hits come back without an embedding; their scores are BM25, not cosine
+            return response_router.lexical_extractive(intent, user_message, hits)
+        return response_router.extractive(intent, user_message, hits)
+
+def _record(endpoint, started, intent, response_type):
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+    RESPONSES.inc(endpoint, response_type, intent)
+
+async def _log(user_message, response, intent, confidence, sentiment, response_type):
+    try:
+        # Enqueue only; the background writer batches the INSERTs off the request path
+        if conversation_logger.blocking:
+            await worker_pool.run(log_conversation, user_message, response, intent, confidence, sentiment, response_type)
+        else:
+            log_conversation(user_message, response, intent, confidence, sentiment, response_type)
+    except Exception as log_error:
+        print(f"Logging error: {log_error}")
+
+async def _run_chat(user_message, canned=None, session_id=None):
+    started = time.perf_counter()
+    gemini_client = model_registry.get("gemini_client")
+    if canned is not None:
+        intent_result, sentiment_result = _canned_analysis(canned, user_message)
+    else:
+        intent_result, sentiment_result = await _analyze(user_message)
+    history = await _history(session_id)
+    
+    intent = intent_result['intent']
+    confidence = intent_result['confidence']
+    sentiment = sentiment_result['sentiment']
+    
+    # Cheapest tier first: keyword canned answer, intent response, cached answer, extractive knowledge base answer, Gemini
+    if canned is not None:
+        response = canned['response']
+        response_type = "canned"
+    elif _is_local_intent(intent_result):
+        response = random.choice(intent_result['responses'])
+        response_type = "ml_local"
+    else:
+        try:
+            query_embedding, cached, hits = await _retrieve(user_message, intent, use_cache=not history)
+            extractive = _extractive(intent, user_message, query_embedding, cached, hits)
+            if cached:
+                response = cached['response']
+                response_type = "cache_semantic"
+            elif extractive:
+                response = extractive
+                response_type = "kb_extractive"
+            elif gemini_client:
+                with stage("gemini"):
+                    response = await gemini_client.generate_response_async(user_message, _context(hits), history)
+                response_type = "llm_gemini"
+                _cache_response(query_embedding, user_message, response, intent, history)
+            else:
+                # No Gemini - use ML or fallback
+                response, response_type = _no_gemini_response(intent_result)
+        except Exception as gemini_error:
+            print(f"Gemini error: {gemini_error}")
+            response, response_type = _fallback_response(intent_result)
+    
+    with stage("branding"):
+        response = _apply_branding(response)
+    with stage("log"):
+        await _log(user_message, response, intent, confidence, sentiment, response_type)
+    await _remember(session_id, user_message, response)
+    _record("chat", started, intent, response_type)
+    
+    return ChatResponse(
+        response=response,
+        intent=intent,
+        confidence=confidence,
+        sentiment=sentiment,
+        response_type=response_type,
+        session_id=session_id
+    )
+
+async def _stream_chat(user_message, trace_requested=False, session_id=None):
+    started = time.perf_counter()
+    trace = start_trace(trace_requested)
+    if session_id is not None and not valid_session_id(session_id):
+        REQUEST_ERRORS.inc("chat_stream", "400")
+        yield _sse("error", {"status_code": 400, "detail": INVALID_SESSION})
+        return
+    if session_id is not None and await _find_session(session_id) is None:
+        REQUEST_ERRORS.inc("chat_stream", "404")
+        yield _sse("error", {"status_code": 404, "detail": UNKNOWN_SESSION})
+        return
+    with stage("canned"):
+        canned = canned_answers.match(user_message)
+    if canned is None and not model_registry.is_ready("intent_classifier"):
+        REQUEST_ERRORS.inc("chat_stream", "503")
+        yield _sse("error", {"status_code": 503, "detail": _warming_up_detail()})
+        return
+    
+    # The slot is taken inside the generator so an abandoned response can never leak it
+    try:
+        await worker_pool.acquire()
+    except QueueFullError as e:
+        REQUEST_ERRORS.inc("chat_stream", "503")
+        yield _sse("error", {"status_code": 503, "detail": str(e)})
+        return
+    
+    try:
+        gemini_client = model_registry.get("gemini_client")
+        if canned is not None:
+            intent_result, sentiment_result = _canned_analysis(canned, user_message)
+        else:
+            intent_result, sentiment_result = await _analyze(user_message)
+        history = await _history(session_id)
         
         intent = intent_result['intent']
         confidence = intent_result['confidence']
         sentiment = sentiment_result['sentiment']
+        yield _sse("meta", {"intent": intent, "confidence": confidence, "sentiment": sentiment})
         
-        # Use Gemini for all queries except very high confidence greetings
-        if confidence >= CONFIDENCE_THRESHOLD and intent in ['greeting', 'goodbye', 'thanks']:
+        streamed = []
+        if canned is not None:
+            response = canned['response']
+            response_type = "canned"
+        elif _is_local_intent(intent_result):
             response = random.choice(intent_result['responses'])
             response_type = "ml_local"
         else:
-            # Always try Gemini for knowledge questions
-            if gemini_client:
-                try:
-                    context_docs = embedding_store.search(user_message, top_k=2)
-                    context = "\n\n".join(context_docs) if context_docs else ""
-                    response = gemini_client.generate_response(user_message, context)
+            try:
+                query_embedding, cached, hits = await _retrieve(user_message, intent, use_cache=not history)
+                extractive = _extractive(intent, user_message, query_embedding, cached, hits)
+                if cached:
+                    response = cached['response']
+                    response_type = "cache_semantic"
+                elif extractive:
+                    response = extractive
+                    response_type = "kb_extractive"
+                elif gemini_client:
+                    gemini_started = time.perf_counter()
+                    async for text in gemini_client.stream_response(user_message, _context(hits), history):
+                        if not streamed:
+                            observe_stage("gemini_first_token", gemini_started)
+                        streamed.append(text)
+                        yield _sse("token", {"text": text})
+                    observe_stage("gemini", gemini_started)
+                    response = "".join(streamed)
                     response_type = "llm_gemini"
-                except Exception as gemini_error:
-                    print(f"Gemini error: {gemini_error}")
-                    # Fallback to ML response if available
-                    if intent_result['responses']:
-                        response = random.choice(intent_result['responses'])
-                        response_type = "ml_fallback"
-                    else:
-                        response = "I'm having trouble connecting to my knowledge base. Please try again."
-                        response_type = "error"
-            else:
-                # No Gemini - use ML or fallback
-                if intent_result['responses']:
-                    response = random.choice(intent_result['responses'])
-                    response_type = "ml_local"
+                    _cache_response(query_embedding, user_message, response, intent, history)
                 else:
-                    response = "I need Gemini API to answer complex questions. Please configure GEMINI_API_KEY in server/.env"
-                    response_type = "fallback"
+                    response, response_type = _no_gemini_response(intent_result)
+            except Exception as gemini_error:
+                print(f"Gemini error: {gemini_error}")
+                if streamed:
+                    # Part of the answer already reached the client; finish with what we have
+                    response = "".join(streamed)
+                    response_type = "llm_gemini_partial"
+                else:
+                    response, response_type = _fallback_response(intent_result)
         
-        # Replace any PratChat references with Prat.AI
-        response = response.replace("PratChat", "Prat.AI")
-        response = response.replace("pratchat", "Prat.AI")
-        response = response.replace("Pratchat", "Prat.AI")
+        with stage("branding"):
+            response = _apply_branding(response)
+        if not streamed:
+            yield _sse("token", {"text": response})
         
-        try:
-            log_conversation(user_message, response, intent, confidence, sentiment, response_type)
-        except Exception as log_error:
-            print(f"Logging error: {log_error}")
+        # Logged once, after the full answer is known
+        with stage("log"):
+            await _log(user_message, response, intent, confidence, sentiment, response_type)
+        await _remember(session_id, user_message, response)
+        _record("chat_stream", started, intent, response_type)
         
-        return ChatResponse(
+        done = ChatResponse(
             response=response,
             intent=intent,
             confidence=confidence,
             sentiment=sentiment,
-            response_type=response_type
-        )
+            response_type=response_type,
+            session_id=session_id
+        ).model_dump()
+        if trace is not None:
+            done["trace"] = trace.spans
+            if trace.prompt_tokens:
+                done["prompt_tokens"] = trace.prompt_tokens
+        yield _sse("done", done)
     except Exception as e:
-        print(f"Chat error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Chat stream error: {e}")
+        REQUEST_ERRORS.inc("chat_stream", "500")
+        yield _sse("error", {"status_code": 500, "detail": str(e)})
+    finally:
+        worker_pool.release()
@@ -6,7 +6,7 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
-from utils.database import get_stats
+from utils.database import get_stats, get_stats_range
 
 router = APIRouter()
 
@@ -17,3 +17,12 @@ async def get_analytics():
         return {"status": "success", "data": stats}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+@router.get("/stats/timeseries")
+async def get_analytics_timeseries(granularity: str = "hour", start: str = None, end: str = None):
+    # start/end are bucket labels, e.g. "2024-05-01 13:00" for hours or "2024-05-01" for days
+    try:
+        stats = get_stats_range(start, end, granularity)
+        return {"status": "success", "data": stats}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import os
 import sys
@@ -7,8 +7,11 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
-from utils.ml_model import IntentClassifier
-from utils.embeddings import EmbeddingStore
+from utils import artifacts
+from utils.jobs import job_manager, train_intent_job, embed_job
+from utils.response_cache import response_cache
+from utils.startup import model_registry
+from utils.workers import worker_pool
 
 router = APIRouter()
 
@@ -17,18 +20,35 @@ class TrainResponse(BaseModel):
     message: str
     details: dict
 
+def _swap_intent(version=None):
+    model_registry.swap("intent_classifier", artifacts.load_intent_classifier(version))
+
+def _swap_embeddings(version=None):
+    serving = model_registry.get("embedding_store")
+    # Reuse the loaded SentenceTransformer; only the index and chunks are read from disk
+    encoder = serving.model if serving is not None else None
+    model_registry.swap("embedding_store", artifacts.load_embedding_store(version, encoder=encoder))
+    if response_cache is not None:
+        response_cache.invalidate()
+
+# Artifact kind -> registry component and the function that loads a published version into it
+COMPONENTS = {"intent": "intent_classifier", "embeddings": "embedding_store"}
+SWAPPERS = {"intent": _swap_intent, "embeddings": _swap_embeddings}
+
+def serving_version(kind):
+    return getattr(model_registry.get(COMPONENTS[kind]), "version", None)
+
+def _queued(job, message):
+    return TrainResponse(status=job.to_dict()["status"], message=message, details=job.to_dict())
+
 @router.post("/train", response_model=TrainResponse)
-async def train_model():
+async def train_model(from_log: bool = False, force: bool = False):
+    # Trains in a background process; poll GET /api/jobs/{job_id} for the evaluation report. The new
+    # classifier is swapped in when the job finishes, without a restart, if it beat the serving one.
     try:
-        classifier = IntentClassifier()
-        result = classifier.train()
-        classifier.save()
-        
-        return TrainResponse(
-            status="success",
-            message="Intent classifier trained successfully",
-            details=result
-        )
+        job = job_manager.submit("intent", train_intent_job, from_log, force,
+                                 params={"from_log": from_log, "force": force}, on_success=_swap_intent)
+        return _queued(job, "Intent classifier training started")
     except Exception as e:
         return TrainResponse(
             status="error",
@@ -37,20 +57,71 @@ async def train_model():
         )
 
 @router.post("/embed", response_model=TrainResponse)
-async def build_embeddings():
+async def build_embeddings(full: bool = False):
+    # Only new or edited knowledge base files are re-embedded unless full=true
     try:
-        store = EmbeddingStore()
-        result = store.build_index()
-        store.save()
-        
-        return TrainResponse(
-            status="success",
-            message="Embeddings built successfully",
-            details=result
-        )
+        job = job_manager.submit("embeddings", embed_job, full, params={"full": full}, on_success=_swap_embeddings)
+        return _queued(job, "Embedding build started")
     except Exception as e:
         return TrainResponse(
             status="error",
             message=str(e),
             details={}
         )
+
+@router.get("/jobs")
+async def list_jobs():
+    return {"status": "success", "data": job_manager.list()}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return {"status": "success", "data": job.to_dict()}
+
+@router.get("/models")
+async def list_models():
+    data = {}
+    for kind in COMPONENTS:
+        data[kind] = {**artifacts.describe(kind), "serving": serving_version(kind)}
+    return {"status": "success", "data": data}
+
+@router.post("/models/{kind}/rollback", response_model=TrainResponse)
+async def rollback_model(kind: str, version: str = None):
+    # Points CURRENT at the given version (default: the one published before it) and swaps it in
+    if kind not in SWAPPERS:
+        raise HTTPException(status_code=404, detail=f"Unknown model kind {kind}")
+    target = version or artifacts.previous_version(kind)
+    if target is None:
+        raise HTTPException(status_code=409, detail=f"No earlier {kind} version to roll back to")
+    # Versions become directory names, so only ones that were published are accepted
+    if target not in artifacts.list_versions(kind):
+        raise HTTPException(status_code=404, detail=f"Unknown {kind} version {target}")
+    try:
+        previous = artifacts.current_version(kind)
+        # Load first so a broken version never becomes CURRENT
+        await worker_pool.run(SWAPPERS[kind], target)
+        artifacts.set_current(kind, target)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TrainResponse(
+        status="success",
+        message=f"Rolled {kind} back to {target}",
+        details={"version": target, "previous": previous}
+    )
+
+@router.post("/models/{kind}/reload", response_model=TrainResponse)
+async def reload_model(kind: str):
+    # Picks up a version published outside this process (e.g. python retrain_model.py)
+    if kind not in SWAPPERS:
+        raise HTTPException(status_code=404, detail=f"Unknown model kind {kind}")
+    try:
+        await worker_pool.run(SWAPPERS[kind])
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TrainResponse(
+        status="success",
+        message=f"Reloaded {kind}",
+        details={"version": artifacts.current_version(kind)}
+    )
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+
+# Multi-process serving: the master loads the models once, binds the port, then forks workers that
+# inherit the loaded models copy-on-write and accept connections on the shared socket.
+# Run with: python serve.py --workers 4   (defaults to one worker; 0 starts one per available core)
+
+# Loaded in the master and shared by every worker. The conversation logger and the Gemini client
+# hold threads and connections that must not cross a fork, so each worker starts its own.
+PRELOAD = ("intent_classifier", "embedding_store", "sentiment")
+
+
+def available_cores():
+    # Respects CPU affinity (taskset, container cpusets), unlike os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# One worker unless asked for more: the response cache and GET /api/jobs state stay per process
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))
+
+
+def run_worker(app_module, sock, worker_id, workers, log_level):
+    import uvicorn
+
+    # uvicorn installs its own SIGINT/SIGTERM handlers for graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # One worker applies knowledge base edits; the rest pick up the versions it publishes
+    app_module.KB_WATCH = app_module.KB_WATCH and worker_id == 0
+
+    # Split the cores between workers instead of every worker's torch using all of them
+    # (EMBED_THREADS, when set, already fixed the encoder's thread count)
+    torch = sys.modules.get("torch")
+    if torch is not None and not os.getenv("EMBED_THREADS"):
+        torch.set_num_threads(max(1, available_cores() // workers))
+
+    server = uvicorn.Server(uvicorn.Config(app_module.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Prat.AI with preloaded models shared by forked worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="0 starts one per available core")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Training and rollback run in one worker; the others follow models/<kind>/CURRENT
+        os.environ.setdefault("MODEL_RELOAD_INTERVAL", "5")
+        # Consecutive turns of a session may land on different workers
+        os.environ.setdefault("SESSION_SHARED", "1")
+
+    import uvicorn
+    import main as app_module
+    from utils.startup import model_registry
+
+    if args.workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(app_module.app, host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # asyncio.run joins its loader threads before returning, so no thread is alive at fork time
+    asyncio.run(model_registry.warm_up(PRELOAD))
+    while model_registry.settling(PRELOAD):
+        # A failed load is being rebuilt on a background thread; fork only once it is done
+        time.sleep(0.2)
+    print(f"[OK] Preloaded {', '.join(PRELOAD)}; starting {args.workers} workers on {args.host}:{args.port}")
+
+    children = {}
+    stopping = False
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app_module, sock, worker_id, args.workers, args.log_level)
+            finally:
+                os._exit(0)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(args.workers):
+        spawn(worker_id)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        worker_id = children.pop(pid, None)
+        if worker_id is not None and not stopping:
+            # Respawning from the master is cheap: the models are already in memory
+            print(f"[WARN] Worker {worker_id} (pid {pid}) exited with status {status}; restarting")
+            spawn(worker_id)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
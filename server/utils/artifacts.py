@@ -0,0 +1,158 @@
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MODELS_DIR = BASE_DIR / "models"
+
+# Published versions kept per artifact kind; the serving version is never pruned
+ARTIFACT_KEEP_VERSIONS = int(os.getenv("ARTIFACT_KEEP_VERSIONS", "5"))
+
+# Seconds between checks of models/<kind>/CURRENT so every worker process serves what another
+# process published or rolled back; 0 disables (serve.py turns it on when forking workers)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "0"))
+
+# models/<kind>/<version>/ holds one immutable build; models/<kind>/CURRENT names the one to serve.
+# Before the first publish the flat files directly under models/ are used.
+KINDS = ("intent", "embeddings")
+POINTER = "CURRENT"
+
+
+def kind_dir(kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown artifact kind: {kind}")
+    return MODELS_DIR / kind
+
+
+def version_dir(kind, version):
+    return kind_dir(kind) / version
+
+
+def list_versions(kind):
+    root = kind_dir(kind)
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def current_version(kind):
+    try:
+        return (kind_dir(kind) / POINTER).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_dir(kind):
+    version = current_version(kind)
+    return version_dir(kind, version) if version else MODELS_DIR
+
+
+def set_current(kind, version):
+    if not version_dir(kind, version).is_dir():
+        raise ValueError(f"No {kind} version {version}")
+    # Write-then-rename so a reader never sees a half-written pointer
+    tmp = kind_dir(kind) / f".{POINTER}.{os.getpid()}"
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, kind_dir(kind) / POINTER)
+
+
+def new_version():
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def publish(kind, save_fn):
+    # save_fn(directory) writes a complete build into a scratch directory, which is renamed into
+    # place in one step and only then made current
+    version = new_version()
+    root = kind_dir(kind)
+    os.makedirs(root, exist_ok=True)
+    tmp = root / f".tmp-{version}"
+    try:
+        save_fn(tmp)
+        os.rename(tmp, root / version)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    set_current(kind, version)
+    prune(kind)
+    return version
+
+
+def previous_version(kind, version=None):
+    version = version or current_version(kind)
+    older = [v for v in list_versions(kind) if version is None or v < version]
+    return older[-1] if older else None
+
+
+def prune(kind, keep=ARTIFACT_KEEP_VERSIONS):
+    if keep <= 0:
+        return []
+    versions = list_versions(kind)
+    kept = set(versions[-keep:]) | {current_version(kind)}
+    stale = [v for v in versions if v not in kept]
+    for version in stale:
+        shutil.rmtree(version_dir(kind, version), ignore_errors=True)
+    return stale
+
+
+def describe(kind):
+    return {"current": current_version(kind), "versions": list_versions(kind)}
+
+
+def load_intent_classifier(version=None):
+    from utils.ml_model import IntentClassifier
+    version = version or current_version("intent")
+    classifier = IntentClassifier()
+    classifier.load(version_dir("intent", version) if version else MODELS_DIR)
+    classifier.version = version
+    return classifier
+
+
+def load_embedding_store(version=None, encoder=None):
+    from utils.embeddings import EmbeddingStore
+    version = version or current_version("embeddings")
+    store = EmbeddingStore(encoder=encoder)
+    store.load(version_dir("embeddings", version) if version else MODELS_DIR)
+    store.version = version
+    return store
+
+
+class VersionFollower:
+    # Polls the CURRENT pointers and calls reload(kind) when they name a version this process is not
+    # serving. Training, rollback and the knowledge base watcher only swap the process they run in.
+    def __init__(self, serving_version, reload, interval=MODEL_RELOAD_INTERVAL):
+        self.serving_version = serving_version
+        self.reload = reload
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        reloaded = []
+        for kind in KINDS:
+            version = current_version(kind)
+            if version and version != self.serving_version(kind):
+                try:
+                    self.reload(kind)
+                    reloaded.append(kind)
+                except Exception as e:
+                    print(f"[ERROR] Reloading {kind} version {version} failed: {e}")
+        return reloaded
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="version-follower", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
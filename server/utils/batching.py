@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+
+from utils.workers import worker_pool
+
+# Upper bound on items coalesced into one batched call
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+# How long the first request in a batch waits for company before the batch is flushed
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+class BatchMetrics:
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.total_queue_delay_ms = 0.0
+        self.max_queue_delay_ms = 0.0
+        self.total_run_ms = 0.0
+        self.errors = 0
+
+    def record(self, batch_size, queue_delays_ms, run_ms):
+        self.batches += 1
+        self.items += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if batch_size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                break
+        self.total_queue_delay_ms += sum(queue_delays_ms)
+        self.max_queue_delay_ms = max(self.max_queue_delay_ms, max(queue_delays_ms))
+        self.total_run_ms += run_ms
+
+    def to_dict(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.max_batch_size,
+            "batch_size_histogram": {f"le_{k}": v for k, v in self.batch_size_histogram.items()},
+            "avg_queue_delay_ms": round(self.total_queue_delay_ms / self.items, 3) if self.items else 0.0,
+            "max_queue_delay_ms": round(self.max_queue_delay_ms, 3),
+            "avg_batch_run_ms": round(self.total_run_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+# Coalesces concurrent single-item calls into one batched call on the worker pool.
+# batch_fn takes a list of items and returns a list of results in the same order.
+class MicroBatcher:
+    def __init__(self, name, batch_fn, max_batch_size=BATCH_MAX_SIZE, window_ms=BATCH_WINDOW_MS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_ms = window_ms
+        self.metrics = BatchMetrics()
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000.0, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        queue_delays_ms = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+        items = [item for item, _, _ in batch]
+
+        try:
+            results = await worker_pool.run(self.batch_fn, items)
+            # zip would silently leave the callers past the end of a short result list waiting forever
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            self.metrics.errors += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.metrics.record(len(batch), queue_delays_ms, (time.perf_counter() - started) * 1000)
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window_ms,
+            "pending": len(self._pending),
+            **self.metrics.to_dict(),
+        }
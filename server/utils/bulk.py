@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import time
+
+from utils.canned import canned_answers
+from utils.prompt_builder import prompt_builder
+from utils.routing import response_router
+from utils.sentiment import analyze_sentiment_batch
+from utils.workers import worker_pool
+
+# Messages classified, scored and embedded per vectorized call
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "256"))
+# Gemini calls in flight at once for a bulk run that asks for responses
+BULK_GEMINI_CONCURRENCY = int(os.getenv("BULK_GEMINI_CONCURRENCY", "4"))
+
+
+def parse_line(line):
+    # {"message": "...", "id": ...} ("text" is accepted too) or a bare JSON string
+    record = json.loads(line)
+    if isinstance(record, str):
+        return {"message": record}
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object or string")
+    message = record.get("message", record.get("text"))
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError("missing 'message'")
+    return {"id": record.get("id"), "message": message}
+
+
+async def iter_chunks(lines, chunk_size, start=0):
+    # lines: async iterable of JSONL lines. Yields lists of (line number, record or error); lines before
+    # `start` were handled by an earlier run and are skipped.
+    chunk = []
+    line_no = -1
+    async for line in lines:
+        line_no += 1
+        if line_no < start:
+            continue
+        if not line.strip():
+            continue
+        try:
+            chunk.append((line_no, parse_line(line)))
+        except ValueError as e:
+            chunk.append((line_no, e))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.processed = 0
+        self.errors = 0
+        self.gemini_calls = 0
+        self.gemini_errors = 0
+        self.last_line = None
+        self.stage_ms = {"intent": 0.0, "sentiment": 0.0, "retrieval": 0.0, "gemini": 0.0}
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "gemini_calls": self.gemini_calls,
+            "gemini_errors": self.gemini_errors,
+            # Resume a cut-off run with start=next_line
+            "next_line": self.last_line + 1 if self.last_line is not None else None,
+            "elapsed_s": round(elapsed, 3),
+            "messages_per_sec": round(self.processed / elapsed, 1) if elapsed > 0 else 0.0,
+            "stage_ms": {stage: round(ms, 1) for stage, ms in self.stage_ms.items()},
+        }
+
+
+class BulkProcessor:
+    # Replays many messages through the chat pipeline: intent, sentiment and retrieval run as one
+    # vectorized call per chunk; responses (optional) are routed like chat requests, with Gemini calls
+    # made per message at bounded concurrency. finish(response) is the chat route's post-processing.
+    def __init__(self, classifier, store=None, gemini_client=None, router=response_router, finish=None,
+                 chunk_size=BULK_CHUNK_SIZE, gemini_concurrency=BULK_GEMINI_CONCURRENCY, top_k=2):
+        self.classifier = classifier
+        self.store = store
+        self.gemini_client = gemini_client
+        self.router = router
+        self.finish = finish or (lambda response: response)
+        self.chunk_size = max(1, chunk_size)
+        self.gemini_concurrency = max(1, gemini_concurrency)
+        self.top_k = top_k
+        self.stats = BulkStats()
+
+    def analyze(self, texts):
+        timings = {}
+        started = time.perf_counter()
+        intents = self.classifier.predict_batch(texts)
+        timings["intent"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        sentiments = analyze_sentiment_batch(texts)
+        timings["sentiment"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if self.store is not None:
+            hits = self.store.search_hybrid_batch(texts, self.store.encode_queries(texts), self.top_k)
+        else:
+            hits = [[] for _ in texts]
+        timings["retrieval"] = time.perf_counter() - started
+        return intents, sentiments, hits, timings
+
+    async def _analyze_chunk(self, chunk):
+        valid = [(line_no, record) for line_no, record in chunk if isinstance(record, dict)]
+        if valid:
+            analysis = await worker_pool.run(self.analyze, [record["message"] for _, record in valid])
+        else:
+            analysis = ([], [], [], {})
+        return chunk, valid, analysis
+
+    async def _respond(self, semaphore, message, intent_result, hits):
+        canned = canned_answers.match(message)
+        if canned is not None:
+            return {"response": self.finish(canned["response"]), "response_type": "canned"}
+        # Replays are deterministic: the first canned response rather than a random one
+        if self.router.is_local(intent_result):
+            return {"response": self.finish(intent_result["responses"][0]), "response_type": "ml_local"}
+        extractive = self.router.extractive(intent_result["intent"], message, hits)
+        if extractive:
+            return {"response": self.finish(extractive), "response_type": "kb_extractive"}
+        async with semaphore:
+            started = time.perf_counter()
+            self.stats.gemini_calls += 1
+            try:
+                context, _ = prompt_builder.build(hits)
+                response = await self.gemini_client.generate_response_async(message, context)
+                return {"response": self.finish(response), "response_type": "llm_gemini"}
+            except Exception as e:
+                self.stats.gemini_errors += 1
+                return {"response": None, "response_type": "error", "error": str(e)}
+            finally:
+                self.stats.stage_ms["gemini"] += (time.perf_counter() - started) * 1000
+
+    async def _results(self, chunk, valid, analysis, semaphore):
+        intents, sentiments, hits, timings = analysis
+        for stage, seconds in timings.items():
+            self.stats.stage_ms[stage] += seconds * 1000
+
+        responses = [None] * len(valid)
+        if self.gemini_client is not None:
+            responses = await asyncio.gather(*(
+                self._respond(semaphore, record["message"], intent, doc_hits)
+                for (_, record), intent, doc_hits in zip(valid, intents, hits)
+            ))
+
+        by_line = {}
+        for (line_no, record), intent, sentiment, doc_hits, response in zip(valid, intents, sentiments, hits, responses):
+            result = {
+                "line": line_no,
+                "id": record["id"] if record.get("id") is not None else line_no,
+                "message": record["message"],
+                "intent": intent["intent"],
+                "confidence": intent["confidence"],
+                "sentiment": sentiment["sentiment"],
+                "polarity": sentiment["polarity"],
+                "retrieved": [{"filename": hit["filename"], "score": round(hit["score"], 4)} for hit in doc_hits],
+            }
+            if response is not None:
+                result.update(response)
+            by_line[line_no] = result
+
+        results = []
+        for line_no, record in chunk:
+            if line_no in by_line:
+                results.append(by_line[line_no])
+            else:
+                self.stats.errors += 1
+                results.append({"line": line_no, "error": str(record)})
+        self.stats.processed += len(chunk)
+        self.stats.last_line = chunk[-1][0]
+        return results
+
+    async def run(self, lines, start=0):
+        # Yields one list of result dicts per chunk, in input order. The next chunk is analyzed on the
+        # worker pool while this chunk's Gemini calls are in flight.
+        semaphore = asyncio.Semaphore(self.gemini_concurrency)
+        pending = None
+        async for chunk in iter_chunks(lines, self.chunk_size, start):
+            task = asyncio.ensure_future(self._analyze_chunk(chunk))
+            if pending is not None:
+                yield await self._results(*(await pending), semaphore)
+            pending = task
+        if pending is not None:
+            yield await self._results(*(await pending), semaphore)
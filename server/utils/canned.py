@@ -0,0 +1,123 @@
+import json
+import os
+import re
+from pathlib import Path
+
+from utils.persona import NAMED_TEXTS
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Canned answers and output rewrites (see data/canned.json); a missing file keeps the built-in rules
+CANNED_RULES = os.getenv("CANNED_RULES", str(BASE_DIR / "data" / "canned.json"))
+
+# The identity/creator keyword lists and branding fix-ups that used to be hard-coded
+DEFAULT_RULES = {
+    "answers": [
+        {"name": "identity", "intent": "identity", "text_ref": "persona",
+         "keywords": ["who are you", "what are you", "who is prat.ai", "is prat.ai an llm", "what is pratware",
+                      "tell me about yourself"]},
+        {"name": "creator", "intent": "creator", "text_ref": "creator_bio",
+         "keywords": ["who is pratyush", "pratyush srivastava", "tell me about pratyush", "who created prat.ai",
+                      "founder of pratware", "ceo of pratware", "who made you", "your creator"]},
+    ],
+    "rewrites": {"PratChat": "Prat.AI", "Pratchat": "Prat.AI", "pratchat": "Prat.AI"},
+}
+
+
+def load_rules(path=CANNED_RULES):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_RULES
+
+
+def trie_pattern(words):
+    # One regex for many literal strings. Words sharing a prefix share a branch, so each position in the
+    # text is tried against a trie walk rather than every word in turn; greedy optionals make the longest
+    # word win at a position.
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _trie_regex(trie)
+
+
+def _trie_regex(node):
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    ends_here = "" in node
+    if len(branches) == 1 and not ends_here:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")" + ("?" if ends_here else "")
+
+
+# Up to this many rewrites that cannot interact are applied with str.replace, which beats a regex scan
+# for a handful of keys and gives the same result
+REWRITE_REPLACE_MAX = 8
+
+
+def _overlaps(text, key):
+    # key occurs in text, or one can run into the other (a suffix of text starts key, or key ends with a
+    # prefix of text), so replacing in sequence could create or break a match
+    if key in text:
+        return True
+    return any(text.endswith(key[:i]) or text.startswith(key[-i:]) for i in range(1, len(key)))
+
+
+class Rewriter:
+    # Replaces every key of `mapping` with its value in one left-to-right pass (longest key first)
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+        self._pattern = re.compile(trie_pattern(self.mapping)) if self.mapping else None
+        # Characters a streamed chunk boundary can split a key across
+        self.holdback = max(len(key) for key in self.mapping) - 1 if self.mapping else 0
+        keys, values = list(self.mapping), list(self.mapping.values())
+        self._replace_in_turn = len(keys) <= REWRITE_REPLACE_MAX and not any(
+            _overlaps(other, key) for i, key in enumerate(keys) for other in keys[:i] + keys[i + 1:] + values)
+
+    def rewrite(self, text):
+        if self._pattern is None:
+            return text
+        if self._replace_in_turn:
+            for key, value in self.mapping.items():
+                text = text.replace(key, value)
+            return text
+        return self._pattern.sub(lambda m: self.mapping[m.group(0)], text)
+
+
+class CannedAnswers:
+    # Fixed answers picked by keyword, checked before the intent classifier so a match skips retrieval
+    # and Gemini. Keywords match case-insensitively anywhere in the message; when keywords of several
+    # answers match, the answer listed first in the rules file wins.
+    def __init__(self, rules=None):
+        rules = rules if rules is not None else load_rules()
+        self.answers = []
+        self._priority = {}
+        for answer in rules.get("answers", []):
+            text = answer["text"] if "text" in answer else NAMED_TEXTS[answer["text_ref"]]
+            self.answers.append({"name": answer["name"], "intent": answer.get("intent", answer["name"]), "response": text})
+            for keyword in answer["keywords"]:
+                self._priority.setdefault(keyword.lower(), len(self.answers) - 1)
+        pattern = trie_pattern(self._priority)
+        # Lookahead: matches start at every position, so overlapping keywords are all seen
+        self._matcher = re.compile(f"(?=({pattern}))") if pattern else None
+        self.rewriter = Rewriter(rules.get("rewrites", {}))
+
+    def match(self, message):
+        if self._matcher is None:
+            return None
+        best = None
+        for m in self._matcher.finditer(message.lower()):
+            priority = self._priority[m.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return self.answers[best] if best is not None else None
+
+
+canned_answers = CannedAnswers()
@@ -0,0 +1,66 @@
+import os
+
+# Characters per chunk and characters shared between neighbouring chunks
+CHUNK_SIZE = int(os.getenv("KB_CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", "150"))
+
+
+def _last_break(text, lo, hi):
+    # Latest whitespace in text[lo:hi], preferring paragraph and line breaks
+    for sep in ("\n\n", "\n", " "):
+        pos = text.rfind(sep, lo, hi)
+        if pos != -1:
+            return pos
+    return -1
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if overlap < 0 or overlap >= chunk_size:
+        raise ValueError("overlap must be between 0 and chunk_size - 1")
+
+    chunks = []
+    length = len(text)
+    start = 0
+
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            # Break on whitespace in the back half of the window so words stay intact
+            split = _last_break(text, start + chunk_size // 2, end)
+            if split > start:
+                end = split
+
+        piece = text[start:end]
+        content = piece.strip()
+        if content:
+            offset = start + (len(piece) - len(piece.lstrip()))
+            chunks.append({"content": content, "start": offset, "end": offset + len(content)})
+
+        if end >= length:
+            break
+
+        next_start = end - overlap
+        if start < next_start < end:
+            # Begin the overlap at a word boundary
+            space = text.find(" ", next_start, end)
+            if space != -1:
+                next_start = space + 1
+        start = max(next_start, start + 1)
+
+    return chunks
+
+
+def chunk_documents(documents, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    chunks = []
+    for doc in documents:
+        for i, chunk in enumerate(chunk_text(doc["content"], chunk_size, overlap)):
+            chunks.append({
+                "filename": doc["filename"],
+                "chunk_id": i,
+                "start": chunk["start"],
+                "end": chunk["end"],
+                "content": chunk["content"],
+            })
+    return chunks
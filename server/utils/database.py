@@ -1,13 +1,68 @@
 import sqlite3
+import queue
+from collections import defaultdict
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 import os
 
+from utils.metrics import observe_stage
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DB_PATH = BASE_DIR / "pratchat.db"
 
+# Conversation rows waiting for the background writer
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Rows per INSERT transaction, and the longest a row waits before its batch is written
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL_MS = float(os.getenv("LOG_FLUSH_INTERVAL_MS", "200"))
+# What to do when the queue is full: drop_oldest, drop_new or block (waits up to LOG_BLOCK_TIMEOUT_MS)
+LOG_QUEUE_FULL_POLICY = os.getenv("LOG_QUEUE_FULL_POLICY", "drop_oldest")
+LOG_BLOCK_TIMEOUT_MS = float(os.getenv("LOG_BLOCK_TIMEOUT_MS", "1000"))
+
+QUEUE_FULL_POLICIES = ("drop_oldest", "drop_new", "block")
+
+# Stored in PRAGMA user_version; 1 = stats_counters kept by the log writer
+SCHEMA_VERSION = 1
+
+# Pre-aggregated analytics: one row per (granularity, bucket, dimension, value)
+STATS_GRANULARITIES = {
+    "total": "''",
+    "hour": "strftime('%Y-%m-%d %H:00', timestamp)",
+    "day": "strftime('%Y-%m-%d', timestamp)",
+}
+STATS_DIMENSIONS = {
+    "all": "''",
+    "intent": "COALESCE(intent, '')",
+    "sentiment": "COALESCE(sentiment, '')",
+    "response_type": "COALESCE(response_type, '')",
+}
+
+UPSERT_COUNTER = """
+    INSERT INTO stats_counters (granularity, bucket, dimension, value, count, confidence_sum, confidence_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (granularity, bucket, dimension, value) DO UPDATE SET
+        count = count + excluded.count,
+        confidence_sum = confidence_sum + excluded.confidence_sum,
+        confidence_count = confidence_count + excluded.confidence_count
+"""
+
+INSERT_CONVERSATION = """
+    INSERT INTO conversations (user_message, bot_response, intent, confidence, sentiment, response_type, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def connect(db_path=None):
+    conn = sqlite3.connect(db_path or DB_PATH, check_same_thread=False)
+    # WAL lets /api/stats read while the writer commits; NORMAL sync is safe with WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -23,42 +78,317 @@ def init_db():
         )
     """)
     
-    conn.commit()
-    conn.close()
-
-def log_conversation(user_msg, bot_response, intent, confidence, sentiment, response_type):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_intent ON conversations (intent)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_sentiment ON conversations (sentiment)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations (timestamp)")
     
     cursor.execute("""
-        INSERT INTO conversations (user_message, bot_response, intent, confidence, sentiment, response_type)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (user_msg, bot_response, intent, confidence, sentiment, response_type))
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            confidence_sum REAL NOT NULL DEFAULT 0,
+            confidence_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket, dimension, value)
+        ) WITHOUT ROWID
+    """)
     
+    # Chat sessions spilled from memory (utils/sessions.py); turns is a JSON list
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            turns TEXT NOT NULL,
+            updated REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated)")
     conn.commit()
-    conn.close()
+    
+    # Databases from before the counters get a one-time backfill. The version check, backfill and
+    # version bump share one write transaction, so concurrent starts (serve.py workers) run it once
+    # and no log writer batch lands in between
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            _count_conversations(conn)
+            print("[OK] Backfilled stats counters from the conversation log")
+        if version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    finally:
+        conn.close()
 
-def get_stats():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def _count_conversations(conn):
+    conn.execute("DELETE FROM stats_counters")
+    for granularity, bucket_expr in STATS_GRANULARITIES.items():
+        for dimension, value_expr in STATS_DIMENSIONS.items():
+            conn.execute(f"""
+                INSERT INTO stats_counters (granularity, bucket, dimension, value, count, confidence_sum, confidence_count)
+                SELECT '{granularity}', {bucket_expr}, '{dimension}', {value_expr},
+                       COUNT(*), COALESCE(SUM(confidence), 0), COUNT(confidence)
+                FROM conversations
+                GROUP BY {bucket_expr}, {value_expr}
+            """)
+
+def rebuild_stats(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    with conn:
+        _count_conversations(conn)
+    if own_conn:
+        conn.close()
+
+def aggregate_counters(rows):
+    # Collapses a batch of conversation rows into counter increments for UPSERT_COUNTER
+    totals = defaultdict(lambda: [0, 0.0, 0])
+    for _, _, intent, confidence, sentiment, response_type, timestamp in rows:
+        buckets = {"total": "", "hour": f"{timestamp[:13]}:00", "day": timestamp[:10]}
+        values = {"all": "", "intent": intent or "", "sentiment": sentiment or "", "response_type": response_type or ""}
+        for granularity, bucket in buckets.items():
+            for dimension, value in values.items():
+                entry = totals[(granularity, bucket, dimension, value)]
+                entry[0] += 1
+                if confidence is not None:
+                    entry[1] += confidence
+                    entry[2] += 1
+    return [(*key, count, conf_sum, conf_count) for key, (count, conf_sum, conf_count) in totals.items()]
+
+class ConversationLogger:
+    def __init__(self, db_path=None, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval_ms=LOG_FLUSH_INTERVAL_MS, full_policy=LOG_QUEUE_FULL_POLICY):
+        if full_policy not in QUEUE_FULL_POLICIES:
+            raise ValueError(f"Unknown LOG_QUEUE_FULL_POLICY '{full_policy}', expected one of {QUEUE_FULL_POLICIES}")
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.full_policy = full_policy
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+    
+    @property
+    def blocking(self):
+        return self.full_policy == "block"
+    
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+                self._thread.start()
+        return self
     
-    cursor.execute("SELECT COUNT(*) FROM conversations")
-    total_conversations = cursor.fetchone()[0]
+    def log(self, row):
+        # Only queues: rows wait for start(), which runs once init_db has created the tables
+        try:
+            self._queue.put_nowait(row)
+            self.enqueued += 1
+            return True
+        except queue.Full:
+            pass
+        
+        if self.full_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(row)
+                self.enqueued += 1
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+        
+        if self.full_policy == "block":
+            try:
+                self._queue.put(row, timeout=LOG_BLOCK_TIMEOUT_MS / 1000.0)
+                self.enqueued += 1
+                return True
+            except queue.Full:
+                pass
+        
+        self.dropped += 1
+        return False
     
-    cursor.execute("SELECT intent, COUNT(*) as count FROM conversations GROUP BY intent ORDER BY count DESC LIMIT 5")
-    top_intents = cursor.fetchall()
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stop.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
     
-    cursor.execute("SELECT sentiment, COUNT(*) as count FROM conversations GROUP BY sentiment")
-    sentiment_dist = cursor.fetchall()
+    def _write(self, conn, batch):
+        started = time.perf_counter()
+        try:
+            # Counters move in the same transaction so /api/stats never disagrees with the log
+            with conn:
+                conn.executemany(INSERT_CONVERSATION, batch)
+                conn.executemany(UPSERT_COUNTER, aggregate_counters(batch))
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[ERROR] Conversation log write failed ({len(batch)} rows): {e}")
+        finally:
+            # One transaction per batch, off the request path
+            observe_stage("log_write", started)
+            for _ in batch:
+                self._queue.task_done()
     
-    cursor.execute("SELECT AVG(confidence) FROM conversations WHERE confidence IS NOT NULL")
-    avg_confidence = cursor.fetchone()[0] or 0
+    def _run(self):
+        conn = connect(self.db_path)
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch:
+                    self._write(conn, batch)
+                elif self._stop.is_set() and self._queue.empty():
+                    break
+        finally:
+            conn.close()
     
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+    
+    def stop(self, timeout=10.0):
+        # Drains whatever is still queued before the writer exits
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+    
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "full_policy": self.full_policy,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+conversation_logger = ConversationLogger()
+
+def log_conversation(user_msg, bot_response, intent, confidence, sentiment, response_type):
+    # Stamped here rather than by the column default so batched rows keep their own time
+    timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    return conversation_logger.log((user_msg, bot_response, intent, confidence, sentiment, response_type, timestamp))
+
+def _counter_summary(rows):
+    total = 0
+    confidence_sum = 0.0
+    confidence_count = 0
+    by_dimension = defaultdict(list)
+    for dimension, value, count, conf_sum, conf_count in rows:
+        if dimension == "all":
+            total += count
+            confidence_sum += conf_sum
+            confidence_count += conf_count
+        else:
+            by_dimension[dimension].append((value or None, count))
+    return total, confidence_sum, confidence_count, by_dimension
+
+def _merge_counts(pairs):
+    merged = defaultdict(int)
+    for value, count in pairs:
+        merged[value] += count
+    return sorted(merged.items(), key=lambda item: item[1], reverse=True)
+
+def get_stats():
+    # Reads only the pre-aggregated "total" counters, so cost does not grow with the conversation log
+    conn = connect()
+    rows = conn.execute("""
+        SELECT dimension, value, count, confidence_sum, confidence_count
+        FROM stats_counters WHERE granularity = 'total'
+    """).fetchall()
     conn.close()
     
+    total_conversations, confidence_sum, confidence_count, by_dimension = _counter_summary(rows)
+    avg_confidence = confidence_sum / confidence_count if confidence_count else 0
+    
     return {
         "total_conversations": total_conversations,
-        "top_intents": [{"intent": i[0], "count": i[1]} for i in top_intents],
-        "sentiment_distribution": [{"sentiment": s[0], "count": s[1]} for s in sentiment_dist],
+        "top_intents": [{"intent": i, "count": c} for i, c in _merge_counts(by_dimension["intent"])[:5]],
+        "sentiment_distribution": [{"sentiment": s, "count": c} for s, c in _merge_counts(by_dimension["sentiment"])],
+        "response_type_distribution": [{"response_type": r, "count": c} for r, c in _merge_counts(by_dimension["response_type"])],
         "average_confidence": round(avg_confidence, 2)
     }
+
+def get_stats_range(start=None, end=None, granularity="hour"):
+    if granularity not in ("hour", "day"):
+        raise ValueError("granularity must be 'hour' or 'day'")
+    
+    query = """
+        SELECT bucket, dimension, value, count, confidence_sum, confidence_count
+        FROM stats_counters WHERE granularity = ?
+    """
+    params = [granularity]
+    if start:
+        query += " AND bucket >= ?"
+        params.append(start)
+    if end:
+        query += " AND bucket <= ?"
+        params.append(end)
+    query += " ORDER BY bucket"
+    
+    conn = connect()
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+    
+    buckets = defaultdict(list)
+    for bucket, *rest in rows:
+        buckets[bucket].append(rest)
+    
+    series = []
+    all_rows = []
+    for bucket, bucket_rows in buckets.items():
+        all_rows.extend(bucket_rows)
+        count, conf_sum, conf_count, _ = _counter_summary(bucket_rows)
+        series.append({
+            "bucket": bucket,
+            "count": count,
+            "average_confidence": round(conf_sum / conf_count, 2) if conf_count else 0
+        })
+    
+    total, conf_sum, conf_count, by_dimension = _counter_summary(all_rows)
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "total_conversations": total,
+        "average_confidence": round(conf_sum / conf_count, 2) if conf_count else 0,
+        "intents": [{"intent": i, "count": c} for i, c in _merge_counts(by_dimension["intent"])],
+        "sentiment_distribution": [{"sentiment": s, "count": c} for s, c in _merge_counts(by_dimension["sentiment"])],
+        "series": series
+    }
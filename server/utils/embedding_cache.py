@@ -0,0 +1,215 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MODELS_DIR = BASE_DIR / "models"
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "1") == "1"
+# Byte budget for the in-process LRU tier
+EMBED_CACHE_MEMORY_MB = float(os.getenv("EMBED_CACHE_MEMORY_MB", "64"))
+# SQLite file for the on-disk tier; an empty value keeps the cache in memory only
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", str(MODELS_DIR / "embedding_cache.sqlite"))
+EMBED_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_DISK_MAX_ENTRIES", "1000000"))
+
+# Approximate per-entry cost of the OrderedDict node, key bytes and ndarray header
+ENTRY_OVERHEAD_BYTES = 200
+SQLITE_MAX_PARAMS = 500
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name, memory_mb=EMBED_CACHE_MEMORY_MB, db_path=EMBED_CACHE_PATH,
+                 disk_max_entries=EMBED_CACHE_DISK_MAX_ENTRIES):
+        self.model_name = model_name
+        self.memory_budget = int(memory_mb * 1024 * 1024)
+        self.memory_bytes = 0
+        self.disk_max_entries = disk_max_entries
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._inserts_since_trim = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._connect()
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._conn.commit()
+
+    def reopen(self):
+        # A forked worker must not share its parent's SQLite connection or a lock the parent held
+        self._lock = threading.Lock()
+        if self.db_path:
+            self._connect()
+
+    def _remember(self, key, vector):
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        size = vector.nbytes + ENTRY_OVERHEAD_BYTES
+        if size > self.memory_budget:
+            return
+        self._memory[key] = vector
+        self.memory_bytes += size
+        while self.memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+            self.evictions += 1
+
+    def get_many(self, texts):
+        keys = [text_key(t) for t in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing and self._conn is not None:
+                pending = list(missing)
+                for start in range(0, len(pending), SQLITE_MAX_PARAMS):
+                    batch = pending[start:start + SQLITE_MAX_PARAMS]
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN "
+                        f"({','.join('?' * len(batch))})",
+                        [self.model_name, *batch]
+                    ).fetchall()
+                    for key, blob in rows:
+                        key = bytes(key)
+                        vector = np.frombuffer(blob, dtype='float32').copy()
+                        self._remember(key, vector)
+                        for i in missing.pop(key):
+                            results[i] = vector
+                            self.disk_hits += 1
+
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        return results
+
+    def put_many(self, texts, vectors):
+        vectors = np.asarray(vectors, dtype='float32')
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_key(text)
+                vector = np.ascontiguousarray(vector)
+                self._remember(key, vector)
+                rows.append((self.model_name, key, vector.shape[0], vector.tobytes()))
+
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, dimension, vector) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+                self._inserts_since_trim += len(rows)
+                if self._inserts_since_trim >= 1000:
+                    self._trim_disk()
+
+    def _trim_disk(self):
+        # Caller holds the lock; drops the oldest rows once the disk tier is over its cap
+        self._inserts_since_trim = 0
+        total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = total - self.disk_max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                (excess,)
+            )
+            self._conn.commit()
+            self.disk_evictions += excess
+
+    def encode(self, texts, encode_fn):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+
+        cached = self.get_many(texts)
+        # Deduplicate within the batch so repeated chunks are only encoded once
+        todo = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if todo:
+            fresh = np.asarray(encode_fn(todo), dtype='float32')
+            self.put_many(todo, fresh)
+            computed = dict(zip(todo, fresh))
+            cached = [v if v is not None else computed[t] for t, v in zip(texts, cached)]
+
+        return np.vstack(cached)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self.memory_bytes = 0
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self.memory_bytes,
+            "memory_budget_bytes": self.memory_budget,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self._conn is not None,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _reopen_after_fork():
+    for cache in _caches.values():
+        cache.reopen()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+def get_embedding_cache(model_name):
+    # One cache per model so every EmbeddingStore instance shares the same memory tier
+    if not EMBED_CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model_name)
+        return _caches[model_name]
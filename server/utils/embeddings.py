@@ -1,26 +1,81 @@
-from sentence_transformers import SentenceTransformer
 import faiss
+import hashlib
+import json
 import numpy as np
 import os
 import pickle
+import threading
 from pathlib import Path
 
+from utils.embedding_cache import get_embedding_cache
+from utils.encoder import load_encoder, encoder_key, EMBED_BACKEND
+from utils.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from utils.chunking import chunk_documents, CHUNK_SIZE, CHUNK_OVERLAP
+from utils.mapped_format import read_manifest, write_manifest, write_chunks, MappedDocuments
+from utils.vector_index import (build_index, index_type_of, normalize, remove_vectors, read_index,
+                                writable_copy, choose_index_type, choose_quantization, quantization_of,
+                                rerank, FloatVectors, KB_INDEX_TYPE, KB_QUANTIZE)
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 KB_DIR = BASE_DIR / "data" / "knowledge_base"
 MODELS_DIR = BASE_DIR / "models"
+MANIFEST_VERSION = 1
+STORE_MANIFEST = "store.json"
+
+# Memory-map saved indexes and chunk text so worker processes share one copy through the page cache
+KB_MMAP = os.getenv("KB_MMAP", "1") == "1"
+# "1" keeps a BM25 index next to the vectors and fuses both rankings; "0" searches vectors only
+KB_LEXICAL = os.getenv("KB_LEXICAL", "1") == "1"
+# Reciprocal-rank fusion constant, and how many results each ranking contributes before fusing
+KB_RRF_K = int(os.getenv("KB_RRF_K", "60"))
+KB_HYBRID_CANDIDATES = int(os.getenv("KB_HYBRID_CANDIDATES", "20"))
+# Lexical-only fast path: taken when the top BM25 chunk matches at least this share of the query's
+# (idf-weighted) terms and outscores the runner-up by KB_LEXICAL_MARGIN; "0" disables it
+KB_LEXICAL_FAST_PATH = os.getenv("KB_LEXICAL_FAST_PATH", "1") == "1"
+KB_LEXICAL_MIN_COVERAGE = float(os.getenv("KB_LEXICAL_MIN_COVERAGE", "1.0"))
+KB_LEXICAL_MARGIN = float(os.getenv("KB_LEXICAL_MARGIN", "1.5"))
+# Candidates a quantized index returns per requested result, re-scored with float vectors;
+# 0 keeps no float copy and ranks by the quantized scores alone
+KB_RERANK_FACTOR = int(os.getenv("KB_RERANK_FACTOR", "4"))
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 class EmbeddingStore:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name='all-MiniLM-L6-v2', index_type=KB_INDEX_TYPE,
+                 chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, encoder=None, quantize=KB_QUANTIZE):
+        if encoder is None:
+            encoder = load_encoder(model_name)
+        # A hot-swapped store reuses the serving store's encoder instead of loading a second copy
+        self.model = encoder
+        self.model_name = model_name
+        # Published artifact version this store was loaded from (None for the legacy flat layout)
+        self.version = None
+        self.cache = get_embedding_cache(encoder_key(model_name))
         self.index = None
-        self.documents = []
+        self.quantize = quantize
+        # Float copies of the vectors for re-ranking when the index stores quantized codes, else None
+        self.vectors = None
+        # BM25 inverted index over the same chunk ids (None with KB_LEXICAL=0)
+        self.lexical = None
+        # Chunk id -> chunk; ids are the FAISS ids so vectors can be deleted per file
+        self.documents = {}
+        # Filename -> {"hash", "ids"} for the content currently in the index
+        self.manifest = {}
+        self.next_id = 0
         self.dimension = 384
-        
+        # True while the FAISS index is a read-only view of a mapped file
+        self.mapped = False
+        self._lock = threading.Lock()
+        self.index_type = index_type
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+    
     def load_knowledge_base(self, kb_dir=None):
         if kb_dir is None:
             kb_dir = KB_DIR
         docs = []
-        for filename in os.listdir(kb_dir):
+        for filename in sorted(os.listdir(kb_dir)):
             if filename.endswith('.txt'):
                 with open(os.path.join(kb_dir, filename), 'r', encoding='utf-8') as f:
                     content = f.read()
@@ -30,44 +85,335 @@ class EmbeddingStore:
     def build_index(self, kb_dir=None):
         if kb_dir is None:
             kb_dir = KB_DIR
-        self.documents = self.load_knowledge_base(kb_dir)
+        files = self.load_knowledge_base(kb_dir)
         
-        if not self.documents:
+        if not files:
             return {"status": "no documents found"}
         
-        texts = [doc['content'] for doc in self.documents]
-        embeddings = self.model.encode(texts)
+        chunks = chunk_documents(files, self.chunk_size, self.chunk_overlap)
+        ids = list(range(len(chunks)))
+        
+        texts = [chunk['content'] for chunk in chunks]
+        embeddings = normalize(self.encode(texts))
+        self.dimension = embeddings.shape[1]
+        
+        index = build_index(embeddings, self.index_type, ids=ids, quantize=self.quantize)
+        vectors = FloatVectors.build(ids, embeddings) if self._keeps_vectors(index) else None
+        lexical = LexicalIndex.build(dict(zip(ids, chunks))) if KB_LEXICAL else None
+        
+        manifest = {doc['filename']: {"hash": content_hash(doc['content']), "ids": []} for doc in files}
+        for chunk_id, chunk in zip(ids, chunks):
+            manifest[chunk['filename']]["ids"].append(chunk_id)
+        
+        with self._lock:
+            self.index = index
+            self.vectors = vectors
+            self.lexical = lexical
+            # Each entry in self.documents is one chunk with its source file and character offsets
+            self.documents = dict(zip(ids, chunks))
+            self.manifest = manifest
+            self.next_id = len(chunks)
+            self.mapped = False
+        
+        return {
+            "status": "indexed",
+            "documents": len(files),
+            "chunks": len(self.documents),
+            "index_type": index_type_of(self.index)
+        }
+    
+    def update_index(self, kb_dir=None):
+        if kb_dir is None:
+            kb_dir = KB_DIR
+        
+        # Indexes saved before the manifest existed (or never built) need one full pass
+        if self.index is None or not self.manifest:
+            return {**self.build_index(kb_dir), "mode": "full"}
+        
+        files = {doc['filename']: doc for doc in self.load_knowledge_base(kb_dir)}
+        hashes = {name: content_hash(doc['content']) for name, doc in files.items()}
+        
+        added = sorted(name for name in files if name not in self.manifest)
+        changed = sorted(name for name in files if name in self.manifest and self.manifest[name]["hash"] != hashes[name])
+        removed = sorted(name for name in self.manifest if name not in files)
+        unchanged = len(files) - len(added) - len(changed)
+        
+        if not files:
+            # Every file was deleted: drop the index instead of keeping an empty one (there is nothing to save)
+            with self._lock:
+                self.index = None
+                self.vectors = None
+                self.lexical = None
+                self.documents = {}
+                self.manifest = {}
+                self.next_id = 0
+                self.mapped = False
+            return {"status": "no documents found", "mode": "incremental", "added": [], "changed": [],
+                    "removed": removed, "unchanged": 0, "embedded_chunks": 0, "chunks": 0, "index_type": None}
+        
+        if not (added or changed or removed):
+            return {"status": "unchanged", "mode": "incremental", "added": [], "changed": [], "removed": [],
+                    "unchanged": unchanged, "embedded_chunks": 0, "chunks": len(self.documents),
+                    "index_type": index_type_of(self.index)}
+        
+        chunks = chunk_documents([files[name] for name in added + changed], self.chunk_size, self.chunk_overlap)
+        stale_ids = [i for name in changed + removed for i in self.manifest[name]["ids"]]
+        
+        # A corpus that outgrew its index type gets rebuilt with the better one
+        projected = len(self.documents) - len(stale_ids) + len(chunks)
+        if projected > 0 and ((self.index_type == "auto" and choose_index_type(projected) != index_type_of(self.index))
+                              or choose_quantization(projected, self.quantize) != quantization_of(self.index)):
+            return {**self.build_index(kb_dir), "mode": "full", "added": added, "changed": changed, "removed": removed}
         
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(np.array(embeddings).astype('float32'))
+        embeddings = normalize(self.encode([chunk['content'] for chunk in chunks])) if chunks else None
         
-        return {"status": "indexed", "documents": len(self.documents)}
+        with self._lock:
+            self._make_writable()
+            if self.vectors is not None:
+                added_ids = list(range(self.next_id, self.next_id + len(chunks)))
+                self.vectors = self.vectors.replace(stale_ids, added_ids, embeddings)
+            if stale_ids:
+                self.index = remove_vectors(self.index, stale_ids, self.vectors)
+                for chunk_id in stale_ids:
+                    self.documents.pop(chunk_id, None)
+            for name in removed:
+                del self.manifest[name]
+            
+            if chunks:
+                ids = list(range(self.next_id, self.next_id + len(chunks)))
+                self.next_id += len(chunks)
+                self.index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+                for name in added + changed:
+                    self.manifest[name] = {"hash": hashes[name], "ids": []}
+                for chunk_id, chunk in zip(ids, chunks):
+                    self.documents[chunk_id] = chunk
+                    self.manifest[chunk['filename']]["ids"].append(chunk_id)
+            documents = dict(self.documents) if KB_LEXICAL else None
+        
+        # Tokenizing is cheap next to embedding, so the BM25 index is rebuilt rather than patched
+        if documents is not None:
+            lexical = LexicalIndex.build(documents)
+            with self._lock:
+                self.lexical = lexical
+        
+        return {
+            "status": "updated",
+            "mode": "incremental",
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unchanged": unchanged,
+            "embedded_chunks": len(chunks),
+            "chunks": len(self.documents),
+            "index_type": index_type_of(self.index)
+        }
+    
+    def _make_writable(self):
+        # Copy-on-write: mapped artifacts are shared and read-only, so edits work on private copies
+        if self.mapped:
+            self.index = writable_copy(self.index)
+            self.mapped = False
+        if isinstance(self.documents, MappedDocuments):
+            self.documents = self.documents.to_dict()
+    
+    def _keeps_vectors(self, index):
+        return KB_RERANK_FACTOR > 0 and quantization_of(index) != "none"
+    
+    def encode(self, texts):
+        # Repeated questions and unchanged chunks are served from the embedding cache
+        if self.cache is None:
+            return self.model.encode(texts)
+        return self.cache.encode(texts, self.model.encode)
+    
+    def encode_queries(self, queries):
+        return normalize(self.encode(queries))
     
     def search(self, query, top_k=2):
         if self.index is None or len(self.documents) == 0:
             return []
+        return self.search_vector(self.encode_queries([query])[0], top_k)
+    
+    def search_vector(self, query_embedding, top_k=2):
+        return [hit['content'] for hit in self.search_with_scores(query_embedding, top_k)]
+    
+    def search_with_scores(self, query_embedding, top_k=2):
+        return self.search_batch(query_embedding.reshape(1, -1), top_k)[0]
+    
+    def search_batch(self, query_embeddings, top_k=2):
+        # One FAISS call for a whole matrix of queries; returns a hit list per query
+        if self.index is None or len(self.documents) == 0:
+            return [[] for _ in range(len(query_embeddings))]
         
-        query_embedding = self.model.encode([query])
-        distances, indices = self.index.search(np.array(query_embedding).astype('float32'), top_k)
-        
-        results = []
-        for idx in indices[0]:
-            if idx < len(self.documents):
-                results.append(self.documents[idx]['content'])
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32')
+        with self._lock:
+            if self.vectors is not None:
+                # Quantized scores only pick candidates; the order comes from exact float scores
+                _, candidates = self.index.search(query_embeddings, top_k * KB_RERANK_FACTOR)
+                scores, indices = rerank(query_embeddings, candidates, self.vectors, top_k)
+            else:
+                scores, indices = self.index.search(query_embeddings, top_k)
+            rows = [[(float(score), int(idx), self.documents.get(int(idx))) for score, idx in zip(row_scores, row_indices)]
+                    for row_scores, row_indices in zip(scores, indices)]
         
-        return results
+        return [[_hit(doc, score, chunk_id) for score, chunk_id, doc in hits if doc is not None] for hits in rows]
+    
+    def lexical_fast_path(self, query, top_k=2):
+        # BM25 hits when the top chunk is a clear lexical match, else None (search_hybrid is needed).
+        # These hits skip the encoder entirely; "score" is BM25 on a 0-1 scale, not cosine similarity.
+        lexical = self.lexical
+        if lexical is None or not KB_LEXICAL_FAST_PATH:
+            return None
+        ranked = lexical.search(query, max(top_k, 2))
+        if not ranked or ranked[0][2] < KB_LEXICAL_MIN_COVERAGE - 1e-6:
+            return None
+        if len(ranked) > 1 and ranked[0][1] < KB_LEXICAL_MARGIN * ranked[1][1]:
+            return None
+        max_score = lexical.max_score(query)
+        with self._lock:
+            docs = [(chunk_id, self.documents.get(chunk_id), score) for chunk_id, score, _ in ranked[:top_k]]
+        return [_hit(doc, score / max_score, chunk_id, "lexical") for chunk_id, doc, score in docs if doc is not None]
+    
+    def with_cosine(self, hits, query_embedding):
+        # Fast-path hits rescored by cosine similarity once the query embedding exists, so routing and
+        # prompt thresholds compare like with like; None if the index cannot reconstruct a chunk
+        cosines = self._cosine(query_embedding, [hit['id'] for hit in hits])
+        if any(cosine is None for cosine in cosines):
+            return None
+        return [{**hit, 'score': cosine} for hit, cosine in zip(hits, cosines)]
+    
+    def search_hybrid(self, query, query_embedding, top_k=2):
+        return self.search_hybrid_batch([query], query_embedding.reshape(1, -1), top_k)[0]
+    
+    def search_hybrid_batch(self, queries, query_embeddings, top_k=2):
+        # Vector and BM25 rankings merged by reciprocal-rank fusion, best fused rank first. "score" stays
+        # cosine similarity, so routing and prompt thresholds mean the same as with vectors only.
+        lexical = self.lexical
+        if lexical is None:
+            return self.search_batch(query_embeddings, top_k)
+        candidates = max(top_k, KB_HYBRID_CANDIDATES)
+        dense_batch = self.search_batch(query_embeddings, candidates)
+        batch = []
+        for query, query_embedding, dense in zip(queries, query_embeddings, dense_batch):
+            ranked = lexical.search(query, candidates)
+            if not ranked:
+                batch.append(dense[:top_k])
+                continue
+            lexical_ids = [chunk_id for chunk_id, _, _ in ranked]
+            fused = reciprocal_rank_fusion([[hit['id'] for hit in dense], lexical_ids], KB_RRF_K)[:top_k]
+            by_id = {hit['id']: hit for hit in dense}
+            lexical_only = [chunk_id for chunk_id, _ in fused if chunk_id not in by_id]
+            if lexical_only:
+                cosines = self._cosine(query_embedding, lexical_only)
+                with self._lock:
+                    for chunk_id, cosine in zip(lexical_only, cosines):
+                        doc = self.documents.get(chunk_id)
+                        if doc is not None:
+                            # Below every vector candidate when the index cannot return the vector
+                            score = cosine if cosine is not None else (dense[-1]['score'] if dense else 0.0)
+                            by_id[chunk_id] = _hit(doc, score, chunk_id, "lexical")
+            lexical_ids = set(lexical_ids)
+            hits = []
+            for chunk_id, _ in fused:
+                hit = by_id.get(chunk_id)
+                if hit is not None:
+                    if hit['retrieval'] == "dense" and chunk_id in lexical_ids:
+                        hit['retrieval'] = "hybrid"
+                    hits.append(hit)
+            batch.append(hits)
+        return batch
+    
+    def _cosine(self, query_embedding, chunk_ids):
+        # Cosine similarity of chunks the vector search did not return; None where the index cannot
+        # reconstruct stored vectors (IVF without a direct map)
+        scores = []
+        with self._lock:
+            if self.vectors is not None:
+                return [float(score) for score in self.vectors.get(chunk_ids) @ query_embedding]
+            for chunk_id in chunk_ids:
+                try:
+                    vector = self.index.reconstruct(int(chunk_id))
+                    scores.append(float(np.dot(vector, query_embedding)))
+                except RuntimeError:
+                    scores.append(None)
+        return scores
     
     def save(self, save_dir=None):
         if save_dir is None:
             save_dir = MODELS_DIR
+        save_dir = Path(save_dir)
         os.makedirs(save_dir, exist_ok=True)
-        faiss.write_index(self.index, str(save_dir / "faiss_index.bin"))
-        with open(save_dir / "documents.pkl", 'wb') as f:
-            pickle.dump(self.documents, f)
+        with self._lock:
+            faiss.write_index(self.index, str(save_dir / "faiss_index.bin"))
+            chunks = write_chunks(save_dir, self.documents)
+            lexical = {"lexical": self.lexical.save(save_dir)} if self.lexical is not None else {}
+            vectors = {"vectors": self.vectors.save(save_dir)} if self.vectors is not None else {}
+            write_manifest(save_dir, STORE_MANIFEST, {
+                "model_name": self.model_name,
+                "encoder": EMBED_BACKEND,
+                "dimension": self.dimension,
+                "index_type": index_type_of(self.index),
+                "quantization": quantization_of(self.index),
+                "index": "faiss_index.bin",
+                "count": len(self.documents),
+                **chunks,
+                **lexical,
+                **vectors
+            })
+            with open(save_dir / "kb_manifest.json", 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "next_id": self.next_id, "files": self.manifest}, f, indent=2)
     
-    def load(self, save_dir=None):
+    def load(self, save_dir=None, mmap=KB_MMAP):
         if save_dir is None:
             save_dir = MODELS_DIR
-        self.index = faiss.read_index(str(save_dir / "faiss_index.bin"))
-        with open(save_dir / "documents.pkl", 'rb') as f:
-            self.documents = pickle.load(f)
+        save_dir = Path(save_dir)
+        index = read_index(save_dir / "faiss_index.bin", mmap=mmap)
+        # Saves from before cosine similarity (IndexFlatL2, no kb_manifest.json) score by squared L2
+        # distance, where lower is closer; served as similarities they would pick the worst chunks.
+        # Raising makes the startup registry rebuild the store instead.
+        if index.metric_type != faiss.METRIC_INNER_PRODUCT or not (save_dir / "kb_manifest.json").exists():
+            raise ValueError(f"Embeddings in {save_dir} predate cosine similarity search; rebuild the knowledge base")
+        self.index = index
+        self.mapped = mmap
+        self.dimension = self.index.d
+        self.lexical = None
+        self.vectors = None
+        if (save_dir / STORE_MANIFEST).exists():
+            store_manifest = read_manifest(save_dir, STORE_MANIFEST)
+            self.documents = MappedDocuments(save_dir, store_manifest, mapped=mmap)
+            if KB_LEXICAL and "lexical" in store_manifest:
+                self.lexical = LexicalIndex.load(save_dir, store_manifest["lexical"], mapped=mmap)
+            if KB_RERANK_FACTOR > 0 and "vectors" in store_manifest:
+                self.vectors = FloatVectors.load(save_dir, store_manifest["vectors"], mapped=mmap)
+            if store_manifest.get("encoder", "torch") != EMBED_BACKEND:
+                # Queries still match (int8 and float vectors of one model are near-identical), but a
+                # rebuild puts chunks and queries back on the same runtime
+                print(f"[WARN] Index was embedded with EMBED_BACKEND={store_manifest.get('encoder', 'torch')}, "
+                      f"serving with {EMBED_BACKEND}; rebuild the knowledge base to match")
+        else:
+            # Saves from before store.json pickled the chunks
+            with open(save_dir / "documents.pkl", 'rb') as f:
+                documents = pickle.load(f)
+            # Older saves stored a list whose positions were the FAISS ids
+            self.documents = dict(enumerate(documents)) if isinstance(documents, list) else documents
+        
+        with open(save_dir / "kb_manifest.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.manifest = data["files"]
+        self.next_id = data["next_id"]
+        
+        if KB_LEXICAL and self.lexical is None and len(self.documents):
+            # Saved before the BM25 index existed; built from the chunk text, persisted on the next save
+            self.lexical = LexicalIndex.build(dict(self.documents.items()))
+            print(f"[INFO] Built BM25 index for {len(self.lexical)} chunks saved without one")
+
+
+def _hit(doc, score, chunk_id=None, retrieval="dense"):
+    return {
+        "id": chunk_id,
+        "content": doc['content'],
+        "filename": doc.get('filename'),
+        "start": doc.get('start', 0),
+        "end": doc.get('end', len(doc['content'])),
+        "score": score,
+        "retrieval": retrieval
+    }
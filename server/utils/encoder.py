@@ -0,0 +1,54 @@
+import os
+from importlib import metadata
+
+# Sentence encoder runtime: "torch" (float32), "int8" (torch dynamic int8 quantization of the Linear
+# layers, no extra packages) or "onnx" (ONNX Runtime with a quantized export; needs
+# `pip install -r requirements-onnx.txt`)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+# Intra-op threads for the encoder; 0 keeps the runtime default (one per core)
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+# Model file for the onnx backend; the sentence-transformers hub models ship int8 exports per CPU family
+# (model_qint8_avx512_vnni.onnx, model_qint8_avx2.onnx, model_qint8_arm64.onnx)
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE", "onnx/model_qint8_avx2.onnx")
+
+BACKENDS = ("torch", "int8", "onnx")
+# First sentence-transformers release with SentenceTransformer(backend=...)
+ONNX_MIN_VERSION = (3, 2)
+
+
+def encoder_key(model_name, backend=EMBED_BACKEND):
+    # Embedding cache namespace: quantized runtimes produce slightly different vectors, so they never
+    # share cached embeddings with the float model
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+def load_encoder(model_name, backend=EMBED_BACKEND, threads=EMBED_THREADS):
+    # Imported here so the server can bind its port before torch is loaded
+    from sentence_transformers import SentenceTransformer
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBED_BACKEND '{backend}', expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        installed = metadata.version("sentence-transformers")
+        if tuple(int(part) for part in installed.split(".")[:2]) < ONNX_MIN_VERSION:
+            raise RuntimeError(f"EMBED_BACKEND=onnx needs sentence-transformers>=3.2, found {installed}; "
+                               f"run pip install -r requirements-onnx.txt")
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("EMBED_BACKEND=onnx needs ONNX Runtime; run pip install -r requirements-onnx.txt")
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        return SentenceTransformer(model_name, device="cpu", backend="onnx",
+                                   model_kwargs={"file_name": EMBED_ONNX_FILE, "provider": "CPUExecutionProvider",
+                                                 "session_options": options})
+
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    # Weights of every Linear layer to int8, activations quantized on the fly; CPU only
+    model = SentenceTransformer(model_name, device="cpu")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
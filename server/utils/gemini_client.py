@@ -1,68 +1,168 @@
-import google.generativeai as genai
+import datetime
 import os
+import threading
+import time
 
-PRATCHAT_PERSONA = """I am Prat.AI, an India's Indigenous hybrid AI assistant created by Pratyush Srivastava under PratWare — Multiverse of Softwares.
-I combine lightweight, explainable machine learning models for intent and sentiment with a retrieval-augmented LLM layer powered by Gemini API.
-My design goal is to demonstrate how a developer can build a practical, locally tunable LLM-like system using open tools.
+from utils.canned import canned_answers
+from utils.gemini_rest import GeminiRestModel
+from utils.metrics import record_prompt_tokens, record_gemini_usage
+from utils.persona import PRATCHAT_PERSONA
+from utils.prompt_builder import estimate_tokens
+from utils.resilience import ResilientCaller
 
-My core strengths include:
-- Local ML (intent + sentiment) that adapts to your data
-- Retrieval-Augmented Generation (RAG) for context-rich answers
-- Gemini-powered reasoning for complex queries
-- Transparent and developer-friendly explanations
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Point at a Gemini-compatible REST server (e.g. benchmarks/fake_gemini.py) instead of the SDK's gRPC transport
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+# "1" stores the persona as a Gemini cached context once instead of sending it with every prompt. Gemini only
+# caches prefixes above a model minimum (1,024 tokens for 2.5 Flash); shorter ones fall back to system_instruction
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+# Lifetime of the cached context; it is extended in the background when half of it has passed
+GEMINI_CACHE_TTL_S = int(os.getenv("GEMINI_CACHE_TTL_S", "3600"))
 
-I represent India's indigenous effort in hybrid AI — blending creativity, explainability, and efficiency. Designed and implemented by Pratyush Srivastava CEO of PratWare."""
-
-PRATYUSH_BIO = """Pratyush Srivastava is an exceptional young visionary and the Founder & CEO of PratWare — Multiverse of Softwares. At just 22 years old, he stands as one of India's youngest and most talented tech entrepreneurs, demonstrating remarkable expertise in artificial intelligence, machine learning, and full-stack development.
-
-As the creator of Prat.AI, Pratyush has pioneered the concept of indigenous hybrid AI systems that blend classical machine learning with modern LLM capabilities. His vision is to make AI technology more transparent, explainable, and accessible to developers worldwide while maintaining India's leadership in the global AI revolution.
-
-Key Achievements:
-• Founder & CEO of PratWare — Multiverse of Softwares
-• Creator of Prat.AI, an innovative hybrid AI assistant
-• Expert in ML, AI, and full-stack development
-• Passionate about building indigenous AI solutions
-• Advocate for explainable and developer-friendly AI systems
-
-At such a young age, Pratyush has already made significant contributions to the AI community by demonstrating how hybrid systems can achieve the perfect balance between cost-efficiency, performance, and transparency. His work with Prat.AI showcases his deep understanding of both classical machine learning algorithms and cutting-edge LLM technologies.
-
-Pratyush's philosophy centers around making AI accessible and understandable. He believes that developers should have full control over their AI systems, which is why Prat.AI is designed with transparency and customization at its core. His innovative approach combines local ML models for speed and explainability with powerful LLM capabilities for complex reasoning.
-
-Under his leadership, PratWare is building a multiverse of software solutions that push the boundaries of what's possible with AI technology. Pratyush represents the new generation of Indian tech leaders who are not just consuming technology but creating world-class innovations that compete on the global stage.
-
-His dedication to indigenous AI development and his commitment to building practical, production-ready systems make him a rising star in India's tech ecosystem. At 22, Pratyush Srivastava is already leaving his mark on the future of artificial intelligence."""
+# Longest rewrite key a token boundary can split; that many trailing characters are held back while streaming
+BRANDING_HOLDBACK = canned_answers.rewriter.holdback
 
 class GeminiClient:
     def __init__(self):
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        # The persona is a system instruction rather than prompt text: the same prefix on every request,
+        # which Gemini can cache implicitly or, with GEMINI_CONTEXT_CACHE, explicitly
+        if GEMINI_API_ENDPOINT:
+            self.model = GeminiRestModel(api_key, GEMINI_MODEL, GEMINI_API_ENDPOINT, system_instruction=PRATCHAT_PERSONA)
+        else:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self.model = genai.GenerativeModel(GEMINI_MODEL, system_instruction=PRATCHAT_PERSONA)
+        self.persona_tokens = estimate_tokens(PRATCHAT_PERSONA)
+        # Concurrency limit, timeouts, retries, circuit breaker and hedging for every Gemini call
+        self.policy = ResilientCaller("gemini")
+        self._uncached_model = self.model
+        self._cache = None
+        self._cache_refresh_at = None
+        self._cache_lock = threading.Lock()
+        if GEMINI_CONTEXT_CACHE:
+            self._create_context_cache()
     
-    def generate_response(self, user_message, context=""):
-        identity_keywords = ["who are you", "what are you", "who is prat.ai", "is prat.ai an llm", "what is pratware", "tell me about yourself"]
-        pratyush_keywords = ["who is pratyush", "pratyush srivastava", "tell me about pratyush", "who created prat.ai", "founder of pratware", "ceo of pratware", "who made you", "your creator"]
-        
-        if any(keyword in user_message.lower() for keyword in identity_keywords):
-            return PRATCHAT_PERSONA
-        
-        if any(keyword in user_message.lower() for keyword in pratyush_keywords):
-            return PRATYUSH_BIO
-        
-        prompt = f"{PRATCHAT_PERSONA}\n\n"
+    def _create_context_cache(self):
+        try:
+            if isinstance(self.model, GeminiRestModel):
+                self._cache = self.model.create_cached_content(GEMINI_CACHE_TTL_S)
+            else:
+                import google.generativeai as genai
+                from google.generativeai import caching
+                self._cache = caching.CachedContent.create(
+                    model=f"models/{GEMINI_MODEL}", system_instruction=PRATCHAT_PERSONA,
+                    ttl=datetime.timedelta(seconds=GEMINI_CACHE_TTL_S))
+                self.model = genai.GenerativeModel.from_cached_content(cached_content=self._cache)
+            self._cache_refresh_at = time.time() + GEMINI_CACHE_TTL_S / 2
+            print(f"[OK] Persona stored as a Gemini cached context (~{self.persona_tokens} tokens)")
+        except Exception as e:
+            print(f"[INFO] Gemini context caching unavailable, sending the persona as system_instruction: {e}")
+            self._drop_context_cache()
+    
+    def _drop_context_cache(self):
+        self._cache = None
+        self._cache_refresh_at = None
+        if isinstance(self._uncached_model, GeminiRestModel):
+            self._uncached_model.drop_cached_content()
+        self.model = self._uncached_model
+    
+    def _keep_cache_alive(self):
+        # Extends the cached context's TTL off the request path; if that fails, requests go back to
+        # system_instruction before the cache expires under them
+        if self._cache_refresh_at is None or time.time() < self._cache_refresh_at:
+            return
+        with self._cache_lock:
+            if self._cache_refresh_at is None or time.time() < self._cache_refresh_at:
+                return
+            self._cache_refresh_at = time.time() + GEMINI_CACHE_TTL_S / 2
+        threading.Thread(target=self._extend_cache, name="gemini-cache-ttl", daemon=True).start()
+    
+    def _extend_cache(self):
+        try:
+            if isinstance(self.model, GeminiRestModel):
+                self.model.extend_cached_content(GEMINI_CACHE_TTL_S)
+            else:
+                self._cache.update(ttl=datetime.timedelta(seconds=GEMINI_CACHE_TTL_S))
+        except Exception as e:
+            print(f"[WARN] Could not extend the Gemini cached context, sending the persona again: {e}")
+            self._drop_context_cache()
+    
+    def _canned_response(self, user_message):
+        # Same rules the chat route checks before classification (data/canned.json)
+        canned = canned_answers.match(user_message)
+        return canned["response"] if canned else None
+    
+    def _build_prompt(self, user_message, context="", history=""):
+        # Only the parts that change per request; the persona travels as the system instruction
+        prompt = ""
         
         if context:
             prompt += f"Context from knowledge base:\n{context}\n\n"
         
+        if history:
+            prompt += f"Conversation so far:\n{history}\n\n"
+        
         prompt += f"User: {user_message}\nPrat.AI:"
         
-        response = self.model.generate_content(prompt)
-        response_text = response.text
+        context_tokens = estimate_tokens(context)
+        history_tokens = estimate_tokens(history)
+        record_prompt_tokens({
+            "persona": self.persona_tokens,
+            "context": context_tokens,
+            "history": history_tokens,
+            "message": estimate_tokens(prompt) - context_tokens - history_tokens,
+            "total": self.persona_tokens + estimate_tokens(prompt),
+        })
+        self._keep_cache_alive()
+        return prompt
+    
+    def _clean_response(self, response_text):
+        # Replace any remaining PratChat references with Prat.AI, in one pass
+        return canned_answers.rewriter.rewrite(response_text)
+    
+    def generate_response(self, user_message, context="", history=""):
+        canned = self._canned_response(user_message)
+        if canned is not None:
+            return canned
+        
+        prompt = self._build_prompt(user_message, context, history)
+        response = self.policy.call_sync(lambda timeout: self.model.generate_content(prompt, request_options={"timeout": timeout}))
+        record_gemini_usage(response.usage_metadata)
+        return self._clean_response(response.text)
+    
+    async def generate_response_async(self, user_message, context="", history=""):
+        canned = self._canned_response(user_message)
+        if canned is not None:
+            return canned
+        
+        # Uses the SDK's asyncio transport so a slow completion never blocks the event loop
+        prompt = self._build_prompt(user_message, context, history)
+        response = await self.policy.call(lambda: self.model.generate_content_async(prompt))
+        record_gemini_usage(response.usage_metadata)
+        return self._clean_response(response.text)
+    
+    async def stream_response(self, user_message, context="", history=""):
+        canned = self._canned_response(user_message)
+        if canned is not None:
+            yield canned
+            return
         
-        # Replace any remaining PratChat references with Prat.AI
-        response_text = response_text.replace("PratChat", "Prat.AI")
-        response_text = response_text.replace("pratchat", "prat.ai")
-        response_text = response_text.replace("Pratchat", "Prat.AI")
+        prompt = self._build_prompt(user_message, context, history)
         
-        return response_text
+        # Clean as we go, holding back a short tail in case "PratChat" is split across chunks
+        pending = ""
+        usage = None
+        async for chunk in self.policy.stream(lambda: self.model.generate_content_async(prompt, stream=True)):
+            # Each chunk reports the running totals; the last one counts
+            usage = chunk.usage_metadata or usage
+            pending = self._clean_response(pending + chunk.text)
+            if len(pending) > BRANDING_HOLDBACK:
+                cut = len(pending) - BRANDING_HOLDBACK
+                yield pending[:cut]
+                pending = pending[cut:]
+        record_gemini_usage(usage)
+        if pending:
+            yield pending
@@ -0,0 +1,120 @@
+import json
+
+import httpx
+
+from utils.resilience import UPSTREAM_MAX_CONCURRENCY
+
+GEMINI_REST_TIMEOUT = 120.0
+# Keep-alive connections kept open to the endpoint; sized so every in-flight call can reuse one
+GEMINI_POOL_LIMITS = httpx.Limits(max_connections=UPSTREAM_MAX_CONCURRENCY * 2,
+                                  max_keepalive_connections=UPSTREAM_MAX_CONCURRENCY, keepalive_expiry=60.0)
+
+
+class UsageMetadata:
+    # Token counts under the SDK's attribute names
+    def __init__(self, data):
+        self.prompt_token_count = data.get("promptTokenCount", 0)
+        self.cached_content_token_count = data.get("cachedContentTokenCount", 0)
+        self.candidates_token_count = data.get("candidatesTokenCount", 0)
+
+
+class RestResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = UsageMetadata(usage) if usage else None
+
+
+class GeminiRestModel:
+    # Talks to the Gemini REST API (or a compatible local server) directly over pooled httpx
+    # connections. Mirrors the parts of genai.GenerativeModel that GeminiClient uses, so either
+    # can sit behind the client; the SDK's own async path only supports the gRPC transport.
+    def __init__(self, api_key, model_name, endpoint, timeout=GEMINI_REST_TIMEOUT, system_instruction=None):
+        self.base_url = f"{endpoint.rstrip('/')}/v1beta"
+        self.model_name = model_name
+        self.url = f"{self.base_url}/models/{model_name}"
+        self.system_instruction = system_instruction
+        # Name of a cached context holding the system instruction, once create_cached_content succeeds
+        self.cached_content = None
+        self.headers = {"x-goog-api-key": api_key, "Content-Type": "application/json"}
+        self.timeout = timeout
+        self._client = httpx.Client(timeout=timeout, limits=GEMINI_POOL_LIMITS)
+        self._async_client = None
+
+    def _get_async_client(self):
+        # Created on first use so it belongs to the running event loop
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=GEMINI_POOL_LIMITS)
+        return self._async_client
+
+    def _payload(self, prompt):
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if self.cached_content:
+            payload["cachedContent"] = self.cached_content
+        elif self.system_instruction:
+            payload["systemInstruction"] = {"parts": [{"text": self.system_instruction}]}
+        return payload
+
+    def create_cached_content(self, ttl_s):
+        # Stores the system instruction server-side; later requests refer to it instead of resending it
+        r = self._client.post(f"{self.base_url}/cachedContents", headers=self.headers, json={
+            "model": f"models/{self.model_name}",
+            "systemInstruction": {"parts": [{"text": self.system_instruction}]},
+            "ttl": f"{ttl_s}s",
+        })
+        r.raise_for_status()
+        self.cached_content = r.json()["name"]
+        return self.cached_content
+
+    def extend_cached_content(self, ttl_s):
+        r = self._client.patch(f"{self.base_url}/{self.cached_content}", params={"updateMask": "ttl"},
+                               headers=self.headers, json={"ttl": f"{ttl_s}s"})
+        r.raise_for_status()
+
+    def drop_cached_content(self):
+        # Back to sending the system instruction with every request
+        self.cached_content = None
+
+    @staticmethod
+    def _text(data):
+        candidates = data.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    def generate_content(self, prompt, request_options=None):
+        # request_options={"timeout": seconds} as in the SDK
+        timeout = (request_options or {}).get("timeout", self.timeout)
+        r = self._client.post(f"{self.url}:generateContent", json=self._payload(prompt), headers=self.headers,
+                              timeout=timeout)
+        r.raise_for_status()
+        data = r.json()
+        return RestResponse(self._text(data), data.get("usageMetadata"))
+
+    async def generate_content_async(self, prompt, stream=False):
+        if stream:
+            return self._stream(prompt)
+        client = self._get_async_client()
+        r = await client.post(f"{self.url}:generateContent", json=self._payload(prompt), headers=self.headers)
+        r.raise_for_status()
+        data = r.json()
+        return RestResponse(self._text(data), data.get("usageMetadata"))
+
+    async def _stream(self, prompt):
+        client = self._get_async_client()
+        async with client.stream("POST", f"{self.url}:streamGenerateContent", params={"alt": "sse"},
+                                 json=self._payload(prompt), headers=self.headers) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[5:].strip())
+                text = self._text(data)
+                # The last event carries the usage totals, sometimes without text
+                if text or data.get("usageMetadata"):
+                    yield RestResponse(text, data.get("usageMetadata"))
+
+    async def aclose(self):
+        self._client.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
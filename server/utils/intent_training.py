@@ -0,0 +1,349 @@
+import json
+import os
+import random
+import time
+import zlib
+
+import numpy as np
+
+from utils import artifacts
+from utils.database import connect
+from utils.ml_model import IntentClassifier, DATA_DIR
+
+# Rows per training chunk; memory use is bounded by this, not by the dataset size
+INTENT_TRAIN_CHUNK = int(os.getenv("INTENT_TRAIN_CHUNK", "5000"))
+# Passes of partial_fit over the streamed data
+INTENT_TRAIN_EPOCHS = int(os.getenv("INTENT_TRAIN_EPOCHS", "10"))
+# Hashed feature space; no vocabulary is built, so it does not grow with the data
+INTENT_HASH_FEATURES = int(os.getenv("INTENT_HASH_FEATURES", str(2 ** 17)))
+# Share of rows held out for evaluation, chosen by a hash of the text so every pass agrees
+INTENT_EVAL_FRACTION = float(os.getenv("INTENT_EVAL_FRACTION", "0.2"))
+# Most rows kept for the held-out set and for the hyperparameter search sample
+INTENT_EVAL_MAX = int(os.getenv("INTENT_EVAL_MAX", "20000"))
+INTENT_SEARCH_SAMPLE = int(os.getenv("INTENT_SEARCH_SAMPLE", "20000"))
+# Cross-validation folds and parallel jobs (-1: every core) for the hyperparameter search
+INTENT_CV_FOLDS = int(os.getenv("INTENT_CV_FOLDS", "5"))
+INTENT_SEARCH_JOBS = int(os.getenv("INTENT_SEARCH_JOBS", "-1"))
+# Logged messages become training rows only when the classifier labelled them at least this confidently
+INTENT_LOG_MIN_CONFIDENCE = float(os.getenv("INTENT_LOG_MIN_CONFIDENCE", "0.8"))
+# A candidate is promoted only if its held-out macro F1 is at least the baseline's plus this (the
+# baseline is the serving model's recipe retrained on the candidate's training rows)
+INTENT_PROMOTE_MARGIN = float(os.getenv("INTENT_PROMOTE_MARGIN", "0.0"))
+
+SEARCH_GRID = {
+    "clf__alpha": [1e-5, 1e-4, 1e-3],
+    "vec__ngram_range": [(1, 1), (1, 2)],
+    "clf__class_weight": [None, "balanced"],
+}
+DEFAULT_PARAMS = {"clf__alpha": 1e-4, "vec__ngram_range": (1, 2), "clf__class_weight": None}
+REPORT_FILE = "report.json"
+
+
+def intents_rows(path=None):
+    # (text, intent) for every pattern of data/intents.json
+    path = path or DATA_DIR / "intents.json"
+    with open(path, 'r', encoding='utf-8') as f:
+        for intent in json.load(f)['intents']:
+            for pattern in intent['patterns']:
+                yield pattern, intent['tag']
+
+
+def jsonl_rows(path):
+    # Labelled datasets as JSON lines: {"text" (or "message"): ..., "intent": ...}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                text = record.get("text", record.get("message"))
+                if text and record.get("intent"):
+                    yield text, record["intent"]
+
+
+def conversation_rows(db_path=None, min_confidence=INTENT_LOG_MIN_CONFIDENCE, batch=INTENT_TRAIN_CHUNK):
+    # Logged user messages with the intent they were served under; self-labelled, hence the confidence floor
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute("SELECT user_message, intent FROM conversations WHERE intent IS NOT NULL AND confidence >= ?",
+                              (min_confidence,))
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def is_holdout(text, fraction=INTENT_EVAL_FRACTION):
+    # Deterministic, so repeated passes and duplicate messages always land on the same side
+    return zlib.crc32(text.lower().encode('utf-8')) % 1000 < fraction * 1000
+
+
+def _chunks(rows, size):
+    texts, labels = [], []
+    for text, label in rows:
+        texts.append(text.lower())
+        labels.append(label)
+        if len(texts) >= size:
+            yield texts, labels
+            texts, labels = [], []
+    if texts:
+        yield texts, labels
+
+
+def _reservoir_add(sample, row, seen, limit, rng):
+    if len(sample) < limit:
+        sample.append(row)
+    else:
+        slot = rng.randrange(seen)
+        if slot < limit:
+            sample[slot] = row
+
+
+class IntentTrainer:
+    # Streams labelled rows from any number of sources (callables returning (text, intent) iterators,
+    # re-invoked once per pass) into a HashingVectorizer + SGDClassifier trained with partial_fit, so the
+    # dataset never has to fit in memory. Pass 0 collects the classes, the held-out rows and a sample
+    # for a cross-validated hyperparameter search; the candidate is evaluated against a baseline
+    # trained on the same rows, and the winner is refitted on every row before it is published.
+    def __init__(self, sources, epochs=INTENT_TRAIN_EPOCHS, chunk_size=INTENT_TRAIN_CHUNK,
+                 n_features=INTENT_HASH_FEATURES, search=True, search_jobs=INTENT_SEARCH_JOBS, seed=0):
+        self.sources = sources
+        self.epochs = epochs
+        self.chunk_size = chunk_size
+        self.n_features = n_features
+        self.search = search
+        self.search_jobs = search_jobs
+        self.rng = random.Random(seed)
+        self.seed = seed
+
+    def _rows(self, holdout=False):
+        # Training rows only, or every row (holdout=True) for the final refit
+        for source in self.sources:
+            for text, label in source():
+                if holdout or not is_holdout(text):
+                    yield text, label
+
+    def scan(self):
+        # Pass 0: class counts (training rows and all rows), held-out rows and a uniform sample of
+        # training rows for the search
+        counts, all_counts, holdout, sample = {}, {}, [], []
+        seen_train = seen_holdout = 0
+        for source in self.sources:
+            for text, label in source():
+                all_counts[label] = all_counts.get(label, 0) + 1
+                if is_holdout(text):
+                    seen_holdout += 1
+                    _reservoir_add(holdout, (text, label), seen_holdout, INTENT_EVAL_MAX, self.rng)
+                else:
+                    counts[label] = counts.get(label, 0) + 1
+                    seen_train += 1
+                    _reservoir_add(sample, (text.lower(), label), seen_train, INTENT_SEARCH_SAMPLE, self.rng)
+        self.all_counts = all_counts
+        return counts, holdout, sample
+
+    def _pipeline(self):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.pipeline import Pipeline
+        return Pipeline([
+            ("vec", HashingVectorizer(n_features=self.n_features, alternate_sign=False)),
+            ("clf", SGDClassifier(loss="log_loss", random_state=self.seed)),
+        ])
+
+    def search_params(self, sample):
+        # Grid search on the sample; classes with too few rows to split are left to the streamed fit
+        from sklearn.model_selection import GridSearchCV, StratifiedKFold
+        counts = {}
+        for _, label in sample:
+            counts[label] = counts.get(label, 0) + 1
+        folds = min([INTENT_CV_FOLDS] + [n for n in counts.values() if n >= 2])
+        sample = [(text, label) for text, label in sample if counts[label] >= folds]
+        if folds < 2 or len({label for _, label in sample}) < 2:
+            return DEFAULT_PARAMS, None
+        search = GridSearchCV(self._pipeline(), SEARCH_GRID, scoring="f1_macro", n_jobs=self.search_jobs,
+                              cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=self.seed))
+        search.fit([text for text, _ in sample], [label for _, label in sample])
+        return search.best_params_, {"folds": folds, "rows": len(sample), "best_cv_f1_macro": round(float(search.best_score_), 4),
+                                     "candidates": len(search.cv_results_["params"])}
+
+    def fit(self, classes, counts, params, holdout=False):
+        from sklearn.linear_model import SGDClassifier
+        pipeline = self._pipeline().set_params(**params)
+        vectorizer = pipeline.named_steps["vec"]
+        class_weight = params.get("clf__class_weight")
+        if class_weight == "balanced":
+            # partial_fit cannot compute "balanced" itself; same formula from the pass-0 counts
+            total = sum(counts.values())
+            class_weight = {label: total / (len(classes) * counts[label]) for label in classes}
+        classifier = SGDClassifier(loss="log_loss", alpha=params["clf__alpha"], class_weight=class_weight,
+                                   random_state=self.seed)
+        rng = np.random.default_rng(self.seed)
+        for _ in range(self.epochs):
+            for texts, labels in _chunks(self._rows(holdout), self.chunk_size):
+                order = rng.permutation(len(texts))
+                X = vectorizer.transform([texts[i] for i in order])
+                classifier.partial_fit(X, np.asarray(labels)[order], classes=classes)
+        # Column-major, the layout a loaded model gets (see IntentClassifier.save)
+        classifier.coef_ = np.asfortranarray(classifier.coef_)
+        return vectorizer, classifier
+
+    def train(self, intent_responses):
+        started = time.perf_counter()
+        counts, holdout, sample = self.scan()
+        if len(counts) < 2:
+            raise ValueError(f"Need at least two intents to train, found {len(counts)}")
+        classes = np.asarray(sorted(counts))
+        if self.search:
+            params, search = self.search_params(sample)
+        else:
+            params, search = DEFAULT_PARAMS, None
+        self.params = params
+        model = _model(*self.fit(classes, counts, params), intent_responses)
+        return model, holdout, {
+            "train_rows": sum(counts.values()),
+            "holdout_rows": len(holdout),
+            "class_counts": counts,
+            "params": {name: list(value) if isinstance(value, tuple) else value for name, value in params.items()},
+            "search": search,
+            "epochs": self.epochs,
+            "train_s": round(time.perf_counter() - started, 2),
+        }
+
+    def refit_all(self, intent_responses):
+        # The promoted model: the candidate's parameters fitted on every row, held-out ones included,
+        # so intents with few examples are not left to the ones the split happened to keep
+        classes = np.asarray(sorted(self.all_counts))
+        return _model(*self.fit(classes, self.all_counts, self.params, holdout=True), intent_responses)
+
+    def baseline(self, current, counts, intent_responses):
+        # The serving model's recipe retrained on the candidate's training rows, so neither model has
+        # seen the held-out rows. The serving model itself may have been trained on them.
+        from sklearn.feature_extraction.text import HashingVectorizer
+        if isinstance(current.vectorizer, HashingVectorizer):
+            params = serving_params(current.version)
+            return _model(*self.fit(np.asarray(sorted(counts)), counts, params), intent_responses)
+        # TF-IDF models fit in memory (as IntentClassifier.train always has)
+        rows = list(self._rows())
+        model = IntentClassifier()
+        model.fit([text for text, _ in rows], [label for _, label in rows])
+        model.intent_responses = intent_responses
+        return model
+
+
+def _model(vectorizer, classifier, intent_responses):
+    model = IntentClassifier()
+    model.vectorizer = vectorizer
+    model.classifier = classifier
+    model.intent_labels = [str(c) for c in classifier.classes_]
+    model.intent_responses = intent_responses
+    return model
+
+
+def serving_params(version):
+    # Parameters a published hashing model was trained with (from its report), else the defaults
+    try:
+        with open(artifacts.version_dir("intent", version) / REPORT_FILE, 'r', encoding='utf-8') as f:
+            params = json.load(f)["training"]["params"]
+    except (OSError, KeyError, TypeError, ValueError):
+        return DEFAULT_PARAMS
+    return {name: tuple(value) if isinstance(value, list) else value for name, value in params.items()}
+
+
+def evaluate(model, holdout, batch_size=64):
+    # Accuracy, per-intent precision/recall/F1 and predict latency on the held-out rows
+    from sklearn.metrics import accuracy_score, classification_report, f1_score
+    texts = [text for text, _ in holdout]
+    truth = [label for _, label in holdout]
+    predicted = [result["intent"] for result in model.predict_batch(texts)] if texts else []
+
+    single = []
+    for text in texts[:200]:
+        t0 = time.perf_counter()
+        model.predict(text)
+        single.append((time.perf_counter() - t0) * 1e6)
+    single.sort()
+    t0 = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        model.predict_batch(texts[start:start + batch_size])
+    batch_s = time.perf_counter() - t0
+
+    if not texts:
+        return {"rows": 0}
+    report = classification_report(truth, predicted, output_dict=True, zero_division=0)
+    return {
+        "rows": len(texts),
+        "accuracy": round(accuracy_score(truth, predicted), 4),
+        "f1_macro": round(f1_score(truth, predicted, average="macro", zero_division=0), 4),
+        "per_intent": {label: {"precision": round(r["precision"], 4), "recall": round(r["recall"], 4),
+                               "f1": round(r["f1-score"], 4), "support": int(r["support"])}
+                       for label, r in report.items() if isinstance(r, dict) and label not in ("macro avg", "weighted avg")},
+        "predict_p50_us": round(single[len(single) // 2], 1),
+        "predict_p95_us": round(single[min(len(single) - 1, int(len(single) * 0.95))], 1),
+        f"batch{batch_size}_rows_per_s": round(len(texts) / batch_s, 1) if batch_s > 0 else None,
+    }
+
+
+def default_sources(datasets=(), from_log=False, db_path=None, min_confidence=INTENT_LOG_MIN_CONFIDENCE):
+    sources = [intents_rows]
+    sources += [lambda path=path: jsonl_rows(path) for path in datasets]
+    if from_log:
+        sources.append(lambda: conversation_rows(db_path, min_confidence))
+    return sources
+
+
+def retrain(publish=True):
+    # Plain retrain on every pattern of data/intents.json, published without a gate: a few patterns per
+    # intent cannot spare a held-out set. Cold starts and /api/train without extra data both come here.
+    model = IntentClassifier()
+    result = model.train()
+    if publish:
+        model.version = artifacts.publish("intent", model.save)
+    return model, result
+
+
+def train_and_promote(sources=None, promote=True, force=False, margin=INTENT_PROMOTE_MARGIN, **trainer_options):
+    # Trains a candidate on the training split and a baseline (the serving model's recipe) on the same
+    # rows, scores both on the held-out rows, and publishes the candidate refitted on every row when its
+    # macro F1 is at least the baseline's plus `margin` (or nothing is serving yet)
+    intent_responses = {intent['tag']: intent['responses'] for intent in IntentClassifier().load_intents()}
+    trainer = IntentTrainer(sources or default_sources(), **trainer_options)
+    candidate, holdout, training = trainer.train(intent_responses)
+    report = {"training": training, "candidate": evaluate(candidate, holdout)}
+
+    new_intents = []
+    try:
+        current = artifacts.load_intent_classifier()
+    except Exception as e:
+        print(f"[INFO] No serving intent classifier to compare against: {e}")
+        current = None
+    report["current"] = report["baseline"] = None
+    if current is not None:
+        # The serving model's own score is for reference only: it may have been trained on the held-out rows
+        report["current"] = {"version": current.version, **evaluate(current, holdout)}
+        new_intents = sorted(set(candidate.intent_labels) - {str(c) for c in current.classifier.classes_})
+        baseline = trainer.baseline(current, training["class_counts"], intent_responses)
+        report["baseline"] = evaluate(baseline, holdout)
+    report["new_intents"] = new_intents
+
+    new, old = report["candidate"].get("f1_macro"), (report["baseline"] or {}).get("f1_macro")
+    if force or old is None:
+        decision = "promoted" if old is None else "forced"
+    elif new is not None and new >= old + margin:
+        decision = "promoted"
+    else:
+        decision = "rejected"
+    report["decision"] = decision if promote else f"dry_run ({decision})"
+
+    version = None
+    if promote and decision != "rejected":
+        final = trainer.refit_all(intent_responses)
+        report["published"] = {"rows": sum(trainer.all_counts.values()), "intents": len(trainer.all_counts)}
+
+        def save(directory):
+            final.save(directory)
+            with open(os.path.join(directory, REPORT_FILE), 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        version = artifacts.publish("intent", save)
+    report["version"] = version
+    return report
@@ -0,0 +1,168 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import artifacts
+
+# Training processes running at once; extra jobs wait in the pool's queue
+TRAIN_JOB_WORKERS = int(os.getenv("TRAIN_JOB_WORKERS", "1"))
+# Finished jobs kept for GET /api/jobs
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "50"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SWAPPING = "swapping"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def train_intent_job(from_log=False, force=False):
+    # Runs in a child process. data/intents.json alone is retrained and published as is; with from_log the
+    # confidently labelled logged messages join it, and the result is published only if it scores at least
+    # as well on held-out rows as the serving model's recipe retrained on the same rows
+    from utils.intent_training import train_and_promote, default_sources, retrain
+    if not from_log:
+        model, result = retrain()
+        return {"result": result, "version": model.version}
+    report = train_and_promote(default_sources(from_log=from_log), force=force)
+    return {"result": report, "version": report["version"]}
+
+
+def embed_job(full=False):
+    # Runs in a child process: re-embeds changed knowledge base files (or everything when full)
+    # on top of the serving version and publishes the result as a new version
+    from utils.embeddings import EmbeddingStore
+    store = EmbeddingStore()
+    if full:
+        result = store.build_index()
+    else:
+        try:
+            store.load(artifacts.current_dir("embeddings"))
+        except Exception as load_error:
+            print(f"[WARN] No saved embeddings, building from scratch: {load_error}")
+        result = store.update_index()
+    if store.index is None or (result.get("status") == "unchanged" and artifacts.current_version("embeddings")):
+        # Nothing new to publish; an empty knowledge base keeps the last published version
+        return {"result": result, "version": None}
+    version = artifacts.publish("embeddings", store.save)
+    return {"result": result, "version": version}
+
+
+class Job:
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.version = None
+        self.error = None
+        self.future = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING, SWAPPING)
+
+    def to_dict(self):
+        status = self.status
+        if status == QUEUED and self.future is not None and self.future.running():
+            status = RUNNING
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "duration_s": round((self.finished_at or time.time()) - self.created_at, 2),
+            "version": self.version,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    # Training and re-embedding run in separate processes so the event loop and the chat worker
+    # threads never wait on scikit-learn or SentenceTransformer; when a job publishes a new
+    # artifact version, on_success hot-swaps it into the serving process.
+    def __init__(self, max_workers=TRAIN_JOB_WORKERS, history=JOB_HISTORY):
+        self.max_workers = max_workers
+        self.history = history
+        self.jobs = OrderedDict()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn, not fork: the server process has live threads (worker pool, log writer, torch)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def submit(self, kind, fn, *args, params=None, on_success=None):
+        with self._lock:
+            # A second request for the same kind while one is pending joins the pending job
+            for job in self.jobs.values():
+                if job.kind == kind and job.params == (params or {}) and job.active:
+                    return job
+            job = Job(kind, params or {})
+            self.jobs[job.id] = job
+            self._trim()
+            job.future = self._pool().submit(fn, *args)
+        job.future.add_done_callback(lambda future: self._finish(job, future, on_success))
+        return job
+
+    def _finish(self, job, future, on_success):
+        try:
+            output = future.result()
+            job.result = output["result"]
+            job.version = output["version"]
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            job.finished_at = time.time()
+            print(f"[ERROR] {job.kind} job {job.id} failed: {e}")
+            return
+        if job.version is None or on_success is None:
+            job.status = SUCCEEDED
+            job.finished_at = time.time()
+            return
+        job.status = SWAPPING
+        # Loading the new version can take seconds; keep it off the pool's result-handling thread
+        threading.Thread(target=self._swap, args=(job, on_success), name=f"swap-{job.id}", daemon=True).start()
+
+    def _swap(self, job, on_success):
+        try:
+            on_success(job.version)
+            job.status = SUCCEEDED
+            print(f"[OK] {job.kind} job {job.id} published and serving version {job.version}")
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"Version {job.version} was published but could not be loaded: {e}"
+            print(f"[ERROR] {job.error}")
+        job.finished_at = time.time()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [job.to_dict() for job in reversed(self.jobs.values())]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+job_manager = JobManager()
@@ -0,0 +1,78 @@
+import os
+import threading
+
+from utils import artifacts
+from utils.embeddings import KB_DIR
+
+# Set KB_WATCH=1 to apply knowledge base edits while the server is running
+KB_WATCH = os.getenv("KB_WATCH", "0") == "1"
+KB_WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "5"))
+
+
+class KnowledgeBaseWatcher:
+    # Polls the knowledge base directory and feeds changes into EmbeddingStore.update_index.
+    # Polling keeps us free of platform-specific file notification dependencies.
+    def __init__(self, store, kb_dir=None, interval=KB_WATCH_INTERVAL, save_dir=None, on_update=None):
+        self.store = store
+        self.kb_dir = kb_dir or KB_DIR
+        self.interval = interval
+        self.save_dir = save_dir
+        self.on_update = on_update
+        self._stop = threading.Event()
+        self._thread = None
+        # Result of an update that was applied but not yet saved
+        self._pending = None
+        self._snapshot = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for filename in os.listdir(self.kb_dir):
+            if filename.endswith('.txt'):
+                stat = os.stat(os.path.join(self.kb_dir, filename))
+                state[filename] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def poll(self):
+        current = self.snapshot()
+        if current == self._snapshot:
+            return None
+
+        result = self.store.update_index(self.kb_dir)
+        if result.get("status") == "unchanged" and self._pending is not None:
+            # Applied by an earlier poll whose save failed
+            result = self._pending
+        if result.get("status") != "unchanged":
+            self._pending = result
+            # An emptied knowledge base has no index to save; the last published version stays on disk
+            if self.store.index is not None:
+                if self.save_dir:
+                    self.store.save(self.save_dir)
+                else:
+                    self.store.version = artifacts.publish("embeddings", self.store.save)
+            print(f"[OK] Knowledge base updated: +{len(result.get('added', []))} "
+                  f"~{len(result.get('changed', []))} -{len(result.get('removed', []))} files")
+            if self.on_update:
+                self.on_update(result)
+            self._pending = None
+        # Only marked as seen once applied and saved, so a failed update is retried on the next poll
+        self._snapshot = current
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[ERROR] Knowledge base watch failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
@@ -0,0 +1,134 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from utils.mapped_format import write_array, map_array
+from utils.routing import WORD_RE, STOPWORDS
+
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = float(os.getenv("KB_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("KB_BM25_B", "0.75"))
+
+LEXICAL_TERMS = "lexical_terms.json"
+
+
+def tokenize(text):
+    return [term for term in WORD_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+class LexicalIndex:
+    # BM25 over knowledge base chunks as an inverted index in flat arrays (CSR layout): the postings of
+    # term t are rows[offsets[t]:offsets[t + 1]], with one precomputed BM25 weight per posting, so a
+    # query is a few array slices and a bincount. rows index `ids`, the chunk ids shared with FAISS.
+    def __init__(self, terms, offsets, rows, weights, idf, ids):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.idf = idf
+        self.ids = ids
+
+    @classmethod
+    def build(cls, documents, k1=BM25_K1, b=BM25_B):
+        # documents: {chunk id: chunk dict}
+        ids = np.asarray(sorted(documents), dtype='int64')
+        postings = {}
+        lengths = np.zeros(len(ids), dtype='float32')
+        for row, chunk_id in enumerate(ids):
+            tokens = tokenize(documents[int(chunk_id)]['content'])
+            lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((row, tf))
+
+        terms = sorted(postings)
+        avg_length = float(lengths.mean()) if len(ids) and lengths.mean() > 0 else 1.0
+        offsets = np.zeros(len(terms) + 1, dtype='int64')
+        rows, tfs = [], []
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            rows.extend(row for row, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+        rows = np.asarray(rows, dtype='int32')
+        tfs = np.asarray(tfs, dtype='float32')
+        norm = k1 * (1 - b + b * lengths[rows] / avg_length) if len(rows) else tfs
+        weights = (tfs * (k1 + 1) / (tfs + norm)).astype('float32')
+        doc_freq = np.diff(offsets).astype('float64')
+        idf = np.log(1 + (len(ids) - doc_freq + 0.5) / (doc_freq + 0.5)).astype('float32')
+        return cls(terms, offsets, rows, weights, idf, ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _query_terms(self, query):
+        # Known terms of the query, each once
+        term_ids = []
+        for token in tokenize(query):
+            term_id = self.term_ids.get(token)
+            if term_id is not None and term_id not in term_ids:
+                term_ids.append(term_id)
+        return term_ids
+
+    def search(self, query, top_k=2):
+        # Returns [(chunk id, bm25 score, share of the query's idf weight the chunk matched)], best first
+        term_ids = self._query_terms(query)
+        if not term_ids or len(self.ids) == 0:
+            return []
+        slices = [slice(int(self.offsets[t]), int(self.offsets[t + 1])) for t in term_ids]
+        rows = np.concatenate([self.rows[s] for s in slices])
+        weights = np.concatenate([self.weights[s] * self.idf[t] for s, t in zip(slices, term_ids)])
+        matched = np.concatenate([np.full(s.stop - s.start, self.idf[t], dtype='float32')
+                                  for s, t in zip(slices, term_ids)])
+        # Scores only for chunks holding at least one query term
+        touched, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        coverage = np.bincount(inverse, weights=matched) / float(sum(self.idf[t] for t in term_ids))
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+        else:
+            top = np.argsort(-scores, kind='stable')
+        return [(int(self.ids[touched[i]]), float(scores[i]), float(coverage[i])) for i in top]
+
+    def max_score(self, query):
+        # Highest BM25 score any chunk could reach for this query, to put scores on a 0-1 scale
+        return float(sum(self.idf[t] for t in self._query_terms(query)) * (BM25_K1 + 1))
+
+    def save(self, directory):
+        directory = Path(directory)
+        with open(directory / LEXICAL_TERMS, 'w', encoding='utf-8') as f:
+            json.dump(self.terms, f)
+        return {
+            "terms": LEXICAL_TERMS,
+            "offsets": write_array(directory, "lexical_offsets.bin", self.offsets),
+            "rows": write_array(directory, "lexical_rows.bin", self.rows),
+            "weights": write_array(directory, "lexical_weights.bin", self.weights),
+            "idf": write_array(directory, "lexical_idf.bin", self.idf),
+            "ids": write_array(directory, "lexical_ids.bin", self.ids),
+        }
+
+    @classmethod
+    def load(cls, directory, entry, mapped=True):
+        with open(Path(directory) / entry["terms"], 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        arrays = {name: map_array(directory, entry[name], mapped) for name in ("offsets", "rows", "weights", "idf", "ids")}
+        return cls(terms, **arrays)
+
+    def stats(self):
+        return {"chunks": len(self.ids), "terms": len(self.terms), "postings": int(len(self.rows)),
+                "bytes": int(self.offsets.nbytes + self.rows.nbytes + self.weights.nbytes + self.idf.nbytes + self.ids.nbytes)}
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    # rankings: lists of chunk ids, best first. Returns (chunk id, fused score) best first
+    fused = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,118 @@
+import json
+import mmap
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+# On-disk layout shared by the intent classifier and the embedding store: a JSON manifest
+# describing raw little-endian arrays stored next to it. Arrays are opened with np.memmap so
+# every worker process maps the same page-cache pages instead of unpickling its own copy.
+FORMAT_VERSION = 2
+
+# Columns of chunks.idx; one int64 row per chunk, sorted by chunk id
+CHUNK_COLUMNS = ("id", "offset", "length", "file", "chunk", "start", "end")
+
+
+def write_manifest(directory, name, manifest):
+    path = Path(directory) / name
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"format_version": FORMAT_VERSION, **manifest}, f, indent=2)
+
+
+def read_manifest(directory, name):
+    with open(Path(directory) / name, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported {name} format version {manifest.get('format_version')}")
+    return manifest
+
+
+def write_array(directory, filename, array):
+    array = np.ascontiguousarray(array)
+    array.tofile(Path(directory) / filename)
+    return {"file": filename, "dtype": array.dtype.str, "shape": list(array.shape)}
+
+
+def map_array(directory, entry, mapped=True):
+    path = Path(directory) / entry["file"]
+    shape = tuple(entry["shape"])
+    if not mapped or 0 in shape:
+        # np.memmap cannot map an empty file
+        return np.fromfile(path, dtype=entry["dtype"]).reshape(shape)
+    return np.memmap(path, dtype=entry["dtype"], mode='r', shape=shape)
+
+
+def write_chunks(directory, documents):
+    # documents: {chunk id: chunk dict}. Text goes into one UTF-8 blob; chunks.idx holds the offsets.
+    filenames = sorted({doc.get('filename') for doc in documents.values() if doc.get('filename') is not None})
+    file_index = {name: i for i, name in enumerate(filenames)}
+    rows = []
+    offset = 0
+    with open(Path(directory) / "chunks.bin", 'wb') as f:
+        for chunk_id in sorted(documents):
+            doc = documents[chunk_id]
+            data = doc['content'].encode('utf-8')
+            f.write(data)
+            rows.append((chunk_id, offset, len(data), file_index.get(doc.get('filename'), -1),
+                         doc.get('chunk_id', 0), doc.get('start', 0), doc.get('end', len(doc['content']))))
+            offset += len(data)
+    table = np.asarray(rows, dtype='<i8').reshape(-1, len(CHUNK_COLUMNS))
+    return {"filenames": filenames, "chunks": write_array(directory, "chunks.idx", table),
+            "text": {"file": "chunks.bin", "bytes": offset}}
+
+
+class MappedDocuments(Mapping):
+    # Read-only {chunk id: chunk} view over chunks.idx and chunks.bin. Chunk dicts are decoded
+    # on access, so only the chunks a search returns are ever materialized in this process.
+    def __init__(self, directory, entry, mapped=True):
+        self.filenames = entry["filenames"]
+        self.table = map_array(directory, entry["chunks"], mapped)
+        self.ids = self.table[:, 0]
+        self._file = None
+        if entry["text"]["bytes"] == 0:
+            self._text = b""
+        elif mapped:
+            self._file = open(Path(directory) / entry["text"]["file"], 'rb')
+            self._text = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            with open(Path(directory) / entry["text"]["file"], 'rb') as f:
+                self._text = f.read()
+
+    def _row(self, chunk_id):
+        row = int(np.searchsorted(self.ids, chunk_id))
+        if row >= len(self.ids) or self.ids[row] != chunk_id:
+            raise KeyError(chunk_id)
+        return row
+
+    def __getitem__(self, chunk_id):
+        _, offset, length, file, chunk, start, end = (int(v) for v in self.table[self._row(chunk_id)])
+        return {
+            "filename": self.filenames[file] if file >= 0 else None,
+            "chunk_id": chunk,
+            "start": start,
+            "end": end,
+            "content": self._text[offset:offset + length].decode('utf-8'),
+        }
+
+    def __contains__(self, chunk_id):
+        try:
+            self._row(chunk_id)
+            return True
+        except (KeyError, TypeError):
+            return False
+
+    def __iter__(self):
+        return (int(chunk_id) for chunk_id in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def to_dict(self):
+        return {chunk_id: self[chunk_id] for chunk_id in self}
+
+    def close(self):
+        if self._file is not None:
+            self._text.close()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,225 @@
+import contextvars
+import os
+import threading
+import time
+
+# "1" traces every chat request; otherwise only requests sent with an "X-Trace: 1" header are traced
+CHAT_TRACE = os.getenv("CHAT_TRACE", "0") == "1"
+
+# Seconds, Prometheus convention; from sub-millisecond lexicon lookups to slow Gemini completions
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Prompt sizes in tokens
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self.values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            for i, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    series[0][i] += 1
+                    break
+            else:
+                series[0][-1] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        labelnames = self.labelnames + ("le",)
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self.series.items())
+        for labels, (counts, total) in series:
+            # Exposition buckets are cumulative
+            cumulative = 0
+            for bucket, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(labelnames, labels + (_number(bucket),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    # Prometheus text exposition without the client library. Counters and histograms are updated on
+    # the request path; collectors read gauges and existing counters from components at scrape time
+    # and return (name, type, help, [(labels dict, value), ...]) families.
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                print(f"[WARN] Metrics collector {collect.__name__} failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+STAGE_SECONDS = metrics_registry.histogram(
+    "pratchat_stage_duration_seconds", "Time spent in each chat pipeline stage", ("stage",))
+REQUEST_SECONDS = metrics_registry.histogram(
+    "pratchat_request_duration_seconds", "End-to-end chat request time", ("endpoint",))
+RESPONSES = metrics_registry.counter(
+    "pratchat_responses_total", "Chat responses by endpoint, routing tier and intent", ("endpoint", "response_type", "intent"))
+REQUEST_ERRORS = metrics_registry.counter(
+    "pratchat_request_errors_total", "Chat requests that ended in an HTTP error instead of a response", ("endpoint", "status"))
+PROMPT_TOKENS = metrics_registry.histogram(
+    "pratchat_prompt_tokens", "Estimated tokens per Gemini prompt, by part", ("part",), buckets=TOKEN_BUCKETS)
+CONTEXT_CHUNKS = metrics_registry.counter(
+    "pratchat_prompt_context_chunks_total", "Retrieved chunks offered as prompt context, by what became of them", ("outcome",))
+GEMINI_TOKENS = metrics_registry.counter(
+    "pratchat_gemini_tokens_total", "Tokens Gemini reported as processed, by kind", ("kind",))
+RETRIEVALS = metrics_registry.counter(
+    "pratchat_retrievals_total", "Knowledge base lookups by how the chunks were found", ("path",))
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        # Estimated prompt tokens by part, when the request reached Gemini
+        self.prompt_tokens = None
+
+    def add(self, name, started, seconds):
+        self.spans.append({"stage": name, "start_ms": round((started - self.started) * 1000, 3),
+                           "duration_ms": round(seconds * 1000, 3)})
+
+    def server_timing(self):
+        # Server-Timing header value; browser dev tools chart it per request
+        return ", ".join(f"{span['stage']};dur={span['duration_ms']}" for span in self.spans)
+
+
+_current_trace = contextvars.ContextVar("pratchat_trace", default=None)
+
+
+def start_trace(requested=False):
+    # Returns the request's Trace, or None when tracing is off (spans are then skipped entirely)
+    trace = Trace() if requested or CHAT_TRACE else None
+    _current_trace.set(trace)
+    return trace
+
+
+def observe_stage(name, started):
+    # Records a stage that began at perf_counter() value `started` and ends now
+    seconds = time.perf_counter() - started
+    STAGE_SECONDS.observe(seconds, name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, started, seconds)
+
+
+def record_prompt_tokens(parts):
+    # parts: {"persona": n, "context": n, "message": n, "total": n}
+    for part, tokens in parts.items():
+        PROMPT_TOKENS.observe(tokens, part)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.prompt_tokens = parts
+
+
+def record_gemini_usage(usage):
+    # usage_metadata from a Gemini response (SDK object or the REST client's equivalent); absent fields count 0
+    if usage is None:
+        return
+    GEMINI_TOKENS.inc("prompt", amount=getattr(usage, "prompt_token_count", 0) or 0)
+    GEMINI_TOKENS.inc("cached", amount=getattr(usage, "cached_content_token_count", 0) or 0)
+    GEMINI_TOKENS.inc("output", amount=getattr(usage, "candidates_token_count", 0) or 0)
+
+
+class stage:
+    # with stage("branding"): ... records the block in the stage histogram and, when tracing, as a span.
+    # Works around awaits too; concurrent stages (asyncio.gather) each get their own span.
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe_stage(self.name, self.started)
+        return False
+
+
+async def timed(name, awaitable):
+    with stage(name):
+        return await awaitable
@@ -1,21 +1,30 @@
 import json
 import joblib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
 from pathlib import Path
 import os
 
+from utils.mapped_format import read_manifest, write_manifest, write_array, map_array
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / "data"
 MODELS_DIR = BASE_DIR / "models"
+CLASSIFIER_MANIFEST = "classifier.json"
+# TfidfVectorizer settings persisted with the vocabulary; everything else stays at its default
+VECTORIZER_PARAMS = ("max_features", "ngram_range", "lowercase", "norm", "use_idf", "smooth_idf", "sublinear_tf")
+# HashingVectorizer settings of models trained by utils/intent_training.py (no vocabulary to store)
+HASHING_PARAMS = ("n_features", "ngram_range", "lowercase", "norm", "alternate_sign")
 
 class IntentClassifier:
     def __init__(self):
+        # scikit-learn is imported on first use rather than when the routes are imported
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
         self.vectorizer = TfidfVectorizer(max_features=100, ngram_range=(1, 2))
         self.classifier = LogisticRegression(max_iter=200)
         self.intent_labels = []
         self.intent_responses = {}
+        self.version = None
         
     def load_intents(self, filepath=None):
         if filepath is None:
@@ -34,41 +43,99 @@ class IntentClassifier:
             tag = intent['tag']
             self.intent_responses[tag] = intent['responses']
             for pattern in intent['patterns']:
-                X.append(pattern.lower())
+                X.append(pattern)
                 y.append(tag)
         
-        self.intent_labels = list(set(y))
+        return self.fit(X, y)
+    
+    def fit(self, texts, labels):
+        # In-memory TF-IDF fit on (text, intent) pairs; responses are set by the caller
+        X = [text.lower() for text in texts]
+        self.intent_labels = list(set(labels))
         
         X_vec = self.vectorizer.fit_transform(X)
-        self.classifier.fit(X_vec, y)
+        self.classifier.fit(X_vec, labels)
         
         return {"status": "trained", "intents": len(self.intent_labels), "samples": len(X)}
     
     def predict(self, text):
-        X_vec = self.vectorizer.transform([text.lower()])
-        intent = self.classifier.predict(X_vec)[0]
+        return self.predict_batch([text])[0]
+    
+    def predict_batch(self, texts):
+        X_vec = self.vectorizer.transform([text.lower() for text in texts])
         proba = self.classifier.predict_proba(X_vec)
-        confidence = float(np.max(proba))
+        best = np.argmax(proba, axis=1)
         
-        return {
-            "intent": intent,
-            "confidence": confidence,
-            "responses": self.intent_responses.get(intent, [])
-        }
+        results = []
+        for row, idx in enumerate(best):
+            intent = self.classifier.classes_[idx]
+            results.append({
+                "intent": intent,
+                "confidence": float(proba[row, idx]),
+                "responses": self.intent_responses.get(intent, [])
+            })
+        return results
     
     def save(self, model_dir=None):
         if model_dir is None:
             model_dir = MODELS_DIR
+        model_dir = Path(model_dir)
         os.makedirs(model_dir, exist_ok=True)
-        joblib.dump(self.vectorizer, model_dir / "vectorizer.pkl")
-        joblib.dump(self.classifier, model_dir / "classifier.pkl")
-        joblib.dump(self.intent_labels, model_dir / "intent_labels.pkl")
-        joblib.dump(self.intent_responses, model_dir / "intent_responses.pkl")
+        params = self.vectorizer.get_params()
+        arrays = {"intercept": write_array(model_dir, "intercept.bin", self.classifier.intercept_)}
+        if hasattr(self.vectorizer, "vocabulary_"):
+            vectorizer = {
+                **{name: params[name] for name in VECTORIZER_PARAMS},
+                "vocabulary": {term: int(i) for term, i in self.vectorizer.vocabulary_.items()},
+            }
+            arrays["idf"] = write_array(model_dir, "idf.bin", self.vectorizer.idf_)
+            arrays["coef"] = write_array(model_dir, "coef.bin", self.classifier.coef_)
+        else:
+            vectorizer = {"type": "hashing", **{name: params[name] for name in HASHING_PARAMS}}
+            # Stored transposed (features x classes): scipy's sparse @ dense needs coef_.T contiguous, and a
+            # row-major coef_ over 2^17 hashed features would be copied on every predict
+            arrays["coef_t"] = write_array(model_dir, "coef_t.bin", self.classifier.coef_.T)
+        write_manifest(model_dir, CLASSIFIER_MANIFEST, {
+            "vectorizer": vectorizer,
+            "classes": [str(c) for c in self.classifier.classes_],
+            "intent_labels": self.intent_labels,
+            "intent_responses": self.intent_responses,
+            "arrays": arrays,
+        })
     
     def load(self, model_dir=None):
         if model_dir is None:
             model_dir = MODELS_DIR
-        self.vectorizer = joblib.load(model_dir / "vectorizer.pkl")
-        self.classifier = joblib.load(model_dir / "classifier.pkl")
-        self.intent_labels = joblib.load(model_dir / "intent_labels.pkl")
-        self.intent_responses = joblib.load(model_dir / "intent_responses.pkl")
+        model_dir = Path(model_dir)
+        if not (model_dir / CLASSIFIER_MANIFEST).exists():
+            # Saves from before classifier.json were joblib pickles
+            self.vectorizer = joblib.load(model_dir / "vectorizer.pkl")
+            self.classifier = joblib.load(model_dir / "classifier.pkl")
+            self.intent_labels = joblib.load(model_dir / "intent_labels.pkl")
+            self.intent_responses = joblib.load(model_dir / "intent_responses.pkl")
+            return
+        
+        manifest = read_manifest(model_dir, CLASSIFIER_MANIFEST)
+        arrays = manifest["arrays"]
+        config = manifest["vectorizer"]
+        # Rebuild the fitted estimators around the mapped arrays instead of unpickling them
+        if config.get("type") == "hashing":
+            from sklearn.feature_extraction.text import HashingVectorizer
+            from sklearn.linear_model import SGDClassifier
+            self.vectorizer = HashingVectorizer(**{name: tuple(config[name]) if name == "ngram_range" else config[name]
+                                                   for name in HASHING_PARAMS})
+            self.classifier = SGDClassifier(loss="log_loss")
+        else:
+            self.vectorizer.set_params(**{name: tuple(config[name]) if name == "ngram_range" else config[name]
+                                          for name in VECTORIZER_PARAMS})
+            self.vectorizer.vocabulary_ = config["vocabulary"]
+            self.vectorizer.idf_ = map_array(model_dir, arrays["idf"])
+        self.classifier.classes_ = np.asarray(manifest["classes"])
+        if "coef_t" in arrays:
+            self.classifier.coef_ = map_array(model_dir, arrays["coef_t"]).T
+        else:
+            self.classifier.coef_ = map_array(model_dir, arrays["coef"])
+        self.classifier.intercept_ = map_array(model_dir, arrays["intercept"])
+        self.classifier.n_features_in_ = self.classifier.coef_.shape[1]
+        self.intent_labels = manifest["intent_labels"]
+        self.intent_responses = manifest["intent_responses"]
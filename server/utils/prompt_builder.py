@@ -0,0 +1,128 @@
+import math
+import os
+import re
+
+from utils.metrics import CONTEXT_CHUNKS
+
+# Most knowledge base context, in estimated tokens, put into one Gemini prompt (persona and message are extra);
+# the default fits two full chunks, what every prompt carried before
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "400"))
+# Chunks retrieved per question as context candidates; the budget decides how many make it into the prompt
+PROMPT_CANDIDATES = int(os.getenv("PROMPT_CANDIDATES", "6"))
+# Chunks less similar to the question than this are left out of the context
+PROMPT_MIN_SIMILARITY = float(os.getenv("PROMPT_MIN_SIMILARITY", "0.2"))
+# Most conversation history, in estimated tokens, put into one Gemini prompt for a chat session
+PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "300"))
+
+# Gemini averages about four characters of English per token; good enough to budget without a tokenizer
+CHARS_PER_TOKEN = 4
+# A passage that only partly fits is cut to the remaining budget, unless less than this much is left
+MIN_PARTIAL_TOKENS = 40
+
+SENTENCE_END_RE = re.compile(r"[.!?](?=\s)|\n")
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def _normalized(text):
+    return " ".join(text.split()).lower()
+
+
+def _merge(passage, hit):
+    # Joins two overlapping or adjacent spans of one file; offsets index the original file text
+    first, second = (passage, hit) if passage["start"] <= hit["start"] else (hit, passage)
+    if second["end"] <= first["end"]:
+        content = first["content"]
+    else:
+        content = first["content"] + second["content"][first["end"] - second["start"]:]
+    return {**passage, "content": content, "start": first["start"], "end": max(first["end"], second["end"])}
+
+
+def trim_to_tokens(text, tokens):
+    # Longest prefix within `tokens`, ending at a sentence end if that keeps at least half, else at a word
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    ends = [m.end() for m in SENTENCE_END_RE.finditer(cut)]
+    if ends and ends[-1] >= limit // 2:
+        return cut[:ends[-1]].rstrip()
+    return cut[:limit - 4].rsplit(" ", 1)[0].rstrip() + " ..."
+
+
+class PromptBuilder:
+    # Turns retrieved chunks into prompt context within a token budget: best-scoring chunks first,
+    # overlapping chunks of one file merged into a single passage, repeated text dropped, and the last
+    # passage cut at a sentence so the context never exceeds the budget.
+    def __init__(self, budget=PROMPT_CONTEXT_TOKENS, min_similarity=PROMPT_MIN_SIMILARITY,
+                 history_budget=PROMPT_HISTORY_TOKENS):
+        self.budget = budget
+        self.min_similarity = min_similarity
+        self.history_budget = history_budget
+
+    def passages(self, hits):
+        # hits: search results, best first (hybrid search orders by fused rank, not by score);
+        # returns deduplicated passages in the same order
+        passages, texts = [], []
+        for hit in hits:
+            if hit["score"] < self.min_similarity:
+                CONTEXT_CHUNKS.inc("low_similarity")
+                continue
+            # Neighbouring chunks share KB_CHUNK_OVERLAP characters; the shared text is sent once
+            for i, passage in enumerate(passages):
+                if (passage.get("filename") == hit.get("filename") and hit["start"] <= passage["end"]
+                        and passage["start"] <= hit["end"]):
+                    passages[i] = _merge(passage, hit)
+                    texts[i] = _normalized(passages[i]["content"])
+                    CONTEXT_CHUNKS.inc("merged")
+                    break
+            else:
+                # The same text in another file, or already inside a passage
+                text = _normalized(hit["content"])
+                if any(text in other for other in texts):
+                    CONTEXT_CHUNKS.inc("duplicate")
+                    continue
+                passages.append(dict(hit))
+                texts.append(text)
+        return passages
+
+    def build(self, hits):
+        # Returns the context text and its estimated token count
+        parts, used = [], 0
+        for passage in self.passages(hits):
+            remaining = self.budget - used
+            # Passages are joined by a blank line, about one token
+            tokens = estimate_tokens(passage["content"]) + (1 if parts else 0)
+            if tokens <= remaining:
+                parts.append(passage["content"])
+                used += tokens
+                CONTEXT_CHUNKS.inc("used")
+            elif remaining >= MIN_PARTIAL_TOKENS:
+                text = trim_to_tokens(passage["content"], remaining - (1 if parts else 0))
+                parts.append(text)
+                used += estimate_tokens(text) + (1 if len(parts) > 1 else 0)
+                CONTEXT_CHUNKS.inc("trimmed")
+            else:
+                CONTEXT_CHUNKS.inc("over_budget")
+        return "\n\n".join(parts), used
+
+    def history(self, summary, turns):
+        # Session history within its budget: the newest turns that fit, then the summary of older ones
+        lines, used = [], 0
+        for user_message, reply in reversed(turns):
+            turn = f"User: {user_message}\nPrat.AI: {reply}"
+            tokens = estimate_tokens(turn) + 1
+            if used + tokens > self.history_budget:
+                break
+            lines.insert(0, turn)
+            used += tokens
+        if summary and len(lines) == len(turns):
+            earlier = f"Earlier the user asked about: {summary}"
+            if used + estimate_tokens(earlier) + 1 <= self.history_budget:
+                lines.insert(0, earlier)
+        return "\n".join(lines)
+
+
+prompt_builder = PromptBuilder()
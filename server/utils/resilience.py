@@ -0,0 +1,331 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+
+# Calls to an upstream (Gemini) allowed in flight at once per process; later calls wait for a slot
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+# Longest a single attempt may take, and the budget for the whole call including retries and waiting
+UPSTREAM_ATTEMPT_TIMEOUT_S = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_S", "20"))
+UPSTREAM_DEADLINE_S = float(os.getenv("GEMINI_DEADLINE_S", "45"))
+# Retries after a failed attempt, with full-jitter exponential backoff between them
+UPSTREAM_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE_MS = float(os.getenv("GEMINI_BACKOFF_BASE_MS", "200"))
+UPSTREAM_BACKOFF_MAX_MS = float(os.getenv("GEMINI_BACKOFF_MAX_MS", "2000"))
+# Consecutive failed attempts that open the circuit, and how long it stays open before a probe call
+BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.getenv("GEMINI_BREAKER_RESET_S", "30"))
+# Send a second copy of a request still unanswered after this many ms and keep the first answer; 0 disables
+UPSTREAM_HEDGE_MS = float(os.getenv("GEMINI_HEDGE_MS", "0"))
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+# HTTP statuses worth another attempt; other 4xx mean the request itself is wrong
+RETRYABLE_STATUS = frozenset((408, 429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class DeadlineExceededError(Exception):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    # google.api_core exceptions carry the HTTP status as .code
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        for i, bucket in enumerate(self.buckets):
+            if ms <= bucket:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "buckets": {**{f"le_{b}": c for b, c in zip(self.buckets, self.counts)}, "le_inf": self.counts[-1]},
+        }
+
+
+class CircuitBreaker:
+    # closed: calls go through. open: calls fail immediately for reset_s. half_open: one probe call
+    # decides between closing again and another open period.
+    def __init__(self, failures=BREAKER_FAILURES, reset_s=BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        # Open and not yet due for a probe
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_s
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+                return True
+            return self.state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def release_probe(self):
+        # A probe that ended without an answer either way (cancelled) lets the next call probe instead
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == "half_open" or (self.failures > 0 and self.consecutive_failures >= self.failures):
+                if self.state != "open":
+                    self.times_opened += 1
+                    print(f"[WARN] Circuit opened after {self.consecutive_failures} consecutive upstream failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def to_dict(self):
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures, "times_opened": self.times_opened}
+
+
+class ResilientCaller:
+    # Wraps calls to a flaky upstream: concurrency limit, per-attempt timeout inside an overall deadline,
+    # retries with jittered backoff, a circuit breaker and optional hedging. attempt_fn() must return a
+    # new awaitable on every call.
+    def __init__(self, name, max_concurrency=UPSTREAM_MAX_CONCURRENCY, attempt_timeout_s=UPSTREAM_ATTEMPT_TIMEOUT_S,
+                 deadline_s=UPSTREAM_DEADLINE_S, max_retries=UPSTREAM_MAX_RETRIES, hedge_ms=UPSTREAM_HEDGE_MS,
+                 breaker=None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.attempt_timeout_s = attempt_timeout_s
+        self.deadline_s = deadline_s
+        self.max_retries = max_retries
+        self.hedge_ms = hedge_ms
+        self.breaker = breaker or CircuitBreaker()
+        self.counters = {"calls": 0, "succeeded": 0, "failed": 0, "attempts": 0, "retries": 0, "timeouts": 0,
+                         "short_circuited": 0, "hedges": 0, "hedge_wins": 0}
+        self.attempt_latency = {"ok": LatencyHistogram(), "error": LatencyHistogram(), "timeout": LatencyHistogram()}
+        self.call_latency = LatencyHistogram()
+        self.in_flight = 0
+        self._semaphore = None
+
+    def _backoff_s(self, retry):
+        cap = min(UPSTREAM_BACKOFF_MAX_MS, UPSTREAM_BACKOFF_BASE_MS * (2 ** retry))
+        return random.uniform(0, cap) / 1000.0
+
+    def _observe(self, started, error):
+        ms = (time.perf_counter() - started) * 1000
+        if error is None:
+            self.attempt_latency["ok"].observe(ms)
+        elif isinstance(error, asyncio.TimeoutError):
+            self.counters["timeouts"] += 1
+            self.attempt_latency["timeout"].observe(ms)
+        else:
+            self.attempt_latency["error"].observe(ms)
+
+    async def _attempt(self, attempt_fn, timeout):
+        self.counters["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(attempt_fn(), timeout)
+        except Exception as e:
+            self._observe(started, e)
+            raise
+        self._observe(started, None)
+        return result
+
+    async def _hedged_attempt(self, attempt_fn, timeout):
+        # The primary attempt gets hedge_ms to answer; after that a second copy races it
+        primary = asyncio.ensure_future(self._attempt(attempt_fn, timeout))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_ms / 1000.0)
+            if done or timeout <= self.hedge_ms / 1000.0:
+                return await primary
+            self.counters["hedges"] += 1
+            hedge = asyncio.ensure_future(self._attempt(attempt_fn, timeout - self.hedge_ms / 1000.0))
+            pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, attempt_fn):
+        self.counters["calls"] += 1
+        if self.breaker.is_open():
+            self.counters["short_circuited"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+        if self._semaphore is None:
+            # Created lazily so it binds to the running loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.deadline_s
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.deadline_s)
+        except asyncio.TimeoutError:
+            self.counters["failed"] += 1
+            raise DeadlineExceededError(f"{self.name}: no free slot within {self.deadline_s}s")
+        self.in_flight += 1
+        try:
+            retry = 0
+            while True:
+                if not self.breaker.allow():
+                    self.counters["short_circuited"] += 1
+                    raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise DeadlineExceededError(f"{self.name}: deadline of {self.deadline_s}s exceeded")
+                    timeout = min(self.attempt_timeout_s, remaining)
+                    if self.hedge_ms > 0:
+                        result = await self._hedged_attempt(attempt_fn, timeout)
+                    else:
+                        result = await self._attempt(attempt_fn, timeout)
+                except asyncio.CancelledError:
+                    self.breaker.release_probe()
+                    raise
+                except Exception as e:
+                    if not is_retryable(e):
+                        # The upstream answered (e.g. 400 for a bad request); that says nothing about its health
+                        self.breaker.release_probe()
+                        raise
+                    self.breaker.record_failure()
+                    backoff = self._backoff_s(retry)
+                    if retry >= self.max_retries or time.monotonic() + backoff >= deadline:
+                        raise
+                    retry += 1
+                    self.counters["retries"] += 1
+                    await asyncio.sleep(backoff)
+                    continue
+                self.breaker.record_success()
+                self.counters["succeeded"] += 1
+                return result
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.call_latency.observe((time.perf_counter() - started) * 1000)
+
+    async def stream(self, open_fn):
+        # open_fn() returns an awaitable async iterable of chunks. Retries, hedging and the concurrency slot
+        # cover the wait for the first chunk; once text has been yielded the answer cannot be restarted, so
+        # later chunks only get an idle timeout of attempt_timeout_s each.
+        async def first_chunk():
+            iterator = (await open_fn()).__aiter__()
+            try:
+                return iterator, await iterator.__anext__()
+            except StopAsyncIteration:
+                return iterator, None
+
+        iterator, chunk = await self.call(first_chunk)
+        while chunk is not None:
+            yield chunk
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), self.attempt_timeout_s)
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                if is_retryable(e):
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.counters["timeouts"] += 1
+                    self.breaker.record_failure()
+                raise
+
+    def call_sync(self, fn):
+        # Blocking variant for scripts: retries, backoff and the breaker; fn(timeout) enforces the timeout
+        self.counters["calls"] += 1
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.deadline_s
+        retry = 0
+        try:
+            while True:
+                if not self.breaker.allow():
+                    self.counters["short_circuited"] += 1
+                    raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+                self.counters["attempts"] += 1
+                attempt_started = time.perf_counter()
+                try:
+                    result = fn(min(self.attempt_timeout_s, max(0.0, deadline - time.monotonic())))
+                except Exception as e:
+                    self._observe(attempt_started, e)
+                    if not is_retryable(e):
+                        self.breaker.release_probe()
+                        raise
+                    self.breaker.record_failure()
+                    backoff = self._backoff_s(retry)
+                    if retry >= self.max_retries or time.monotonic() + backoff >= deadline:
+                        raise
+                    retry += 1
+                    self.counters["retries"] += 1
+                    time.sleep(backoff)
+                    continue
+                self._observe(attempt_started, None)
+                self.breaker.record_success()
+                self.counters["succeeded"] += 1
+                return result
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.call_latency.observe((time.perf_counter() - started) * 1000)
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "attempt_timeout_s": self.attempt_timeout_s,
+            "deadline_s": self.deadline_s,
+            "max_retries": self.max_retries,
+            "hedge_ms": self.hedge_ms,
+            "in_flight": self.in_flight,
+            "breaker": self.breaker.to_dict(),
+            **self.counters,
+            "call_latency_ms": self.call_latency.to_dict(),
+            "attempt_latency_ms": {outcome: h.to_dict() for outcome, h in self.attempt_latency.items()},
+        }
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") == "1"
+# Cosine similarity a new question needs with a cached one to reuse its answer
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
+
+class ResponseCache:
+    # Expects unit-length query embeddings (as produced by EmbeddingStore.encode_queries),
+    # so inner product over the flat index is cosine similarity.
+    def __init__(self, dimension=384, threshold=RESPONSE_CACHE_THRESHOLD, ttl=RESPONSE_CACHE_TTL,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reset(dimension)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _reset(self, dimension):
+        self.dimension = dimension
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        # Insertion order doubles as age order for TTL and size eviction
+        self.entries = OrderedDict()
+        self.next_id = 0
+
+    def _remove(self, ids):
+        # Caller holds the lock
+        for entry_id in ids:
+            self.entries.pop(entry_id, None)
+        self.index.remove_ids(np.asarray(ids, dtype='int64'))
+
+    def _expire(self, now):
+        expired = []
+        for entry_id, entry in self.entries.items():
+            if now - entry["created"] < self.ttl:
+                break
+            expired.append(entry_id)
+        if expired:
+            self._remove(expired)
+            self.expirations += len(expired)
+
+    def lookup(self, query_embedding):
+        query = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+        with self._lock:
+            if query.shape[1] != self.dimension or self.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            self._expire(time.time())
+            if self.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = self.index.search(query, 1)
+            entry = self.entries.get(int(ids[0][0]))
+            similarity = float(scores[0][0])
+            if entry is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return {**entry, "similarity": similarity}
+
+    def put(self, query_embedding, question, response, metadata=None):
+        query = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+        with self._lock:
+            if query.shape[1] != self.dimension:
+                self._reset(query.shape[1])
+
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(query, np.asarray([entry_id], dtype='int64'))
+            self.entries[entry_id] = {
+                "question": question,
+                "response": response,
+                "metadata": metadata or {},
+                "created": time.time(),
+            }
+
+            overflow = len(self.entries) - self.max_entries
+            if overflow > 0:
+                self._remove(list(self.entries)[:overflow])
+                self.evictions += overflow
+
+    def invalidate(self):
+        # Answers were grounded in the old knowledge base, so drop them all
+        with self._lock:
+            self._reset(self.dimension)
+            self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
@@ -0,0 +1,110 @@
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Per-intent routing thresholds (see data/routing.json); a missing file keeps the old behaviour
+ROUTING_CONFIG = os.getenv("ROUTING_CONFIG", str(BASE_DIR / "data" / "routing.json"))
+# Longest extractive answer, in characters, built from the top retrieved chunk
+EXTRACTIVE_MAX_CHARS = int(os.getenv("EXTRACTIVE_MAX_CHARS", "400"))
+
+# Before per-intent thresholds: canned answers only for confident greetings, goodbyes and thanks
+DEFAULT_CONFIG = {
+    "default": {"local_confidence": None, "extractive_similarity": None, "lexical_extractive_score": None},
+    "greeting": {"local_confidence": 0.85},
+    "goodbye": {"local_confidence": 0.85},
+    "thanks": {"local_confidence": 0.85},
+}
+
+# Sentence ends, but not list markers like "1."
+SENTENCE_RE = re.compile(r"(?<=[^\d\s][.!?])\s+")
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "explain", "for", "from", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "tell", "that", "the", "this", "to",
+    "what", "when", "where", "which", "who", "why", "with", "you", "your",
+))
+
+
+def load_config(path=ROUTING_CONFIG):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_CONFIG
+
+
+def split_sentences(content):
+    # (sentence, starts a line) pairs; line breaks are kept so headings and list items stay on their own lines
+    sentences = []
+    for line in content.split("\n"):
+        for i, sentence in enumerate(SENTENCE_RE.split(line.strip())):
+            if sentence:
+                sentences.append((sentence, i == 0))
+    return sentences
+
+
+def extract_answer(query, content, max_chars=EXTRACTIVE_MAX_CHARS):
+    # The sentence sharing the most query terms (length-normalized), followed by the sentences after it
+    sentences = split_sentences(content)
+    if len(sentences) > 1 and not sentences[0][0][0].isupper() and not sentences[0][0][0].isdigit():
+        # Chunks overlap, so the first "sentence" is often the tail of one cut in half
+        sentences = sentences[1:]
+    if not sentences:
+        return None
+
+    terms = set(WORD_RE.findall(query.lower())) - STOPWORDS
+    best, best_score = 0, 0.0
+    for i, (sentence, _) in enumerate(sentences):
+        words = WORD_RE.findall(sentence.lower())
+        overlap = sum(1 for w in set(words) if w in terms)
+        score = overlap / math.sqrt(len(words)) if words else 0.0
+        if score > best_score:
+            best, best_score = i, score
+
+    answer = sentences[best][0]
+    for sentence, starts_line in sentences[best + 1:]:
+        if len(answer) + 1 + len(sentence) > max_chars or (starts_line and sentence.endswith(":")):
+            # Stop at the next section heading
+            break
+        answer += ("\n" if starts_line else " ") + sentence
+    if len(answer) > max_chars:
+        answer = answer[:max_chars].rsplit(" ", 1)[0]
+    return answer
+
+
+class ResponseRouter:
+    # Tiers, cheapest first: a canned intent response when the classifier is confident enough, an
+    # extractive answer from the top knowledge base chunk when retrieval similarity is high enough,
+    # otherwise Gemini. Thresholds are per intent; None turns a tier off for that intent.
+    def __init__(self, config=None):
+        self.config = config if config is not None else load_config()
+
+    def thresholds(self, intent):
+        return {**DEFAULT_CONFIG["default"], **self.config.get("default", {}), **self.config.get(intent, {})}
+
+    def is_local(self, intent_result):
+        threshold = self.thresholds(intent_result['intent'])["local_confidence"]
+        return threshold is not None and intent_result['confidence'] >= threshold and bool(intent_result['responses'])
+
+    def extractive(self, intent, query, hits):
+        # hits: search_with_scores results, best first. Returns an answer or None
+        threshold = self.thresholds(intent)["extractive_similarity"]
+        if threshold is None or not hits or hits[0]["score"] < threshold:
+            return None
+        return extract_answer(query, hits[0]["content"])
+
+    def lexical_extractive(self, intent, query, hits):
+        # hits: lexical fast-path results, scored by BM25 on a 0-1 scale rather than cosine, so they have
+        # their own threshold. Returns an answer or None
+        thresholds = self.thresholds(intent)
+        threshold = thresholds["lexical_extractive_score"]
+        if threshold is None or thresholds["extractive_similarity"] is None or not hits or hits[0]["score"] < threshold:
+            return None
+        return extract_answer(query, hits[0]["content"])
+
+
+response_router = ResponseRouter()
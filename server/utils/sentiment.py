@@ -1,17 +1,201 @@
-from textblob import TextBlob
+import importlib.util
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
 
-def analyze_sentiment(text):
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-    
+# "lexicon" scores messages against a token table compiled once from TextBlob's English lexicon,
+# applying the same negation/intensifier rules as its pattern analyzer without building a TextBlob
+# per message; "textblob" runs TextBlob itself
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "lexicon").lower()
+
+# Lexicon XML to compile; defaults to the en-sentiment.xml shipped inside the textblob package
+SENTIMENT_LEXICON = os.getenv("SENTIMENT_LEXICON", "")
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+
+# Emoticons scored by the pattern analyzer (first match wins, as in its table)
+EMOTICONS = (
+    (1.00, ("<3", "♥")),
+    (1.00, (">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "8-D")),
+    (0.75, (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)")),
+    (0.50, (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)")),
+    (0.25, (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)")),
+    (0.05, (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°")),
+    (-0.25, (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>")),
+    (-0.75, (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/")),
+    (-1.00, (":'(", ":'''(", ";'(")),
+)
+EMOTICON_POLARITY = {}
+for _polarity, _faces in EMOTICONS:
+    for _face in _faces:
+        EMOTICON_POLARITY.setdefault(_face.lower(), _polarity)
+
+# Same token boundaries as TextBlob's tokenizer: quotes/apostrophes split words ("it's" -> "it", "s"),
+# leading/trailing punctuation is split off, inner punctuation is kept ("all-around"). Of the punctuation
+# only "!", "...", "(!)" and emoticons change a score, so the rest is never emitted.
+_PUNCT = r"""\s'"‘’“”.,;:!?()\[\]{}`@#$^&*+|=~_\-"""
+TOKEN_RE = re.compile(
+    r"(?:(?<=\s)|^)(%s)(?=\s|$)" % "|".join(re.escape(face) for face in sorted(EMOTICON_POLARITY, key=len, reverse=True))
+    + r"|(\(\s?!\s?\))"
+    + r"|([^%s](?:[^\s'\"‘’“”]*[^%s])?|\.\.\.|!)" % (_PUNCT, _PUNCT)
+)
+
+
+def _lexicon_path():
+    if SENTIMENT_LEXICON:
+        return Path(SENTIMENT_LEXICON)
+    # find_spec locates the package without importing it (importing textblob pulls in nltk)
+    spec = importlib.util.find_spec("textblob")
+    if spec is None or spec.origin is None:
+        raise RuntimeError("textblob is not installed and SENTIMENT_LEXICON is not set")
+    return Path(spec.origin).parent / "en" / "en-sentiment.xml"
+
+
+def _average(rows):
+    return [sum(column) / len(column) for column in zip(*rows)]
+
+
+class SentimentLexicon:
+    # word -> (polarity, intensity, is_adverb). Polarity/intensity are averaged over the word's senses
+    # and parts of speech exactly as TextBlob does, so scores match its pattern analyzer.
+    def __init__(self, path=None):
+        self.path = Path(path) if path else _lexicon_path()
+        self.table = self._compile(self.path)
+
+    @staticmethod
+    def _compile(path):
+        senses = {}
+        for node in ElementTree.parse(path).getroot().iter("word"):
+            form = node.get("form")
+            if form:
+                senses.setdefault(form, {}).setdefault(node.get("pos"), []).append(
+                    (float(node.get("polarity", 0.0)), float(node.get("intensity", 1.0))))
+
+        by_pos = {}
+        for form, tags in senses.items():
+            scores = {pos: _average(rows) for pos, rows in tags.items()}
+            scores[None] = _average(list(scores.values()))
+            by_pos[form] = scores
+
+        # TextBlob also derives adverbs from adjectives: "terrible" -> "terribly"
+        for form, scores in list(by_pos.items()):
+            if "JJ" in scores:
+                stem = form[:-1] + "i" if form.endswith("y") else form
+                stem = stem[:-2] if stem.endswith("le") else stem
+                adverb = by_pos.setdefault(stem + "ly", {})
+                adverb["RB"] = adverb[None] = scores["JJ"]
+
+        return {form: (scores[None][0], scores[None][1], "RB" in scores) for form, scores in by_pos.items()}
+
+    def polarity(self, text):
+        table = self.table
+        total = 0.0
+        count = 0
+        # The assessment being built: polarity, intensity passed to the next word, negated
+        p = i = 0.0
+        negated = False
+        has_last = False
+        modifier = None
+        negation = None
+
+        if "n't" in text:
+            # As TextBlob does: "don't" -> "do", "n", "t"
+            text = text.replace("n't", " n't")
+        for emoticon, sarcasm, word in TOKEN_RE.findall(text.lower()):
+            entry = table.get(word) if word else None
+            if entry is not None:
+                if modifier is None:
+                    # Known word starts a new assessment ("good")
+                    if has_last:
+                        total += p * -0.5 if negated else p
+                        count += 1
+                    p, i, negated, has_last = entry[0], entry[1], False, True
+                else:
+                    # Preceded by an intensifier ("really good")
+                    p = max(-1.0, min(entry[0] * i, 1.0))
+                    i = entry[1]
+                if negation is not None:
+                    # "not really good"
+                    i = 1.0 / i
+                    negated = True
+                modifier = word if entry[2] else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            token = word or emoticon or sarcasm
+            if token in NEGATIONS:
+                negation = token
+            elif negation is not None and len(token) > 1:
+                # Negation carries across single letters only
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                # "really not good"
+                negated = True
+                negation = None
+            elif modifier is not None and len(token) > 2:
+                modifier = None
+
+            if token == "!":
+                if has_last:
+                    p = max(-1.0, min(p * 1.25, 1.0))
+            elif emoticon or sarcasm:
+                # Emoticons and sarcasm "(!)" are assessments of their own
+                if has_last:
+                    total += p * -0.5 if negated else p
+                    count += 1
+                p, i, negated, has_last = (0.0 if sarcasm else EMOTICON_POLARITY[emoticon]), 1.0, False, True
+
+        if has_last:
+            total += p * -0.5 if negated else p
+            count += 1
+        return total / count if count else 0.0
+
+    def polarity_batch(self, texts):
+        return [self.polarity(text) for text in texts]
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                _lexicon = SentimentLexicon()
+    return _lexicon
+
+
+def _textblob_polarity(text):
+    # TextBlob pulls in nltk (~1 s); it is imported on first use, which the startup warm-up triggers
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
+
+
+def _result(polarity):
     if polarity > 0.1:
         sentiment = "positive"
     elif polarity < -0.1:
         sentiment = "negative"
     else:
         sentiment = "neutral"
-    
+
     return {
         "sentiment": sentiment,
         "polarity": round(polarity, 2)
     }
+
+
+def analyze_sentiment(text, engine=None):
+    if (engine or SENTIMENT_ENGINE) == "textblob":
+        return _result(_textblob_polarity(text))
+    return _result(get_lexicon().polarity(text))
+
+
+def analyze_sentiment_batch(texts, engine=None):
+    if (engine or SENTIMENT_ENGINE) == "textblob":
+        return [_result(_textblob_polarity(text)) for text in texts]
+    return [_result(polarity) for polarity in get_lexicon().polarity_batch(texts)]
@@ -0,0 +1,323 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from utils.database import connect
+
+# Turns kept verbatim per session; older turns are folded into the session summary
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "4"))
+# Characters kept of each stored message; replies only need their gist to carry the conversation
+SESSION_MESSAGE_CHARS = int(os.getenv("SESSION_MESSAGE_CHARS", "300"))
+# Length limit of the summary of folded turns
+SESSION_SUMMARY_CHARS = int(os.getenv("SESSION_SUMMARY_CHARS", "400"))
+# Sessions held in memory; the least recently used one is evicted (or spilled) beyond this
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "20000"))
+# Seconds without a message before a session leaves memory
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+# "1" writes sessions leaving memory to SQLite so a returning client picks up where it left off
+SESSION_SPILL = os.getenv("SESSION_SPILL", "1") == "1"
+# Spilled sessions older than this many seconds are deleted
+SESSION_SPILL_TTL = float(os.getenv("SESSION_SPILL_TTL", str(7 * 24 * 3600)))
+# "1" keeps sessions only in SQLite, read and written on every turn, so processes serving the same
+# clients share them (serve.py turns it on with several workers); needs SESSION_SPILL=1
+SESSION_SHARED = os.getenv("SESSION_SHARED", "0") == "1"
+
+# Session ids are issued by the server (SessionStore.create); anything not shaped like one is rejected
+# before a lookup
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{43}$")
+# Separates the user message from the reply inside one stored turn
+TURN_SEP = "\x1f"
+# How often the background sweeper expires idle sessions and writes spilled ones
+SWEEP_INTERVAL = 10.0
+
+SELECT_SESSION = "SELECT summary, turns, updated FROM sessions WHERE id = ?"
+UPSERT_SESSION = """
+    INSERT INTO sessions (id, summary, turns, updated) VALUES (?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET summary = excluded.summary, turns = excluded.turns, updated = excluded.updated
+"""
+
+
+def new_session_id():
+    # 256 random bits: an id is the only thing standing between a client and someone else's conversation
+    return secrets.token_urlsafe(32)
+
+
+def valid_session_id(session_id):
+    return bool(SESSION_ID_RE.match(session_id))
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rsplit(" ", 1)[0] + "..."
+
+
+class Session:
+    # A fixed-size ring of turns plus a rolling summary. Each turn is one string ("user<US>reply"),
+    # a single object instead of a tuple of two, and the ring only grows to SESSION_MAX_TURNS.
+    __slots__ = ("ring", "next", "summary", "last_seen")
+
+    def __init__(self, summary="", turns=(), last_seen=None):
+        # turns: stored turn strings, oldest first
+        self.ring = list(turns)[-SESSION_MAX_TURNS:] if turns else []
+        self.next = len(self.ring)
+        self.summary = summary
+        self.last_seen = last_seen if last_seen is not None else time.time()
+
+    def _ordered(self):
+        if len(self.ring) < SESSION_MAX_TURNS:
+            return self.ring
+        start = self.next % SESSION_MAX_TURNS
+        return self.ring[start:] + self.ring[:start]
+
+    def turns(self):
+        # Oldest first, as (user, reply) pairs
+        return [tuple(turn.split(TURN_SEP, 1)) for turn in self._ordered()]
+
+    def add(self, user_message, reply):
+        turn = _clip(user_message, SESSION_MESSAGE_CHARS).replace(TURN_SEP, " ") + TURN_SEP + \
+            _clip(reply, SESSION_MESSAGE_CHARS)
+        if len(self.ring) < SESSION_MAX_TURNS:
+            self.ring.append(turn)
+        else:
+            slot = self.next % SESSION_MAX_TURNS
+            self._fold(self.ring[slot])
+            self.ring[slot] = turn
+        self.next += 1
+        self.last_seen = time.time()
+
+    def _fold(self, turn):
+        # Extractive summary of turns that left the ring: what the user asked about, newest kept when
+        # the summary is full. No Gemini call, so remembering costs nothing per request.
+        question = _clip(turn.split(TURN_SEP, 1)[0], 120)
+        topics = [t for t in self.summary.split(" | ") if t] + [question]
+        while len(topics) > 1 and len(" | ".join(topics)) > SESSION_SUMMARY_CHARS:
+            topics.pop(0)
+        self.summary = " | ".join(topics)[-SESSION_SUMMARY_CHARS:]
+
+    def to_row(self, session_id):
+        return (session_id, self.summary, json.dumps(self._ordered()), self.last_seen)
+
+
+def _read(conn, session_id):
+    row = conn.execute(SELECT_SESSION, (session_id,)).fetchone()
+    return Session(row[0], json.loads(row[1]), row[2]) if row is not None else None
+
+
+class SessionStore:
+    # In-memory sessions in LRU order (an OrderedDict, oldest first). A session idle for
+    # SESSION_IDLE_TTL, or pushed out by SESSION_MAX_ACTIVE newer ones, leaves memory; with spilling
+    # on it is written to SQLite by the background sweeper and read back when its client returns.
+    # Shared stores skip memory: every turn reads and rewrites the session's row, so a process never
+    # serves a copy another process has moved past.
+    def __init__(self, max_active=SESSION_MAX_ACTIVE, idle_ttl=SESSION_IDLE_TTL, spill=SESSION_SPILL,
+                 db_path=None, shared=SESSION_SHARED):
+        self.max_active = max_active
+        self.idle_ttl = idle_ttl
+        self.spill = spill
+        self.shared = shared and spill
+        self.db_path = db_path
+        self.sessions = OrderedDict()
+        # Evicted sessions waiting for the sweeper to write them, and those it is writing right now
+        self._spilling = {}
+        self._writing = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.created = 0
+        self.restored = 0
+        self.evicted = 0
+        self.expired = 0
+        self.spilled = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+                self._thread.start()
+        return self
+
+    def create(self):
+        # Issues a session id and records its empty session, so chat requests can tell issued ids from
+        # made-up ones. With spilling on the row is written right away, so every worker can resume it.
+        if self._thread is None:
+            self.start()
+        session_id, session = new_session_id(), Session()
+        with self._lock:
+            if not self.shared:
+                self._insert(session_id, session)
+            self.created += 1
+        if self.spill:
+            conn = connect(self.db_path)
+            try:
+                with conn:
+                    conn.execute(UPSERT_SESSION, session.to_row(session_id))
+            finally:
+                conn.close()
+        return session_id
+
+    def get(self, session_id):
+        # Memory only: the session, or None if it is new or was spilled (see restore)
+        if self.shared:
+            return None
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                return session
+            session = self._spilling.pop(session_id, None) or self._writing.get(session_id)
+            if session is not None:
+                self._insert(session_id, session)
+            return session
+
+    def restore(self, session_id):
+        # get(), falling back to SQLite; blocking, so the chat route runs it on the worker pool
+        session = self.get(session_id)
+        if session is not None or not self.spill:
+            return session
+        conn = connect(self.db_path)
+        try:
+            session = _read(conn, session_id)
+        finally:
+            conn.close()
+        if session is None or self.shared:
+            return session
+        with self._lock:
+            # Another request may have created it meanwhile
+            current = self.sessions.get(session_id)
+            if current is not None:
+                return current
+            self._insert(session_id, session)
+            self.restored += 1
+        return session
+
+    def append(self, session_id, user_message, reply):
+        if self.shared:
+            return self._append_shared(session_id, user_message, reply)
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self._spilling.pop(session_id, None) or self._writing.get(session_id)
+                if session is None:
+                    session = Session()
+                    self.created += 1
+                self._insert(session_id, session)
+            else:
+                self.sessions.move_to_end(session_id)
+            session.add(user_message, reply)
+
+    def _append_shared(self, session_id, user_message, reply):
+        # Read-modify-write in one IMMEDIATE transaction, so turns from two processes never overwrite each
+        # other; blocking, so the chat route runs it on the worker pool
+        if self._thread is None:
+            self.start()
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                session = _read(conn, session_id)
+                session = session or Session()
+                session.add(user_message, reply)
+                conn.execute(UPSERT_SESSION, session.to_row(session_id))
+        finally:
+            conn.close()
+
+    def forget(self, session_id):
+        with self._lock:
+            found = self.sessions.pop(session_id, None) is not None
+            found = self._spilling.pop(session_id, None) is not None or found
+        if self.spill:
+            conn = connect(self.db_path)
+            try:
+                with conn:
+                    found = conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0 or found
+            finally:
+                conn.close()
+        return found
+
+    def _insert(self, session_id, session):
+        # Caller holds the lock
+        self.sessions[session_id] = session
+        while len(self.sessions) > self.max_active:
+            evicted_id, evicted = self.sessions.popitem(last=False)
+            self.evicted += 1
+            if self.spill:
+                self._spilling[evicted_id] = evicted
+
+    def sweep(self, now=None):
+        # Moves idle sessions out of memory and writes everything waiting to spill in one transaction
+        now = now if now is not None else time.time()
+        with self._lock:
+            while self.sessions:
+                session_id, session = next(iter(self.sessions.items()))
+                if now - session.last_seen < self.idle_ttl:
+                    break
+                del self.sessions[session_id]
+                self.expired += 1
+                if self.spill:
+                    self._spilling[session_id] = session
+            pending, self._spilling = self._spilling, {}
+            # Still visible to get() until committed, so a returning client never reads a stale row
+            self._writing = pending
+        if not self.spill:
+            return 0
+        written = 0
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                if pending:
+                    conn.executemany(UPSERT_SESSION, [s.to_row(i) for i, s in pending.items()])
+                conn.execute("DELETE FROM sessions WHERE updated < ?", (now - SESSION_SPILL_TTL,))
+            self.spilled += len(pending)
+            written = len(pending)
+        except Exception as e:
+            print(f"[ERROR] Session spill failed ({len(pending)} sessions), retrying on the next sweep: {e}")
+            with self._lock:
+                # Sessions a client resumed meanwhile are back in memory; entries queued since are newer
+                retry = {i: session for i, session in pending.items() if i not in self.sessions}
+                self._spilling = {**retry, **self._spilling}
+        finally:
+            conn.close()
+            with self._lock:
+                self._writing = {}
+        return written
+
+    def _run(self):
+        while not self._stop.wait(SWEEP_INTERVAL):
+            self.sweep()
+
+    def stop(self):
+        # Spills every session still in memory so a restart keeps conversations going
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=SWEEP_INTERVAL)
+        if self.spill:
+            with self._lock:
+                self._spilling.update(self.sessions)
+                self.sessions.clear()
+            self.sweep()
+
+    def stats(self):
+        return {
+            "active": len(self.sessions),
+            "max_active": self.max_active,
+            "idle_ttl_seconds": self.idle_ttl,
+            "spill": self.spill,
+            "shared": self.shared,
+            "created": self.created,
+            "restored": self.restored,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "spilled": self.spilled,
+        }
+
+
+session_store = SessionStore()
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+REBUILDING = "rebuilding"
+FAILED = "failed"
+
+
+class Component:
+    def __init__(self, name, loader, rebuild=None, required=True):
+        self.name = name
+        self.loader = loader
+        self.rebuild = rebuild
+        self.required = required
+        self.instance = None
+        self.status = PENDING
+        self.error = None
+        self.load_ms = None
+        self.rebuild_ms = None
+        self.ready_at = None
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "required": self.required,
+            "version": getattr(self.instance, "version", None),
+            "load_ms": self.load_ms,
+            "rebuild_ms": self.rebuild_ms,
+            "ready_at": self.ready_at,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    # Holds the serving instances (intent classifier, embedding store, Gemini client, ...) and
+    # loads them concurrently at startup. A component whose saved artifacts fail to load is rebuilt
+    # on a background thread so the server can come up and report readiness in the meantime.
+    def __init__(self):
+        self.components = {}
+        self.listeners = {}
+        self.started_at = time.time()
+        self.import_ms = None
+        self.warmup_ms = None
+
+    def register(self, name, loader, rebuild=None, required=True):
+        self.components[name] = Component(name, loader, rebuild, required)
+
+    def on_swap(self, name, callback):
+        self.listeners.setdefault(name, []).append(callback)
+
+    def swap(self, name, instance):
+        # Requests already holding the old instance finish with it; new requests get the new one.
+        # Rebinding the attribute is atomic, so nothing is locked on the request path.
+        component = self.components[name]
+        previous = component.instance
+        component.instance = instance
+        component.status = READY
+        component.error = None
+        component.ready_at = time.time()
+        print(f"[OK] {name} swapped to version {getattr(instance, 'version', None)}")
+        for callback in self.listeners.get(name, []):
+            try:
+                callback(instance, previous)
+            except Exception as e:
+                print(f"[ERROR] {name} swap listener failed: {e}")
+        return previous
+
+    def get(self, name):
+        component = self.components.get(name)
+        return component.instance if component is not None else None
+
+    def is_ready(self, name):
+        component = self.components.get(name)
+        return component is not None and component.status == READY
+
+    @property
+    def ready(self):
+        return all(c.status == READY for c in self.components.values() if c.required)
+
+    def _load(self, component):
+        component.status = LOADING
+        started = time.perf_counter()
+        try:
+            component.instance = component.loader()
+            component.load_ms = round((time.perf_counter() - started) * 1000, 1)
+            component.status = READY
+            component.ready_at = time.time()
+            print(f"[OK] {component.name} ready in {component.load_ms} ms")
+        except Exception as e:
+            component.load_ms = round((time.perf_counter() - started) * 1000, 1)
+            component.error = str(e)
+            if component.rebuild is None:
+                component.status = FAILED
+                print(f"[ERROR] {component.name} failed to load: {e}")
+                return
+            component.status = REBUILDING
+            print(f"[WARN] {component.name} failed to load, rebuilding in background: {e}")
+            threading.Thread(target=self._rebuild, args=(component,), name=f"rebuild-{component.name}",
+                             daemon=True).start()
+
+    def _rebuild(self, component):
+        started = time.perf_counter()
+        try:
+            component.instance = component.rebuild()
+            component.rebuild_ms = round((time.perf_counter() - started) * 1000, 1)
+            component.status = READY
+            component.error = None
+            component.ready_at = time.time()
+            print(f"[OK] {component.name} rebuilt in {component.rebuild_ms} ms")
+        except Exception as e:
+            component.status = FAILED
+            component.error = str(e)
+            print(f"[ERROR] {component.name} rebuild failed: {e}")
+
+    async def warm_up(self, names=None):
+        started = time.perf_counter()
+        # Each loader runs on its own thread; SentenceTransformer, joblib and the Gemini SDK load in parallel.
+        # Components already loaded (e.g. preloaded by serve.py before forking) are skipped.
+        await asyncio.gather(*[
+            asyncio.to_thread(self._load, component)
+            for name, component in self.components.items()
+            if component.status == PENDING and (names is None or name in names)
+        ])
+        self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"[OK] Warm-up finished in {self.warmup_ms} ms")
+
+    def settling(self, names=None):
+        # True while any of the components is still loading or rebuilding on a background thread
+        return any(c.status in (PENDING, LOADING, REBUILDING) for name, c in self.components.items()
+                   if names is None or name in names)
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "import_ms": self.import_ms,
+            "warmup_ms": self.warmup_ms,
+            "components": {name: c.to_dict() for name, c in self.components.items()},
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,254 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+from utils.mapped_format import write_array, map_array
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+QUANTIZATIONS = ("none", "sq8", "pq")
+
+# "auto" picks an index type from the corpus size; set to flat/ivf/hnsw to force one
+KB_INDEX_TYPE = os.getenv("KB_INDEX_TYPE", "auto")
+# Corpus sizes where auto selection moves from exact search to HNSW, then to IVF
+FLAT_MAX_VECTORS = int(os.getenv("KB_FLAT_MAX_VECTORS", "20000"))
+HNSW_MAX_VECTORS = int(os.getenv("KB_HNSW_MAX_VECTORS", "500000"))
+
+HNSW_M = int(os.getenv("KB_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("KB_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("KB_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("KB_IVF_NPROBE", "16"))
+
+# Vector codes stored by the index: "none" (float32), "sq8" (one byte per dimension) or "pq"
+# (KB_PQ_M bytes per vector); quantized indexes re-rank their candidates with float vectors
+KB_QUANTIZE = os.getenv("KB_QUANTIZE", "none")
+# Sub-quantizers per PQ code (rounded down to a divisor of the dimension) and bits per sub-quantizer
+PQ_M = int(os.getenv("KB_PQ_M", "48"))
+PQ_NBITS = int(os.getenv("KB_PQ_NBITS", "8"))
+# FAISS wants ~39 training points per PQ centroid; smaller corpora fall back to SQ8
+PQ_MIN_TRAINING_POINTS = 39
+
+
+def normalize(vectors):
+    # Unit-length vectors turn inner product into cosine similarity
+    vectors = np.array(vectors, dtype='float32', copy=True, ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def choose_index_type(num_vectors):
+    if num_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if num_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivf"
+
+
+def ivf_nlist(num_vectors):
+    # ~4*sqrt(n) lists, keeping at least 39 training points per centroid as FAISS recommends
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def choose_quantization(num_vectors, quantize=KB_QUANTIZE):
+    if quantize not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization '{quantize}', expected one of {QUANTIZATIONS}")
+    if quantize == "pq" and num_vectors < PQ_MIN_TRAINING_POINTS * (1 << PQ_NBITS):
+        return "sq8"
+    return quantize
+
+
+def pq_m(dimension):
+    # Largest divisor of the dimension not above KB_PQ_M
+    return max(m for m in range(1, min(PQ_M, dimension) + 1) if dimension % m == 0)
+
+
+def create_index(dimension, index_type, num_vectors=0, quantize="none"):
+    sq8 = faiss.ScalarQuantizer.QT_8bit
+    if index_type == "flat":
+        if quantize == "sq8":
+            return faiss.IndexScalarQuantizer(dimension, sq8, faiss.METRIC_INNER_PRODUCT)
+        if quantize == "pq":
+            return faiss.IndexPQ(dimension, pq_m(dimension), PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(dimension)
+    if index_type == "hnsw":
+        if quantize == "sq8":
+            index = faiss.IndexHNSWSQ(dimension, sq8, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        elif quantize == "pq":
+            index = faiss.IndexHNSWPQ(dimension, pq_m(dimension), HNSW_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+    if index_type == "ivf":
+        quantizer = faiss.IndexFlatIP(dimension)
+        nlist = ivf_nlist(num_vectors)
+        if quantize == "sq8":
+            return faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq8, faiss.METRIC_INNER_PRODUCT)
+        if quantize == "pq":
+            return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m(dimension), PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def build_index(vectors, index_type=KB_INDEX_TYPE, ids=None, quantize=KB_QUANTIZE):
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    num_vectors, dimension = vectors.shape
+    if index_type == "auto":
+        index_type = choose_index_type(num_vectors)
+
+    index = create_index(dimension, index_type, num_vectors, choose_quantization(num_vectors, quantize))
+    if not index.is_trained:
+        index.train(vectors)
+
+    if ids is None:
+        index.add(vectors)
+    elif index_type == "ivf":
+        # IVF stores ids in its inverted lists and removes them natively; an IDMap2 on top would compact
+        # its id_map on remove_ids while the lists keep their old numbering. The hashtable direct map
+        # lets reconstruct() look vectors up by chunk id.
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+    else:
+        # ID-mapped indexes let callers delete and replace vectors by stable chunk id
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+    tune_index(index)
+    return index
+
+
+def base_index(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def remove_vectors(index, ids, float_vectors=None):
+    ids = np.asarray(ids, dtype='int64')
+    # IVF indexes saved inside an IDMap2 by older builds lose their id mapping on remove_ids
+    wrapped_ivf = isinstance(faiss.downcast_index(index), faiss.IndexIDMap) and index_type_of(index) == "ivf"
+    if not wrapped_ivf:
+        try:
+            index.remove_ids(ids)
+            return index
+        except RuntimeError:
+            pass
+
+    # HNSW graphs cannot delete in place, so rebuild from the vectors that remain; quantized indexes
+    # retrain on their full-precision copies rather than on decoded codes
+    all_ids = faiss.vector_to_array(index.id_map)
+    keep = ~np.isin(all_ids, ids)
+    if float_vectors is not None:
+        vectors = float_vectors.get(all_ids[keep])
+    else:
+        stored = base_index(index)
+        if wrapped_ivf:
+            stored.make_direct_map()
+        vectors = stored.reconstruct_n(0, index.ntotal)[keep]
+    return build_index(vectors, index_type_of(index), ids=all_ids[keep], quantize=quantization_of(index))
+
+
+def tune_index(index):
+    # Search-time parameters are not always persisted by write_index, so reapply them after loading
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(IVF_NPROBE, ivf.nlist)
+        return index
+
+    base = base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def index_type_of(index):
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivf"
+    if isinstance(base_index(index), faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def quantization_of(index):
+    ivf = faiss.try_extract_index_ivf(index)
+    codes = faiss.downcast_index(ivf) if ivf is not None else base_index(index)
+    if isinstance(codes, faiss.IndexHNSW):
+        codes = faiss.downcast_index(codes.storage)
+    if isinstance(codes, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq8"
+    if isinstance(codes, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    return "none"
+
+
+def read_index(path, mmap=False):
+    # With mmap the vectors stay in the page cache and are shared by every process that maps the
+    # file; the index is then read-only and needs writable_copy() before add/remove
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", getattr(faiss, "IO_FLAG_MMAP", 0)) if mmap else 0
+    return tune_index(faiss.read_index(str(path), flags))
+
+
+def writable_copy(index):
+    # clone_index keeps views onto the mapping, so round-trip through a private buffer instead
+    return tune_index(faiss.deserialize_index(faiss.serialize_index(index)))
+
+
+class FloatVectors:
+    # Full-precision copies of the vectors in a quantized index, rows sorted by chunk id, for
+    # re-ranking the index's candidates. Saved next to the index and memory-mapped on load, so only
+    # the rows of re-ranked candidates are paged in.
+    def __init__(self, ids, vectors):
+        self.ids = ids
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, ids, vectors):
+        ids = np.asarray(ids, dtype='int64')
+        order = np.argsort(ids, kind='stable')
+        return cls(ids[order], np.ascontiguousarray(vectors, dtype='float32')[order])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, ids):
+        # Rows for the given chunk ids; ids that are not stored get a zero vector (score 0)
+        ids = np.asarray(ids, dtype='int64')
+        rows = np.searchsorted(self.ids, ids)
+        rows = np.minimum(rows, max(len(self.ids) - 1, 0))
+        found = (self.ids[rows] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        vectors = np.zeros((len(ids), self.vectors.shape[1]), dtype='float32')
+        vectors[found] = self.vectors[rows[found]]
+        return vectors
+
+    def replace(self, remove_ids=(), add_ids=(), add_vectors=None):
+        # A new copy with vectors removed and added; the mapped original stays read-only
+        keep = ~np.isin(self.ids, np.asarray(remove_ids, dtype='int64'))
+        ids, vectors = self.ids[keep], np.asarray(self.vectors[keep])
+        if len(add_ids):
+            ids = np.concatenate([ids, np.asarray(add_ids, dtype='int64')])
+            vectors = np.concatenate([vectors, np.asarray(add_vectors, dtype='float32')])
+        return FloatVectors.build(ids, vectors)
+
+    def save(self, directory):
+        return {"ids": write_array(directory, "float_ids.bin", self.ids),
+                "vectors": write_array(directory, "float_vectors.bin", self.vectors)}
+
+    @classmethod
+    def load(cls, directory, entry, mapped=True):
+        return cls(map_array(directory, entry["ids"], mapped), map_array(directory, entry["vectors"], mapped))
+
+
+def rerank(query_vectors, candidate_ids, float_vectors, top_k):
+    # Exact inner products of each query with its candidates; returns (scores, ids) like index.search
+    scores = np.full((len(query_vectors), top_k), -np.inf, dtype='float32')
+    ids = np.full((len(query_vectors), top_k), -1, dtype='int64')
+    for i, (query, candidates) in enumerate(zip(query_vectors, candidate_ids)):
+        candidates = candidates[candidates >= 0]
+        if not len(candidates):
+            continue
+        exact = float_vectors.get(candidates) @ query
+        order = np.argsort(-exact, kind='stable')[:top_k]
+        scores[i, :len(order)] = exact[order]
+        ids[i, :len(order)] = candidates[order]
+    return scores, ids
@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+# Threads that run the blocking ML stages (intent, sentiment, embeddings, FAISS, SQLite)
+WORKER_THREADS = int(os.getenv("CHAT_WORKER_THREADS", str(min(32, (os.cpu_count() or 1) + 4))))
+# Requests allowed inside the chat pipeline at the same time
+MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "64"))
+# Requests allowed to wait for a free slot before we start rejecting with 503
+MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "256"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class WorkerPool:
+    def __init__(self, threads=WORKER_THREADS, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE):
+        self.threads = threads
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pratai-worker")
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def acquire(self):
+        # Created lazily so the semaphore binds to uvicorn's loop (Python 3.9 binds at construction)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"Chat queue is full ({self.max_queue} waiting)")
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "threads": self.threads,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+worker_pool = WorkerPool()
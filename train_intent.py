@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+parser = argparse.ArgumentParser(description="Train the intent classifier from streamed datasets, evaluate it on held-out rows "
+                                             "and publish it only if it beats the serving classifier")
+parser.add_argument("datasets", nargs="*", help="Extra JSONL files of {\"text\": ..., \"intent\": ...} (data/intents.json is always used)")
+parser.add_argument("--from-log", action="store_true", help="Also learn from logged conversations labelled with high confidence")
+parser.add_argument("--min-confidence", type=float, default=None, help="Confidence floor for logged messages")
+parser.add_argument("--db", help="SQLite database with the conversations log (default: pratchat.db)")
+parser.add_argument("--epochs", type=int, default=None, help="partial_fit passes over the data")
+parser.add_argument("--chunk-size", type=int, default=None, help="Rows per partial_fit chunk")
+parser.add_argument("--no-search", action="store_true", help="Skip the cross-validated hyperparameter search")
+parser.add_argument("--jobs", type=int, default=None, help="Parallel search jobs (-1: every core)")
+parser.add_argument("--dry-run", action="store_true", help="Evaluate only; never publish")
+parser.add_argument("--force", action="store_true", help="Publish even if the candidate does not beat the serving classifier")
+parser.add_argument("--report", help="Also write the evaluation report to this JSON file")
+args = parser.parse_args()
+
+from utils.intent_training import (train_and_promote, default_sources, INTENT_LOG_MIN_CONFIDENCE, INTENT_TRAIN_EPOCHS,
+                                   INTENT_TRAIN_CHUNK, INTENT_SEARCH_JOBS)
+
+print("=" * 50)
+print("Prat.AI Intent Classifier Training")
+print("=" * 50)
+
+sources = default_sources(args.datasets, args.from_log, args.db,
+                          args.min_confidence if args.min_confidence is not None else INTENT_LOG_MIN_CONFIDENCE)
+report = train_and_promote(sources, promote=not args.dry_run, force=args.force,
+                           epochs=args.epochs or INTENT_TRAIN_EPOCHS, chunk_size=args.chunk_size or INTENT_TRAIN_CHUNK,
+                           search=not args.no_search, search_jobs=args.jobs if args.jobs is not None else INTENT_SEARCH_JOBS)
+
+training, candidate = report["training"], report["candidate"]
+print(f"Trained on {training['train_rows']} rows in {training['train_s']} s, {training['holdout_rows']} held out")
+print(f"Parameters: {training['params']} (search: {training['search']})")
+print(f"\n{'model':>10} {'accuracy':>9} {'macro F1':>9} {'p50 us':>9} {'p95 us':>9}")
+# baseline: the serving model's recipe retrained on the same rows; serving: as published (it may have
+# been trained on the held-out rows, so its score is only a reference)
+for name, result in (("candidate", candidate), ("baseline", report["baseline"]), ("serving", report["current"])):
+    if result:
+        print(f"{name:>10} {str(result.get('accuracy')):>9} {str(result.get('f1_macro')):>9} "
+              f"{str(result.get('predict_p50_us')):>9} {str(result.get('predict_p95_us')):>9}")
+print(f"\n{'intent':>16} {'precision':>9} {'recall':>9} {'F1':>9} {'support':>8}")
+for intent, scores in candidate.get("per_intent", {}).items():
+    print(f"{intent:>16} {scores['precision']:>9} {scores['recall']:>9} {scores['f1']:>9} {scores['support']:>8}")
+
+if report["version"]:
+    print(f"\n[OK] {report['decision']}: refitted on all {report['published']['rows']} rows and published as version "
+          f"{report['version']}")
+    print("  curl -X POST http://localhost:8000/api/models/intent/reload")
+else:
+    print(f"\n[INFO] {report['decision']}: serving version unchanged")
+
+if args.report:
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[OK] Report written to {args.report}")